@@ -0,0 +1,101 @@
+import os, asyncio, atexit, hashlib, threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from Services.Core.extractors import count_signals, StreamScanner
+from Services.Core.severity import score_severity, record_signals, SignalCounts, SeverityResult
+from Services.Core.watchlist import get_watchlist
+
+
+@dataclass
+class Analysis:
+    counts: Dict[str, int]
+    severity: SeverityResult
+    size_bytes: int
+    sha256: Optional[str] = None
+    watchlist_orgs: List[str] = field(default_factory=list)  # tenants whose watchlist matched
+
+
+# --- worker-side jobs (top-level so they pickle) ---
+
+def analyze_text(text: str, size_bytes: int) -> Analysis:
+    sig = count_signals(text)
+    watchlist = get_watchlist()
+    orgs = sorted(watchlist.match_text(text)) if watchlist is not None else []
+    counts = SignalCounts(**sig, size_bytes=size_bytes, watchlist_hits=len(orgs))
+    severity = score_severity(counts)
+    record_signals(counts, severity, "text")
+    return Analysis(sig, severity, size_bytes, watchlist_orgs=orgs)
+
+
+def analyze_file(path: str, scan: bool = True, digest: bool = True,
+                 chunk_size: int = 64 * 1024) -> Analysis:
+    """Hash and/or scan a file on disk in one read."""
+    h = hashlib.sha256() if digest else None
+    watchlist = get_watchlist()
+    watch = watchlist.scanner() if watchlist is not None and scan else None
+    st = StreamScanner(watch=watch)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            if h: h.update(chunk)
+            if scan: st.feed(chunk)
+            else: st.size_bytes += len(chunk)
+    sig = st.close()
+    orgs = sorted(watch.hits) if watch is not None else []
+    counts = SignalCounts(**sig, size_bytes=st.size_bytes, watchlist_hits=len(orgs))
+    severity = score_severity(counts)
+    if scan:
+        record_signals(counts, severity, "file")
+    return Analysis(sig, severity, st.size_bytes, h.hexdigest() if h else None, orgs)
+
+
+class AnalysisService:
+    """
+    CPU stage for regex/scoring work, backed by a ProcessPoolExecutor.
+
+    At most `max_pending` jobs are queued or running; `submit` blocks and
+    `submit_async` awaits (without blocking the event loop) until a slot frees
+    up, so a fast crawler cannot pile unbounded work (and memory) on the pool.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_pending = max_pending or self.workers * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def submit(self, fn, *args, **kwargs) -> "Future[Analysis]":
+        self._slots.acquire()
+        return self._dispatch(fn, *args, **kwargs)
+
+    async def submit_async(self, fn, *args, **kwargs) -> Analysis:
+        if not self._slots.acquire(blocking=False):
+            await asyncio.get_running_loop().run_in_executor(None, self._slots.acquire)
+        return await asyncio.wrap_future(self._dispatch(fn, *args, **kwargs))
+
+    def _dispatch(self, fn, *args, **kwargs) -> "Future[Analysis]":
+        try:
+            fut = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+
+
+_service: Optional[AnalysisService] = None
+_service_lock = threading.Lock()
+
+
+def get_service() -> AnalysisService:
+    """Process-wide AnalysisService, created on first use."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = AnalysisService()
+            atexit.register(_service.shutdown)
+        return _service
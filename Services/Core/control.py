@@ -0,0 +1,156 @@
+import os, json, mmap, time, sqlite3, threading
+from typing import Any, Dict, List, Optional
+
+from Services.Core.db import connect
+
+CONTROL_DB_PATH = os.environ.get("ATHR_CONTROL_DB", "/data/athr/control.db")
+
+# crawler sources that can be switched on and off; append only, the
+# position is the source's byte in the toggle file
+SOURCES = ("pastebin", "telegram", "tor")
+_TOGGLE_BYTES = 64
+_UNSET, _OFF, _ON = 0, 1, 2   # unset = enabled (the default)
+
+RING_CAPACITY = {"events": 10_000, "jobs": 10_000}
+
+
+class RingBuffer:
+    """
+    Fixed-capacity log in SQLite: item `seq` lives in slot seq % capacity,
+    so an append overwrites the oldest item and the table never grows.
+    Append and tail reads touch only the rows involved.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock, name: str, capacity: int):
+        self._conn, self._lock, self.name = conn, lock, name
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO ring_meta (name, capacity, next_seq) VALUES (?, ?, 0)",
+                               (name, capacity))
+            # the stored capacity wins: slots already written depend on it
+            self.capacity = self._conn.execute("SELECT capacity FROM ring_meta WHERE name = ?", (name,)).fetchone()[0]
+
+    def append(self, item: Dict[str, Any]) -> int:
+        """Adds `item` (JSON-serializable) and returns its sequence number."""
+        data = json.dumps(item)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (seq,) = self._conn.execute(
+                    "UPDATE ring_meta SET next_seq = next_seq + 1 WHERE name = ? RETURNING next_seq - 1",
+                    (self.name,)).fetchall()[0]
+                self._conn.execute("INSERT OR REPLACE INTO ring (name, slot, seq, data) VALUES (?, ?, ?, ?)",
+                                   (self.name, seq % self.capacity, seq, data))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return seq
+
+    def tail(self, n: int = 200) -> List[Dict[str, Any]]:
+        """The last `n` items, oldest first."""
+        n = max(0, min(n, self.capacity))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM ring WHERE name = ? AND seq >= "
+                "(SELECT next_seq FROM ring_meta WHERE name = ?) - ? ORDER BY seq",
+                (self.name, self.name, n)).fetchall()
+        return [json.loads(d) for (d,) in rows]
+
+    def since(self, seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Items after sequence number `seq` (as returned by append), oldest first, with their `seq`."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data FROM ring WHERE name = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (self.name, seq, limit)).fetchall()
+        return [dict(json.loads(d), seq=s) for s, d in rows]
+
+    def __len__(self):
+        with self._lock:
+            (n,) = self._conn.execute("SELECT next_seq FROM ring_meta WHERE name = ?", (self.name,)).fetchone()
+        return min(n, self.capacity)
+
+
+class ControlState:
+    """
+    Control-plane state shared by the control API, the scheduler and the
+    crawler workers, across processes.
+
+    Toggles are one byte per source in a small memory-mapped file next to
+    the DB: every process maps the same pages, so a change is visible to
+    all of them immediately and reading one is a memory access (no API
+    call, no query). `events` and `jobs` are RingBuffers in the SQLite DB
+    (WAL, so readers don't block the writers).
+    """
+
+    def __init__(self, path: str = CONTROL_DB_PATH, capacity: Optional[Dict[str, int]] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.isolation_level = None  # autocommit; appends open their own transaction
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS ring_meta (
+                name TEXT PRIMARY KEY,
+                capacity INTEGER NOT NULL,
+                next_seq INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ring (
+                name TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                PRIMARY KEY (name, slot)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_ring_seq ON ring(name, seq);
+        """)
+        capacity = dict(RING_CAPACITY, **(capacity or {}))
+        self.events = RingBuffer(self._conn, self._lock, "events", capacity["events"])
+        self.jobs = RingBuffer(self._conn, self._lock, "jobs", capacity["jobs"])
+        self._toggles = self._map_toggles(path + "-toggles")
+
+    @staticmethod
+    def _map_toggles(path: str) -> mmap.mmap:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < _TOGGLE_BYTES:
+                os.ftruncate(fd, _TOGGLE_BYTES)   # zero bytes = unset = enabled
+            return mmap.mmap(fd, _TOGGLE_BYTES)
+        finally:
+            os.close(fd)  # the mapping keeps the file open
+
+    def _slot(self, source: str) -> int:
+        try:
+            return SOURCES.index(source)
+        except ValueError:
+            raise KeyError(f"unknown source {source!r}") from None
+
+    def enabled(self, source: str) -> bool:
+        return self._toggles[self._slot(source)] != _OFF
+
+    def set_enabled(self, source: str, enabled: bool):
+        self._toggles[self._slot(source)] = _ON if enabled else _OFF
+        self._toggles.flush()  # to disk as well, so the setting survives a reboot
+
+    def toggles(self) -> Dict[str, bool]:
+        return {source: self.enabled(source) for source in SOURCES}
+
+    def record_job(self, source: str, status: str, reason: str = "", **extra):
+        """Job log entry in the shape /status returns: {source, status, reason, ts, ...}."""
+        self.jobs.append(dict(source=source, status=status, reason=reason, ts=time.time(), **extra))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        self._toggles.close()
+
+
+_control: Optional[ControlState] = None
+_control_lock = threading.Lock()
+
+
+def get_control() -> ControlState:
+    """Process-wide ControlState at CONTROL_DB_PATH, opened on first use."""
+    global _control
+    with _control_lock:
+        if _control is None:
+            _control = ControlState()
+        return _control
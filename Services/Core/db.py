@@ -1 +1,145 @@
-o
\ No newline at end of file
+import os, time, sqlite3, threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from Services.Core.hashing import BloomFilter
+
+DEDUP_DB_PATH = os.environ.get("ATHR_DEDUP_DB", "/data/athr/dedup.db")
+
+# kinds used by the crawlers and how long an entry keeps suppressing work
+DEFAULT_TTL = {
+    "paste_id": 7 * 86400,
+    "peek_hash": 30 * 86400,
+    "sha256": 90 * 86400,
+    "tg_doc": 30 * 86400,
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class DedupIndex:
+    """
+    On-disk set of (kind, key) pairs with TTL, shared by the crawlers.
+
+    A Bloom filter answers most negative lookups without touching SQLite. Rows
+    written by other processes are folded into it at most every
+    `sync_interval` seconds (new rows are found by rowid), so a key added
+    elsewhere can be missed for that long, which only costs a redundant fetch.
+    """
+
+    def __init__(self, path: str = DEDUP_DB_PATH, ttl: Optional[Dict[str, float]] = None,
+                 default_ttl: float = 30 * 86400, sync_interval: float = 1.0,
+                 bloom_capacity: int = 1_000_000):
+        self.ttl = dict(DEFAULT_TTL, **(ttl or {}))
+        self.default_ttl = default_ttl
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS seen (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                UNIQUE (kind, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_seen_last ON seen(last_seen);
+        """)
+        self._bloom_capacity = bloom_capacity
+        self._rebuild_bloom()
+
+    # --- bloom upkeep ---
+
+    def _rebuild_bloom(self):
+        (rows, max_id) = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(id), 0) FROM seen").fetchone()
+        self._bloom = BloomFilter(max(self._bloom_capacity, rows * 2))
+        self._bloom.update(f"{k}\0{v}" for k, v in self._conn.execute("SELECT kind, key FROM seen"))
+        self._max_id = max_id
+        self._synced = time.monotonic()
+
+    def _sync(self, force: bool = False):
+        if not force and time.monotonic() - self._synced < self.sync_interval:
+            return
+        rows = self._conn.execute("SELECT id, kind, key FROM seen WHERE id > ?", (self._max_id,)).fetchall()
+        for rid, k, v in rows:
+            self._bloom.add(f"{k}\0{v}")
+            self._max_id = max(self._max_id, rid)
+        self._synced = time.monotonic()
+        if self._bloom.count > self._bloom.capacity:
+            self._rebuild_bloom()
+
+    # --- public API ---
+
+    def _ttl(self, kind: str) -> float:
+        return self.ttl.get(kind, self.default_ttl)
+
+    def seen(self, kind: str, key: str) -> bool:
+        """True if (kind, key) was added within its TTL."""
+        with self._lock:
+            if f"{kind}\0{key}" not in self._bloom:
+                self._sync()
+                if f"{kind}\0{key}" not in self._bloom:
+                    return False
+            row = self._conn.execute(
+                "SELECT last_seen FROM seen WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+        return row is not None and row[0] >= time.time() - self._ttl(kind)
+
+    def add(self, kind: str, key: str):
+        self.add_many([(kind, key)])
+
+    def add_many(self, items: Iterable[Tuple[str, str]]):
+        now = time.time()
+        items = list(items)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO seen (kind, key, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind, key) DO UPDATE SET last_seen = excluded.last_seen",
+                [(k, v, now, now) for k, v in items],
+            )
+            for k, v in items:
+                self._bloom.add(f"{k}\0{v}")
+
+    def check_and_add(self, kind: str, key: str) -> bool:
+        """Returns whether the key was already known, and records it."""
+        known = self.seen(kind, key)
+        self.add(kind, key)
+        return known
+
+    def evict_expired(self) -> int:
+        """
+        Drops rows past their TTL. The Bloom filter keeps their bits (lookups
+        just fall through to SQLite) until it fills up and gets rebuilt.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            n = 0
+            kinds = [k for (k,) in self._conn.execute("SELECT DISTINCT kind FROM seen")]
+            for kind in kinds:
+                n += self._conn.execute("DELETE FROM seen WHERE kind = ? AND last_seen < ?",
+                                        (kind, now - self._ttl(kind))).rowcount
+        return n
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[DedupIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> DedupIndex:
+    """Process-wide DedupIndex at DEDUP_DB_PATH, opened on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DedupIndex()
+        return _index
@@ -0,0 +1,45 @@
+import hashlib, math
+from typing import Iterable
+
+
+def sha256_file(path: str, chunk_size: int = 64 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BloomFilter:
+    """
+    Plain bit-array Bloom filter sized for `capacity` items at `error_rate`
+    false positives. No deletes: rebuild it when the backing set shrinks.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.nbits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.nbits / capacity * math.log(2)))
+        self.bits = bytearray((self.nbits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # double hashing (Kirsch-Mitzenmacher) off one 128-bit digest
+        d = hashlib.blake2b(key.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        h1 = int.from_bytes(d[:8], "little")
+        h2 = int.from_bytes(d[8:], "little") | 1
+        return ((h1 + i * h2) % self.nbits for i in range(self.k))
+
+    def add(self, key: str):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
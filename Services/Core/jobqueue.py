@@ -0,0 +1,306 @@
+import os, json, time, uuid, random, socket, asyncio, sqlite3, threading
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+from Services.Core.db import connect
+
+JOBS_DB_PATH = os.environ.get("ATHR_JOBS_DB", "/data/athr/jobs.db")
+
+# priority lanes: lower runs first
+LANE_DEEP_HIGH = 0     # deep fetch of a high-severity item
+LANE_DEEP = 10         # deep fetch of a medium-severity item
+LANE_PEEK = 20         # peeks and light per-item work
+LANE_CRAWL = 30        # periodic listing / crawl runs
+
+LEASE_SECONDS = 120.0  # a running job not renewed for this long is taken back
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 15 * 60.0
+
+
+class RetryLater(Exception):
+    """Raised by a handler to run the job again after `delay` seconds, without using up an attempt."""
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason or f"retry in {delay:.0f}s")
+        self.delay = delay
+
+
+@dataclass
+class Job:
+    id: int
+    source: str
+    kind: str
+    payload: Dict[str, Any]
+    priority: int
+    attempts: int
+    max_attempts: int
+    dedup_key: Optional[str] = None
+    worker: Optional[str] = None
+
+
+def backoff(attempts: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Delay before retry number `attempts` (1-based): exponential, capped, with jitter."""
+    return min(cap, base * 2 ** (attempts - 1)) * random.uniform(0.5, 1.0)
+
+
+class JobQueue:
+    """
+    Durable job queue in SQLite, shared by every process on the machine.
+
+    Jobs are claimed per source in (priority, run_at, id) order with a lease;
+    a worker renews the lease while the job runs, and a job whose lease ran
+    out (its worker died) goes back to the queue. A job with a `dedup_key`
+    is not enqueued again while another one with that key is queued or
+    running, which is how periodic runs are kept from overlapping.
+    """
+
+    def __init__(self, path: str = JOBS_DB_PATH, lease: float = LEASE_SECONDS):
+        self.path = path
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.isolation_level = None  # autocommit; reap() opens its own transaction
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                source TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL DEFAULT '{}',
+                priority INTEGER NOT NULL,
+                dedup_key TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',   -- queued | running | done | failed
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_at REAL NOT NULL,
+                lease_until REAL,
+                worker TEXT,
+                last_error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(source, priority, run_at, id) WHERE state = 'queued';
+            CREATE INDEX IF NOT EXISTS idx_jobs_lease ON jobs(lease_until) WHERE state = 'running';
+            CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(updated) WHERE state IN ('done', 'failed');
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs(dedup_key)
+                WHERE dedup_key IS NOT NULL AND state IN ('queued', 'running');
+            CREATE TABLE IF NOT EXISTS schedules (
+                name TEXT PRIMARY KEY,
+                next_run REAL NOT NULL
+            );
+        """)
+
+    def _write(self, sql: str, args=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, args)
+
+    # --- producers ---
+
+    def enqueue(self, source: str, kind: str, payload: Optional[Dict[str, Any]] = None,
+                priority: int = LANE_PEEK, dedup_key: Optional[str] = None,
+                max_attempts: int = 5, delay: float = 0.0) -> Optional[int]:
+        """Adds a job; returns its id, or None if `dedup_key` is already queued or running."""
+        now = time.time()
+        cur = self._write(
+            "INSERT OR IGNORE INTO jobs (source, kind, payload, priority, dedup_key, max_attempts, run_at, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (source, kind, json.dumps(payload or {}), priority, dedup_key, max_attempts, now + delay, now, now),
+        )
+        return cur.lastrowid if cur.rowcount else None
+
+    def due(self, name: str, interval: float) -> bool:
+        """
+        True at most once per `interval` for schedule `name`, across all
+        processes and restarts: whoever moves next_run forward owns the tick.
+        """
+        now = time.time()
+        self._write("INSERT OR IGNORE INTO schedules (name, next_run) VALUES (?, ?)", (name, now))
+        return self._write("UPDATE schedules SET next_run = ? WHERE name = ? AND next_run <= ?",
+                           (now + interval, name, now)).rowcount == 1
+
+    # --- workers ---
+
+    def claim(self, source: str, worker: str) -> Optional[Job]:
+        """Takes the next ready job of `source`, highest lane first, and leases it to `worker`."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_until = ?, worker = ?, updated = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE source = ? AND state = 'queued' AND run_at <= ? "
+                "            ORDER BY priority, run_at, id LIMIT 1) "
+                "RETURNING id, source, kind, payload, priority, attempts, max_attempts, dedup_key",
+                (now + self.lease, worker, now, source, now),
+            ).fetchall()  # drained, so the statement (and its write lock) is finished here
+        if not row:
+            return None
+        row = row[0]
+        return Job(row[0], row[1], row[2], json.loads(row[3]), row[4], row[5], row[6], row[7], worker)
+
+    def renew(self, job_ids: List[int], worker: str):
+        if job_ids:
+            self._write(
+                f"UPDATE jobs SET lease_until = ? WHERE worker = ? AND state = 'running' "
+                f"AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time() + self.lease, worker, *job_ids),
+            )
+
+    # complete/fail only touch a job still leased to the same worker: once a
+    # lease expired the job may already be running elsewhere
+
+    def complete(self, job: Job):
+        self._write("UPDATE jobs SET state = 'done', lease_until = NULL, last_error = NULL, updated = ? "
+                    "WHERE id = ? AND state = 'running' AND worker = ?", (time.time(), job.id, job.worker))
+
+    def fail(self, job: Job, error: Union[BaseException, str]):
+        """Back to the queue with backoff, or `failed` once out of attempts."""
+        now = time.time()
+        if isinstance(error, RetryLater):
+            sql, args = ("state = 'queued', attempts = attempts - 1, run_at = ?, last_error = ?",
+                         (now + error.delay, str(error)))
+        elif job.attempts < job.max_attempts:
+            sql, args = "state = 'queued', run_at = ?, last_error = ?", (now + backoff(job.attempts), repr(error))
+        else:
+            sql, args = "state = 'failed', last_error = ?", (repr(error),)
+        self._write(f"UPDATE jobs SET {sql}, lease_until = NULL, updated = ? "
+                    "WHERE id = ? AND state = 'running' AND worker = ?", (*args, now, job.id, job.worker))
+
+    # --- upkeep ---
+
+    def reap(self) -> int:
+        """Requeues (or fails) running jobs whose lease expired: their worker is gone."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                failed = self._conn.execute(
+                    "UPDATE jobs SET state = 'failed', last_error = 'lease expired', lease_until = NULL, updated = ? "
+                    "WHERE state = 'running' AND lease_until < ? AND attempts >= max_attempts", (now, now)).rowcount
+                requeued = self._conn.execute(
+                    "UPDATE jobs SET state = 'queued', last_error = 'lease expired', lease_until = NULL, "
+                    "run_at = ?, updated = ? WHERE state = 'running' AND lease_until < ?",
+                    (now + BACKOFF_BASE, now, now)).rowcount
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return failed + requeued
+
+    def purge(self, older_than: float = 7 * 86400) -> int:
+        """Deletes done/failed jobs last updated more than `older_than` seconds ago."""
+        return self._write("DELETE FROM jobs WHERE state IN ('done', 'failed') AND updated < ?",
+                           (time.time() - older_than,)).rowcount
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """{source: {state: n}}"""
+        out: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            rows = self._conn.execute("SELECT source, state, COUNT(*) FROM jobs GROUP BY source, state").fetchall()
+        for source, state, n in rows:
+            out.setdefault(source, {})[state] = n
+        return out
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+Handler = Callable[..., Union[Awaitable[Any], Any]]
+
+
+class Worker:
+    """
+    Pool of `concurrency` slots running the jobs of one source in this
+    process. Coroutine handlers run on the worker's event loop (so they can
+    share a client), plain functions in threads. Handlers are called as
+    `handler(queue, **payload)` and may enqueue follow-up jobs; an exception
+    retries the job with backoff, RetryLater reschedules it.
+
+    While `enabled()` returns False the slots claim nothing (running jobs
+    finish); `on_result(job, status, reason)` sees every outcome.
+
+    More capacity for a source = more slots here or more worker processes,
+    on the same JOBS_DB_PATH.
+    """
+
+    def __init__(self, queue: JobQueue, source: str, handlers: Dict[str, Handler],
+                 concurrency: int = 4, poll_interval: float = 0.5,
+                 enabled: Optional[Callable[[], bool]] = None,
+                 on_result: Optional[Callable[[Job, str, str], None]] = None):
+        self.queue = queue
+        self.enabled = enabled
+        self.on_result = on_result
+        self.source = source
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}:{source}:{uuid.uuid4().hex[:6]}"
+        self.running: Dict[int, Job] = {}
+        self.stats = dict(done=0, retried=0, failed=0)
+        self._stop = asyncio.Event()
+
+    async def _run_one(self, job: Job):
+        handler = self.handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f"no handler for {job.kind!r}")
+            if asyncio.iscoroutinefunction(handler):
+                await handler(self.queue, **job.payload)
+            else:
+                await asyncio.to_thread(handler, self.queue, **job.payload)
+        except asyncio.CancelledError:
+            await asyncio.to_thread(self.queue.fail, job, RetryLater(0, "worker stopped"))
+            raise
+        except Exception as e:
+            status = "failed" if job.attempts >= job.max_attempts and not isinstance(e, RetryLater) else "retried"
+            self.stats[status] += 1
+            print(f"[{self.source}] job {job.id} {job.kind} attempt {job.attempts}/{job.max_attempts} failed: {e!r}")
+            await asyncio.to_thread(self.queue.fail, job, e)
+            self._report(job, status, repr(e))
+        else:
+            self.stats["done"] += 1
+            await asyncio.to_thread(self.queue.complete, job)
+            self._report(job, "done", "")
+
+    def _report(self, job: Job, status: str, reason: str):
+        if self.on_result is not None:
+            try:
+                self.on_result(job, status, reason)
+            except Exception as e:
+                print(f"[{self.source}] on_result failed: {e!r}")
+
+    async def _slot(self):
+        while not self._stop.is_set():
+            job = None
+            if self.enabled is None or self.enabled():
+                job = await asyncio.to_thread(self.queue.claim, self.source, self.name)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.running[job.id] = job
+            try:
+                await self._run_one(job)
+            finally:
+                self.running.pop(job.id, None)
+
+    async def _keep_leases(self):
+        while not self._stop.is_set():
+            try:
+                await asyncio.wait_for(self._stop.wait(), self.queue.lease / 3)
+            except asyncio.TimeoutError:
+                pass
+            await asyncio.to_thread(self.queue.renew, list(self.running), self.name)
+            await asyncio.to_thread(self.queue.reap)
+
+    def stop(self):
+        self._stop.set()
+
+    async def run(self):
+        """Runs until stop(); jobs still running then are finished first."""
+        print(f"[{self.source}] worker {self.name} started, {self.concurrency} slot(s)")
+        keeper = asyncio.ensure_future(self._keep_leases())
+        try:
+            await asyncio.gather(*(self._slot() for _ in range(self.concurrency)))
+        finally:
+            keeper.cancel()
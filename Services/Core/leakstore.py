@@ -0,0 +1,147 @@
+"""
+Storage for the leak-site monitor (bh_monitor) and its API (bh_data).
+
+Replaces leaks.json, which the crawler rewrote in full on every run and the
+API re-parsed on every request. This is a SQLite table in WAL mode:
+
+- `make_key` is a UNIQUE column, so dedup is an INSERT OR IGNORE
+- rows are only appended and never deleted, so rowids are dense: the leak
+  at position i (newest first) has id max_id - i, and any page is a range
+  scan of `limit` rows regardless of the offset
+- each crawl is one transaction; readers see the old or the new set of
+  leaks, never a half-written file, and never block the writer
+
+One-time import of an existing leaks.json (newest first, as the crawler
+wrote it):
+
+    python -m Services.Core.leakstore path/to/leaks.json [--db path/to/leaks.db]
+"""
+import os, sys, json, sqlite3, threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from Services.Core.db import connect
+
+LEAKS_DB_PATH = os.environ.get("ATHR_LEAKS_DB", "/data/athr/leaks.db")
+
+# the fields of one leak, in the order the API has always returned them
+FIELDS = ("leak_name", "discovered", "country", "source_group", "link_source")
+
+
+def make_key(item: dict) -> str:
+    """
+    Unique key for a leak item.
+    You can change logic (e.g. use link_source only).
+    """
+    return f"{item.get('link_source','')}|{item.get('leak_name','')}|{item.get('discovered','')}"
+
+
+class LeakStore:
+    def __init__(self, path: str = LEAKS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS leaks (
+                id INTEGER PRIMARY KEY,      -- dense, oldest = 1
+                key TEXT NOT NULL UNIQUE,    -- make_key(item)
+                leak_name TEXT,
+                discovered TEXT,
+                country TEXT,
+                source_group TEXT,
+                link_source TEXT
+            );
+        """)
+
+    def add_many(self, items: Iterable[dict]) -> List[dict]:
+        """
+        Store `items` (newest first, as they appear on the page) and return
+        the ones that were not already known, in the same order.
+        """
+        items = list(items)
+        added = []
+        with self._lock, self._conn:
+            # oldest first so the first item ends up with the highest id
+            for item in reversed(items):
+                cur = self._conn.execute(
+                    f"INSERT OR IGNORE INTO leaks (key, {', '.join(FIELDS)}) VALUES (?{', ?' * len(FIELDS)})",
+                    (make_key(item), *(item.get(f) for f in FIELDS)),
+                )
+                if cur.rowcount:
+                    added.append(item)
+        added.reverse()
+        return added
+
+    def known(self, keys: Iterable[str]) -> Set[str]:
+        """The subset of `keys` that is already stored."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key FROM leaks WHERE key IN ({','.join('?' * len(keys))})", keys
+            ).fetchall()
+        return {k for (k,) in rows}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM leaks").fetchone()[0]
+
+    def page(self, offset: int = 0, limit: int = 50) -> List[dict]:
+        """Leaks [offset, offset + limit), newest first."""
+        if limit <= 0 or offset < 0:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM leaks "
+                f"WHERE id <= (SELECT COALESCE(MAX(id), 0) FROM leaks) - ? ORDER BY id DESC LIMIT ?",
+                (offset, limit),
+            ).fetchall()
+        return [dict(zip(FIELDS, row)) for row in rows]
+
+    def get(self, index: int) -> Optional[dict]:
+        """The leak at `index` (0 = newest), or None."""
+        if index < 0:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM leaks WHERE id = (SELECT MAX(id) FROM leaks) - ?",
+                (index,),
+            ).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def import_json(store: LeakStore, json_path: str) -> Dict[str, int]:
+    """Load a leaks.json written by the old crawler (newest first) into `store`."""
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    added = store.add_many(data)
+    return dict(read=len(data), added=len(added), total=store.count())
+
+
+_store: Optional[LeakStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> LeakStore:
+    """Process-wide LeakStore at LEAKS_DB_PATH, opened on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LeakStore()
+        return _store
+
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Import a leaks.json into the leak store")
+    ap.add_argument("json_path")
+    ap.add_argument("--db", default=LEAKS_DB_PATH)
+    args = ap.parse_args()
+    try:
+        print(import_json(LeakStore(args.db), args.json_path))
+    except (OSError, json.JSONDecodeError) as e:
+        sys.exit(f"cannot import {args.json_path}: {e}")
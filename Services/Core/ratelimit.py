@@ -0,0 +1,32 @@
+import time, asyncio
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+    A rate of 0/None disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], capacity: Optional[float] = None):
+        self.rate = rate or 0.0
+        self.capacity = capacity or max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+        self._ts = now
+
+    async def acquire(self, tokens: float = 1.0):
+        if not self.rate:
+            return
+        # the lock keeps waiters FIFO instead of all waking on the same refill
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
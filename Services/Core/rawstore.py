@@ -0,0 +1,248 @@
+import os, gzip, time, shutil, hashlib, tempfile, threading
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # gzip is always there
+    zstandard = None
+
+RAW_STORE_DIR = os.environ.get("ATHR_RAW_STORE", "/data/athr/raw/objects")
+
+# object file suffix per codec; the suffix is how readers know how to decode
+SUFFIX = {"zstd": ".zst", "gzip": ".gz", None: ""}
+DEFAULT_CODEC = "zstd" if zstandard else "gzip"
+CHUNK = 256 * 1024
+
+# formats that are already compressed: stored as-is, recompressing only burns CPU
+COMPRESSED_EXT = {".zip", ".7z", ".rar", ".gz", ".bz2", ".xz", ".zst", ".tgz"}
+
+
+@dataclass
+class StoredObject:
+    sha256: str
+    path: str
+    size: int              # original bytes
+    stored_size: int       # bytes on disk
+    codec: Optional[str]
+    deduplicated: bool = False   # content was already in the store
+
+
+class _Sink:
+    """Hashes the plaintext and compresses it into a temp file as it streams in."""
+
+    def __init__(self, f: BinaryIO, codec: Optional[str], level: Optional[int]):
+        self.h = hashlib.sha256()
+        self.size = 0
+        self._f = f
+        if codec == "zstd":
+            self._w = zstandard.ZstdCompressor(level=level or 3).stream_writer(f, closefd=False)
+        elif codec == "gzip":
+            # mtime=0 keeps equal content byte-identical on disk
+            self._w = gzip.GzipFile(fileobj=f, mode="wb", compresslevel=level or 6, mtime=0)
+        else:
+            self._w = f
+
+    def write(self, chunk: bytes):
+        self.h.update(chunk)
+        self.size += len(chunk)
+        self._w.write(chunk)
+
+    def close(self):
+        if self._w is not self._f:
+            self._w.close()
+        self._f.flush()
+
+
+class RawStore:
+    """
+    Content-addressed store for raw artifacts, keyed by SHA-256.
+
+    Objects live at `<root>/<sha[:2]>/<sha[2:4]>/<sha><suffix>` and are
+    compressed on the way in (zstd when available, gzip otherwise), so the
+    same leak reposted under a different name or source is kept once.
+    Writes go to `<root>/tmp` first and are renamed into place, so readers
+    never see a partial object.
+    """
+
+    def __init__(self, root: str = RAW_STORE_DIR, codec: Optional[str] = DEFAULT_CODEC,
+                 level: Optional[int] = None):
+        if codec == "zstd" and zstandard is None:
+            raise RuntimeError("zstd codec needs the 'zstandard' package")
+        if codec not in SUFFIX:
+            raise ValueError(f"unknown codec {codec!r}")
+        self.root = root
+        self.codec = codec
+        self.level = level
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    # --- layout ---
+
+    def _base(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def locate(self, sha256: str) -> Optional[str]:
+        """Path of the stored object, whatever codec it was written with."""
+        base = self._base(sha256.lower())
+        for suffix in SUFFIX.values():
+            if os.path.exists(base + suffix):
+                return base + suffix
+        return None
+
+    def exists(self, sha256: str) -> bool:
+        return self.locate(sha256) is not None
+
+    # --- writes ---
+
+    def put_stream(self, chunks: Iterable[bytes], compress: bool = True) -> StoredObject:
+        """Store an iterable of byte chunks; hashing and compression happen in one pass."""
+        codec = self.codec if compress else None
+        fd, tmp = tempfile.mkstemp(dir=self.tmp_dir, prefix="put_")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                sink = _Sink(f, codec, self.level)
+                for chunk in chunks:
+                    sink.write(chunk)
+                sink.close()
+                stored_size = f.tell()
+            sha = sink.h.hexdigest()
+            existing = self.locate(sha)
+            if existing:
+                os.remove(tmp)
+                return StoredObject(sha, existing, sink.size, os.path.getsize(existing),
+                                    _codec_of(existing), deduplicated=True)
+            dest = self._base(sha) + SUFFIX[codec]
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)
+            return StoredObject(sha, dest, sink.size, stored_size, codec)
+        except BaseException:
+            try: os.remove(tmp)
+            except OSError: pass
+            raise
+
+    def put_fileobj(self, f: BinaryIO, compress: bool = True) -> StoredObject:
+        return self.put_stream(iter(lambda: f.read(CHUNK), b""), compress)
+
+    def put_file(self, path: str, sha256: Optional[str] = None, compress: Optional[bool] = None,
+                 remove: bool = False) -> StoredObject:
+        """
+        Store a file from disk. With a known `sha256` already in the store the
+        file is not read at all. `compress` defaults to off for archive formats.
+        `remove` deletes the source once it is safely stored.
+        """
+        if compress is None:
+            compress = os.path.splitext(path)[1].lower() not in COMPRESSED_EXT
+        existing = self.locate(sha256) if sha256 else None
+        if existing:
+            obj = StoredObject(sha256.lower(), existing, os.path.getsize(path),
+                               os.path.getsize(existing), _codec_of(existing), deduplicated=True)
+        else:
+            with open(path, "rb") as f:
+                obj = self.put_fileobj(f, compress)
+        if remove:
+            os.remove(path)
+        return obj
+
+    # --- reads ---
+
+    def open(self, sha256: str) -> BinaryIO:
+        """Readable binary stream of the original bytes, decompressed on the fly."""
+        path = self.locate(sha256)
+        if path is None:
+            raise FileNotFoundError(sha256)
+        codec = _codec_of(path)
+        f = open(path, "rb")
+        if codec == "zstd":
+            if zstandard is None:
+                f.close()
+                raise RuntimeError("object is zstd-compressed; install 'zstandard'")
+            return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+        if codec == "gzip":
+            return _GzipReader(f)
+        return f
+
+    def iter_chunks(self, sha256: str, chunk_size: int = CHUNK) -> Iterator[bytes]:
+        with self.open(sha256) as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                yield chunk
+
+    def read_bytes(self, sha256: str) -> bytes:
+        with self.open(sha256) as f:
+            return f.read()
+
+
+class _GzipReader(gzip.GzipFile):
+    """GzipFile that also closes the underlying file."""
+
+    def __init__(self, f: BinaryIO):
+        super().__init__(fileobj=f, mode="rb")
+        self._raw = f
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._raw.close()
+
+
+def _codec_of(path: str) -> Optional[str]:
+    for codec, suffix in SUFFIX.items():
+        if suffix and path.endswith(suffix):
+            return codec
+    return None
+
+
+_store: Optional[RawStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> RawStore:
+    """Process-wide RawStore at RAW_STORE_DIR, created on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RawStore()
+        return _store
+
+
+def benchmark(data: bytes, codecs: Iterable[Optional[str]] = ("zstd", "gzip", None),
+              rounds: int = 3) -> dict:
+    """Compression ratio, write and read throughput per codec, in MB/s."""
+    mb = len(data) / (1024 * 1024)
+    out = dict(size_mb=round(mb, 2))
+    for codec in codecs:
+        if codec == "zstd" and zstandard is None:
+            out["zstd"] = "unavailable (pip install zstandard)"
+            continue
+        best_w = best_r = float("inf")
+        for _ in range(rounds):
+            root = tempfile.mkdtemp(prefix="rawstore_bench_")
+            try:
+                store = RawStore(root, codec=codec)
+                t0 = time.perf_counter()
+                obj = store.put_stream(data[i:i + CHUNK] for i in range(0, len(data), CHUNK))
+                best_w = min(best_w, time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                n = sum(len(c) for c in store.iter_chunks(obj.sha256))
+                best_r = min(best_r, time.perf_counter() - t0)
+                assert n == len(data)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+        out[codec or "none"] = dict(ratio=round(obj.size / max(obj.stored_size, 1), 2),
+                                    write_mb_per_s=round(mb / best_w, 1),
+                                    read_mb_per_s=round(mb / best_r, 1))
+    return out
+
+
+if __name__ == "__main__":
+    # python -m Services.Core.rawstore [file ...]
+    import sys, json
+    if len(sys.argv) > 1:
+        for p in sys.argv[1:]:
+            with open(p, "rb") as f:
+                print(p, json.dumps(benchmark(f.read()), indent=2))
+    else:
+        line = "user{0}@mail{1}.com:Pa55word{0} https://site{1}.net/login\n"
+        sample = "".join(line.format(i, i % 250) for i in range(500_000)).encode()
+        print(json.dumps(benchmark(sample), indent=2))
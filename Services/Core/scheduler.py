@@ -1,31 +1,111 @@
-import time, threading
-from Services.Crawlers import pastebin, telegram_dl, tor_monitor
-from Services.Cr_control.main import STATE  
+"""
+Periodic crawler runs on top of the durable job queue (Services.Core.jobqueue).
 
-sched = BackgroundScheduler()
+The scheduler only enqueues: every interval it adds a crawl job per enabled
+source, unless that source's previous run is still queued or running.
+Workers, one pool per source, claim and run the jobs; a crashed run is
+retried with backoff, and a dead worker's jobs go back to the queue when
+its lease runs out. Turning a source off (POST /toggle/{source}) stops
+both its schedule and its workers' claims, within a worker's poll interval.
 
-def job_pastebin():
-    if not STATE["pastebin_enabled"]: return
-    pastebin.run(limit=40)
+    python -m Services.Core.scheduler                      # scheduler + a worker per source
+    python -m Services.Core.scheduler worker pastebin [-c 8]  # one more pastebin worker process
+    python -m Services.Core.scheduler status
+"""
+import sys, json, time, asyncio, argparse, threading
+from typing import Dict
+
+from Services.Core.control import get_control
+from Services.Core.jobqueue import JobQueue, Worker, LANE_CRAWL
+
+# name -> (source, job kind, payload, interval seconds); a source's toggle
+# (Services.Core.control) gates both its schedule and its workers. Tor isn't
+# scheduled: tor_monitor has no run() yet, so every job would fail and retry
+SCHEDULES = {
+    "pastebin": ("pastebin", "pastebin.list", {"limit": 40}, 2 * 60),
+}
+WORKER_CONCURRENCY = {"pastebin": 8}
+TICK_SECONDS = 1.0
+PURGE_EVERY = 3600.0
+
+
+def handlers_for(source: str) -> Dict[str, object]:
+    # crawler modules are imported here so a worker only loads its own source's dependencies
+    if source == "pastebin":
+        from Services.Crawlers import pastebin
+        return pastebin.JOB_HANDLERS
+    raise ValueError(f"unknown source {source!r}")
+
+
+def make_worker(queue: JobQueue, source: str, concurrency: int) -> Worker:
+    control = get_control()
+
+    def on_result(job, status, reason):
+        control.record_job(source, status, reason, kind=job.kind, job_id=job.id, attempts=job.attempts)
+
+    return Worker(queue, source, handlers_for(source), concurrency,
+                  enabled=lambda: control.enabled(source), on_result=on_result)
+
+
+async def schedule_forever(queue: JobQueue):
+    control = get_control()
+    purged = 0.0
+    while True:
+        for name, (source, kind, payload, interval) in SCHEDULES.items():
+            if not control.enabled(source) or not await asyncio.to_thread(queue.due, name, interval):
+                continue
+            job_id = await asyncio.to_thread(queue.enqueue, source, kind, payload, LANE_CRAWL, f"schedule:{name}")
+            if job_id is None:
+                print(f"[scheduler] {name}: previous run still queued or running, skipped")
+                control.record_job(source, "skipped", "previous run still queued or running", kind=kind)
+        if time.monotonic() - purged > PURGE_EVERY:
+            purged = time.monotonic()
+            await asyncio.to_thread(queue.purge)
+        await asyncio.sleep(TICK_SECONDS)
+
+
+async def run_all(queue: JobQueue):
+    workers = [make_worker(queue, source, WORKER_CONCURRENCY.get(source, 1))
+               for source in dict.fromkeys(s[0] for s in SCHEDULES.values())]
+    await asyncio.gather(schedule_forever(queue), *(w.run() for w in workers))
 
-def job_tor():
-    if not STATE["tor_enabled"]: return
-    tor_monitor.run(forums=["test.onion"])
 
 def start():
-    sched.add_job(job_pastebin, "interval", minutes=2, id="pastebin")
-    sched.add_job(job_tor, "interval", minutes=5, id="tor")
-    sched.start()
+    queue = JobQueue()
+    threading.Thread(target=lambda: asyncio.run(run_all(queue)), name="scheduler", daemon=True).start()
     print("[scheduler] started")
     # Telegram runs as a long-lived listener in its own thread/process
-    if STATE["telegram_enabled"]:
+    if get_control().enabled("telegram"):
+        from Services.Crawlers import telegram_dl
         t = threading.Thread(target=lambda: asyncio.run(telegram_dl.run(["@testchannel"])),
                              daemon=True)
         t.start()
 
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m Services.Core.scheduler")
+    sub = ap.add_subparsers(dest="cmd")
+    w = sub.add_parser("worker", help="run a worker pool for one source")
+    w.add_argument("source", choices=sorted(WORKER_CONCURRENCY))
+    w.add_argument("-c", "--concurrency", type=int)
+    sub.add_parser("status", help="toggles and job counts per source and state")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "worker":
+        worker = make_worker(JobQueue(), args.source, args.concurrency or WORKER_CONCURRENCY[args.source])
+        try:
+            asyncio.run(worker.run())
+        except KeyboardInterrupt:
+            pass
+    elif args.cmd == "status":
+        print(json.dumps(dict(toggles=get_control().toggles(), jobs=JobQueue().counts()), indent=2))
+    else:
+        start()
+        try:
+            while True: time.sleep(10)
+        except KeyboardInterrupt:
+            pass
+
+
 if __name__ == "__main__":
-    start()
-    try:
-        while True: time.sleep(10)
-    except KeyboardInterrupt:
-        sched.shutdown()
+    main(sys.argv[1:])
@@ -1,5 +1,6 @@
+import os, json, time, string, threading
 from dataclasses import dataclass
-from typing import List, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 @dataclass
 class SignalCounts:
@@ -9,7 +10,7 @@ class SignalCounts:
     passwords: int = 0
     btc: int = 0
     urls: int = 0
-    keywords: int = 0   
+    keywords: int = 0
     watchlist_hits: int = 0
     size_bytes: int = 0
 
@@ -21,8 +22,249 @@ class SeverityResult:
 
 DEFAULT_THRESHOLDS = dict(low=0, medium=6, high=10)
 
+LABELS = ("low", "medium", "high")
+COUNT_FIELDS = ("emails", "ips", "domains", "passwords", "btc", "urls", "keywords", "watchlist_hits", "size_bytes")
+
+# --- rules ---
+#
+# A rule adds `points` when every field in `when` is at least its minimum;
+# `reason` may name count fields, e.g. "{emails} email(s)". Reasons come out
+# in rule order. A rules file (SEVERITY_RULES_PATH) is JSON:
+#
+#     {"thresholds": {"medium": 6, "high": 10},
+#      "rules": [{"when": {"emails": 1, "passwords": 1}, "points": 3, "reason": "email+password combo"}, ...]}
+#
+# Either key may be left out to keep the built-in one. Replace the file with
+# a rename (write elsewhere, then mv) so a reader never sees half of it.
+
+SEVERITY_RULES_PATH = os.environ.get("ATHR_SEVERITY_RULES")  # unset = built-in rules
+RULES_CHECK_INTERVAL = float(os.environ.get("ATHR_SEVERITY_RULES_CHECK", 5.0))
+SIGNAL_LOG_PATH = os.environ.get("ATHR_SIGNAL_LOG")  # unset = scored counts aren't kept
+
+DEFAULT_RULES = (
+    dict(when=dict(emails=1), points=1, reason="{emails} email(s)"),
+    dict(when=dict(emails=10), points=2, reason="email list"),
+    dict(when=dict(passwords=1), points=3, reason="password token(s) present"),
+    dict(when=dict(passwords=10), points=2, reason="bulk passwords"),
+    dict(when=dict(ips=1), points=1, reason="IP(s)"),
+    dict(when=dict(domains=1), points=1, reason="domain(s)"),
+    dict(when=dict(btc=1), points=1, reason="BTC address"),
+    dict(when=dict(urls=5), points=1, reason="many URLs"),
+    dict(when=dict(emails=1, passwords=1), points=3, reason="email+password combo"),
+    dict(when=dict(keywords=1), points=1, reason="keywords"),
+    dict(when=dict(keywords=3), points=1, reason="many keywords"),
+    dict(when=dict(size_bytes=50_001), points=1, reason=">50KB"),
+    dict(when=dict(watchlist_hits=1), points=4, reason="watchlist match"),
+)
+
+
+_SAMPLE_SIGNALS = SignalCounts()
+
+
+@dataclass(frozen=True)
+class Rule:
+    when: Tuple[Tuple[str, int], ...]   # (field, minimum), all must hold
+    points: int
+    reason: str
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any]) -> "Rule":
+        if not isinstance(raw, dict) or not isinstance(raw.get("when"), dict) or not raw["when"]:
+            raise ValueError(f"rule needs a non-empty 'when' object: {raw!r}")
+        when = []
+        for field_name, minimum in raw["when"].items():
+            if field_name not in COUNT_FIELDS:
+                raise ValueError(f"unknown count field {field_name!r} (expected one of {', '.join(COUNT_FIELDS)})")
+            if not isinstance(minimum, int) or isinstance(minimum, bool):
+                raise ValueError(f"minimum for {field_name!r} must be an integer, got {minimum!r}")
+            when.append((field_name, minimum))
+        points = raw.get("points")
+        if not isinstance(points, int) or isinstance(points, bool) or not -1000 <= points <= 1000:
+            raise ValueError(f"points must be an integer in [-1000, 1000], got {points!r}")
+        reason = raw.get("reason", "")
+        if not isinstance(reason, str):
+            raise ValueError(f"reason must be a string, got {reason!r}")
+        try:
+            for _, name, spec, _ in string.Formatter().parse(reason):
+                if name is not None and (name not in COUNT_FIELDS or "{" in (spec or "")):
+                    raise ValueError(f"reason {reason!r}: only plain count fields can be used, not {name!r}")
+        except ValueError as e:
+            raise ValueError(str(e)) from None
+        # conversions and format specs are only checked by compiling and
+        # formatting: "{emails!x}" doesn't compile, "{emails:s}" fails per call
+        try:
+            eval(compile(_reason_expr(reason), "<reason>", "eval"), {}, {"sig": _SAMPLE_SIGNALS})
+        except (SyntaxError, ValueError, TypeError) as e:
+            raise ValueError(f"reason {reason!r} cannot be formatted: {e}") from None
+        return cls(tuple(when), points, reason)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(when=dict(self.when), points=self.points, reason=self.reason)
+
+
+def _reason_expr(reason: str) -> str:
+    """`reason` as a Python expression over `sig`: "{emails} email(s)" -> f'{sig.emails} email(s)'."""
+    parts, text, fields = [], [], False
+    for literal, name, spec, conversion in string.Formatter().parse(reason):
+        parts.append(literal.replace("{", "{{").replace("}", "}}"))
+        text.append(literal)
+        if name is not None:
+            fields = True
+            parts.append("{sig." + name + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+    return "f" + repr("".join(parts)) if fields else repr("".join(text))
+
+
+class RuleSet:
+    """
+    Rules and thresholds, compiled once: `score` is a generated function
+    with one `if` per rule (the same code score_severity used to be by
+    hand), and `score_batch` runs the rules as precomputed column masks.
+    Instances are never mutated; a reload builds a new one.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = DEFAULT_RULES,
+                 thresholds: Optional[Dict[str, int]] = None, source: str = "built-in"):
+        self.rules = tuple(rule if isinstance(rule, Rule) else Rule.from_dict(rule) for rule in rules)
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        for key in ("medium", "high"):
+            if not isinstance(self.thresholds[key], int) or isinstance(self.thresholds[key], bool):
+                raise ValueError(f"threshold {key!r} must be an integer, got {self.thresholds[key]!r}")
+        self.source = source
+        self.max_abs_score = sum(abs(rule.points) for rule in self.rules)
+        self._score = self._compile()
+
+    @classmethod
+    def from_dict(cls, raw: Dict[str, Any], source: str = "dict") -> "RuleSet":
+        if not isinstance(raw, dict):
+            raise ValueError("rules config must be a JSON object")
+        unknown = set(raw) - {"rules", "thresholds"}
+        if unknown:
+            raise ValueError(f"unknown keys in rules config: {', '.join(sorted(unknown))}")
+        thresholds = raw.get("thresholds")
+        if thresholds is not None and (not isinstance(thresholds, dict) or set(thresholds) - set(DEFAULT_THRESHOLDS)):
+            raise ValueError(f"thresholds must be an object with keys among {', '.join(DEFAULT_THRESHOLDS)}")
+        return cls(raw.get("rules", DEFAULT_RULES), thresholds, source)
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSet":
+        with open(path, encoding="utf-8") as f:
+            try:
+                raw = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}") from None
+        return cls.from_dict(raw, source=path)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(thresholds=dict(self.thresholds), rules=[rule.as_dict() for rule in self.rules])
+
+    def _compile(self):
+        # field names are checked against COUNT_FIELDS, minimums/points are
+        # ints and reason text goes through repr(), so all are safe to inline
+        lines = ["def score(sig, medium, high):", "    score = 0", "    reasons = []"]
+        for rule in self.rules:
+            lines.append("    if " + " and ".join(f"sig.{f} >= {m}" for f, m in rule.when) + ":")
+            lines.append(f"        score += {rule.points}")
+            lines.append(f"        reasons.append({_reason_expr(rule.reason)})")
+        lines += ['    label = "high" if score >= high else "medium" if score >= medium else "low"',
+                  "    return SeverityResult(score=score, label=label, reasons=reasons)"]
+        namespace: Dict[str, Any] = {"SeverityResult": SeverityResult}
+        try:
+            exec(compile("\n".join(lines), f"<severity rules: {self.source}>", "exec"), namespace)
+            namespace["score"](_SAMPLE_SIGNALS, 0, 0)  # every reason formats, every condition evaluates
+        except (SyntaxError, ValueError, TypeError) as e:
+            raise ValueError(f"{self.source}: rules don't compile: {e}") from None
+        return namespace["score"]
+
+    def score(self, sig: SignalCounts, thresholds: Optional[Dict[str, int]] = None) -> SeverityResult:
+        thresholds = thresholds or self.thresholds
+        return self._score(sig, thresholds["medium"], thresholds["high"])
+
+    def score_batch(self, cols: Dict[str, "np.ndarray"], n: int,
+                    thresholds: Optional[Dict[str, int]] = None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """(score, label code int8) over full columns; see score_severity_batch."""
+        thresholds = thresholds or self.thresholds
+        # int16 halves the memory traffic and holds the built-in rules many
+        # times over; a rule set (or threshold) that could leave its range is
+        # scored in int64 instead of wrapping around. Plain in-place adds of
+        # the boolean masks beat masked ufuncs (where=)
+        bound = max(self.max_abs_score, abs(thresholds["medium"]), abs(thresholds["high"]))
+        dtype = np.int16 if bound <= np.iinfo(np.int16).max else np.int64
+        score = np.zeros(n, dtype=dtype)
+        for rule in self.rules:
+            (field_name, minimum), rest = rule.when[0], rule.when[1:]
+            hit = cols[field_name] >= minimum
+            for field_name, minimum in rest:
+                hit &= cols[field_name] >= minimum
+            score += hit if rule.points == 1 else hit * dtype(rule.points)
+        label = (score >= thresholds["medium"]).astype(np.int8)
+        label[score >= thresholds["high"]] = 2
+        return score, label
+
+
+BUILTIN_RULES = RuleSet()
+
+_rules = BUILTIN_RULES
+_rules_sig: Optional[Tuple] = None
+_rules_checked = 0.0
+_rules_lock = threading.Lock()
+
+
+def _file_signature(path: str) -> Optional[Tuple]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def reload_rules(path: Optional[str] = SEVERITY_RULES_PATH) -> RuleSet:
+    """
+    Load and compile `path` and make it the active RuleSet. On a bad or
+    missing file the active one stays in place and the error is raised.
+    """
+    global _rules, _rules_sig, _rules_checked
+    with _rules_lock:
+        _rules_checked = time.monotonic()
+        if not path:
+            _rules, _rules_sig = BUILTIN_RULES, None
+            return _rules
+        sig = _file_signature(path)
+        _rules_sig = sig  # a broken file is reported once, not on every check
+        rules = RuleSet.load(path)
+        _rules = rules    # a single reference swap: callers see the old or the new set, whole
+        return rules
+
+
+def get_rules() -> RuleSet:
+    """
+    The active RuleSet. With SEVERITY_RULES_PATH set, the file is checked
+    at most every RULES_CHECK_INTERVAL seconds and recompiled when it
+    changed, in every process that scores (crawlers, analysis workers),
+    without a restart. A file that fails to load keeps the previous rules.
+    """
+    global _rules_checked
+    if not SEVERITY_RULES_PATH or time.monotonic() - _rules_checked < RULES_CHECK_INTERVAL:
+        return _rules
+    if _file_signature(SEVERITY_RULES_PATH) == _rules_sig:
+        _rules_checked = time.monotonic()
+        return _rules
+    try:
+        reload_rules(SEVERITY_RULES_PATH)
+        print(f"[severity] rules loaded from {SEVERITY_RULES_PATH}")
+    except (OSError, ValueError, SyntaxError) as e:
+        print(f"[severity] keeping previous rules, cannot load {SEVERITY_RULES_PATH}: {e}")
+    return _rules
+
+
 def score_severity(sig: SignalCounts,
-                   thresholds: Dict[str, int] = DEFAULT_THRESHOLDS) -> SeverityResult:
+                   thresholds: Optional[Dict[str, int]] = None) -> SeverityResult:
+    """Score `sig` with the active rules; `thresholds` overrides the rule set's."""
+    return get_rules().score(sig, thresholds)
+
+
+def _score_severity_reference(sig: SignalCounts,
+                              thresholds: Dict[str, int] = DEFAULT_THRESHOLDS) -> SeverityResult:
+    # the hand-written rules DEFAULT_RULES replaced; kept for parity checks
     score, reasons = 0, []
 
     # Core signals
@@ -55,3 +297,219 @@ def score_severity(sig: SignalCounts,
         label = "medium"
 
     return SeverityResult(score=score, label=label, reasons=reasons)
+
+
+# --- signal log: what replay re-scores ---
+
+_signal_log = None
+_signal_log_lock = threading.Lock()
+
+
+def record_signals(sig: SignalCounts, result: SeverityResult, source: str = ""):
+    """
+    Append `sig` and the verdict it got to SIGNAL_LOG_PATH as one JSON line
+    (no-op when unset). Each line is a single O_APPEND write, so the
+    crawler processes can share one log.
+    """
+    global _signal_log
+    if not SIGNAL_LOG_PATH:
+        return
+    row = {f: getattr(sig, f) for f in COUNT_FIELDS}
+    row.update(ts=round(time.time(), 3), score=result.score, label=result.label, source=source)
+    line = (json.dumps(row, separators=(",", ":")) + "\n").encode()
+    with _signal_log_lock:
+        if _signal_log is None:
+            os.makedirs(os.path.dirname(os.path.abspath(SIGNAL_LOG_PATH)), exist_ok=True)
+            _signal_log = os.open(SIGNAL_LOG_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(_signal_log, line)
+
+
+# --- batch scoring ---
+
+try:
+    import numpy as np
+except ImportError:  # only the batch API needs it
+    np = None
+
+
+@dataclass
+class SeverityBatch:
+    score: "np.ndarray"              # int16 per row (int64 for rule sets that could overflow it)
+    label_code: "np.ndarray"         # int8 index into LABELS per row
+    counts: Dict[str, "np.ndarray"]
+    rules: RuleSet = BUILTIN_RULES   # what scored it; reasons are built with the same set
+
+    def __len__(self):
+        return len(self.score)
+
+    @property
+    def label(self) -> "np.ndarray":
+        return np.asarray(LABELS)[self.label_code]
+
+    def signals(self, i: int) -> SignalCounts:
+        return SignalCounts(**{f: int(self.counts[f][i]) for f in COUNT_FIELDS})
+
+    def reasons(self, i: int) -> List[str]:
+        """Reasons for row `i`, built only when asked for (same strings as score_severity)."""
+        return self.rules.score(self.signals(i)).reasons
+
+    def result(self, i: int) -> SeverityResult:
+        return SeverityResult(int(self.score[i]), LABELS[self.label_code[i]], self.reasons(i))
+
+
+def _columns(counts) -> Tuple[Dict[str, "np.ndarray"], int]:
+    names = getattr(counts, "dtype", None)
+    names = names.names if names is not None else (getattr(counts, "column_names", None) or list(counts))
+    cols = {f: np.asarray(counts[f]) for f in COUNT_FIELDS if f in names}
+    if not cols:
+        raise ValueError("no count columns given")
+    n = len(next(iter(cols.values())))
+    zeros = None
+    for f in COUNT_FIELDS:
+        if f not in cols:
+            if zeros is None:
+                zeros = np.zeros(n, dtype=np.int8)
+            cols[f] = zeros
+    return cols, n
+
+
+def score_severity_batch(counts, thresholds: Optional[Dict[str, int]] = None,
+                         rules: Optional[RuleSet] = None) -> SeverityBatch:
+    """
+    score_severity over columns: `counts` maps field names to equal-length
+    integer arrays (dict of NumPy arrays or lists, a NumPy structured array,
+    a pyarrow Table/RecordBatch, ...); missing fields count as 0. One pass
+    per rule over whole columns, no per-row Python. `rules` defaults to the
+    active rule set.
+    """
+    if np is None:
+        raise ImportError("score_severity_batch needs numpy")
+    rules = rules or get_rules()
+    cols, n = _columns(counts)
+    score, label = rules.score_batch(cols, n, thresholds)
+    return SeverityBatch(score, label, cols, rules)
+
+
+def check_batch_parity(rows: int = 200_000, seed: int = 0,
+                       thresholds: Optional[Dict[str, int]] = None,
+                       rules: Optional[RuleSet] = None) -> int:
+    """
+    Randomized parity check of the batch path against the compiled scalar
+    one (and, for the built-in rules, against the hand-written original).
+    Counts are drawn around every rule boundary (and from a wide range);
+    raises AssertionError on the first differing row. Returns rows checked.
+    """
+    rules = rules or BUILTIN_RULES
+    rng = np.random.default_rng(seed)
+    edges = {0, 1, 2, 3, 4, 5, 6, 9, 10, 11, 49_999, 50_000, 50_001, 10 ** 6}
+    edges.update(m + d for rule in rules.rules for _, m in rule.when for d in (-1, 0, 1) if m + d >= 0)
+    edges = np.array(sorted(edges))
+    cols = {}
+    for f in COUNT_FIELDS:
+        pick_edge = rng.random(rows) < 0.7
+        cols[f] = np.where(pick_edge, rng.choice(edges, rows), rng.integers(0, 100_000, rows)).astype(np.int64)
+    batch = score_severity_batch(cols, thresholds, rules)
+    reference = _score_severity_reference if rules is BUILTIN_RULES else None
+    for i in range(rows):
+        sig = batch.signals(i)
+        expected = rules.score(sig, thresholds)
+        got = batch.result(i)
+        assert (got.score, got.label) == (expected.score, expected.label), (i, sig, got, expected)
+        assert got.reasons == expected.reasons
+        if reference is not None:
+            assert reference(sig, thresholds or DEFAULT_THRESHOLDS) == expected, (i, sig, expected)
+    return rows
+
+
+# --- replay ---
+
+def load_signals(path: str) -> Dict[str, "np.ndarray"]:
+    """Count columns from a signal log (JSON lines) or a CSV with COUNT_FIELDS headers."""
+    import csv
+    cols: Dict[str, List[int]] = {f: [] for f in COUNT_FIELDS}
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows: Iterable[Dict[str, Any]] = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            for name, values in cols.items():
+                values.append(int(row.get(name) or 0))
+    return {name: np.asarray(values, dtype=np.int64) for name, values in cols.items()}
+
+
+def replay(counts, candidate: RuleSet, baseline: Optional[RuleSet] = None) -> Dict[str, Any]:
+    """
+    Re-score stored counts with `baseline` (default: the active rules) and
+    `candidate`, and report how the label distribution moves: counts per
+    label under each, and a baseline -> candidate transition table.
+    """
+    if np is None:
+        raise ImportError("replay needs numpy")
+    baseline = baseline or get_rules()
+    cols, n = _columns(counts)
+    t0 = time.perf_counter()
+    before_score, before = baseline.score_batch(cols, n)
+    after_score, after = candidate.score_batch(cols, n)
+    elapsed = time.perf_counter() - t0
+    moved = np.bincount(before.astype(np.int64) * 3 + after, minlength=9).reshape(3, 3)
+    return dict(
+        rows=n,
+        baseline=baseline.source,
+        candidate=candidate.source,
+        before={label: int(c) for label, c in zip(LABELS, np.bincount(before, minlength=3))},
+        after={label: int(c) for label, c in zip(LABELS, np.bincount(after, minlength=3))},
+        transitions={f"{LABELS[a]}->{LABELS[b]}": int(moved[a, b]) for a in range(3) for b in range(3)
+                     if a != b and moved[a, b]},
+        changed=int(n - np.trace(moved)),
+        mean_score_delta=round(float((after_score.astype(np.int64) - before_score).mean()), 3) if n else 0.0,
+        seconds=round(elapsed, 3),
+    )
+
+
+def benchmark(rows: int = 10_000_000, scalar_rows: int = 200_000, seed: int = 1) -> Dict[str, float]:
+    """Rows/s of score_severity (on a sample) vs. score_severity_batch on `rows` int32 columns."""
+    rng = np.random.default_rng(seed)
+    cols = {f: rng.integers(0, 12, rows, dtype=np.int32) for f in COUNT_FIELDS}
+    cols["size_bytes"] = rng.integers(0, 200_000, rows, dtype=np.int32)
+
+    sample = [SignalCounts(**{f: int(cols[f][i]) for f in COUNT_FIELDS}) for i in range(min(scalar_rows, rows))]
+    t0 = time.perf_counter()
+    for sig in sample:
+        _score_severity_reference(sig)
+    reference_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for sig in sample:
+        score_severity(sig)
+    scalar_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch = score_severity_batch(cols)
+    batch_s = time.perf_counter() - t0
+    return dict(
+        rows=rows,
+        reference_rows_per_s=round(len(sample) / reference_s),
+        scalar_rows_per_s=round(len(sample) / scalar_s),
+        batch_rows_per_s=round(rows / batch_s),
+        batch_seconds=round(batch_s, 3),
+        scalar_seconds_extrapolated=round(rows * scalar_s / len(sample), 1),
+        high=int((batch.label_code == 2).sum()),
+    )
+
+
+if __name__ == "__main__":
+    # python -m Services.Core.severity [rows]
+    # python -m Services.Core.severity replay signals.jsonl|counts.csv --rules new.json [--baseline old.json]
+    import sys, argparse
+    if sys.argv[1:2] == ["replay"]:
+        ap = argparse.ArgumentParser(prog="python -m Services.Core.severity replay")
+        ap.add_argument("signals", help="signal log (ATHR_SIGNAL_LOG) or CSV of counts")
+        ap.add_argument("--rules", required=True, help="candidate rules file")
+        ap.add_argument("--baseline", help="rules to compare against (default: the active ones)")
+        args = ap.parse_args(sys.argv[2:])
+        baseline = RuleSet.load(args.baseline) if args.baseline else None
+        print(json.dumps(replay(load_signals(args.signals), RuleSet.load(args.rules), baseline), indent=2))
+    else:
+        print(f"parity ok on {check_batch_parity()} rows")
+        print(json.dumps(benchmark(*(int(a) for a in sys.argv[1:2])), indent=2))
@@ -1,13 +1,151 @@
+import time, asyncio, threading
 import psutil
+from collections import deque
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class GuardConfig:
-    min_free_gb: float = 10.0     
-    max_cpu_pct: float = 85.0     
-    max_active_downloads: int = 3 
+    min_free_gb: float = 10.0
+    max_cpu_pct: float = 85.0
+    max_active_downloads: int = 3
+    max_mem_pct: float = 95.0
+    sample_interval: float = 1.0  # seconds between background samples
+    cpu_window: int = 5           # samples averaged for the CPU reading
+    disk_path: str = "/"
+
+@dataclass(frozen=True)
+class Snapshot:
+    cpu_pct: float
+    free_gb: float
+    mem_pct: float
+    ts: float
+
+class ResourceGuard:
+    """
+    Keeps a rolling CPU/disk/memory snapshot from a background thread so
+    checks are O(1) reads, and counts active downloads against
+    `max_active_downloads`.
+
+    `try_acquire`/`release` claim a download slot; `acquire` (threads) and
+    `acquire_async` (event loops) wait until one is available. Waiters are
+    woken on every sample and every release.
+    """
+
+    def __init__(self, cfg: Optional[GuardConfig] = None):
+        self.cfg = cfg or GuardConfig()
+        self.active = 0
+        self._cpu = deque(maxlen=self.cfg.cpu_window)
+        self._cond = threading.Condition()
+        self._async_waiters = set()
+        psutil.cpu_percent(interval=None)   # prime: the first reading is meaningless
+        self.snapshot = self._sample()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-guard", daemon=True)
+        self._thread.start()
+
+    # --- sampler ---
+
+    def _sample(self) -> Snapshot:
+        self._cpu.append(psutil.cpu_percent(interval=None))
+        return Snapshot(
+            cpu_pct=sum(self._cpu) / len(self._cpu),
+            free_gb=psutil.disk_usage(self.cfg.disk_path).free / (1024**3),
+            mem_pct=psutil.virtual_memory().percent,
+            ts=time.time(),
+        )
+
+    def _run(self):
+        while not self._stop.wait(self.cfg.sample_interval):
+            try:
+                self.snapshot = self._sample()
+            except Exception as e:
+                print(f"[guard] sample failed: {e}")
+            self._notify()
+
+    def _notify(self):
+        with self._cond:
+            self._cond.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, ev in waiters:
+            try: loop.call_soon_threadsafe(ev.set)
+            except RuntimeError: pass   # loop already closed
+
+    def stop(self):
+        self._stop.set()
+
+    # --- checks ---
+
+    def healthy(self, cfg: Optional[GuardConfig] = None) -> bool:
+        cfg = cfg or self.cfg
+        s = self.snapshot
+        return s.free_gb >= cfg.min_free_gb and s.cpu_pct <= cfg.max_cpu_pct and s.mem_pct <= cfg.max_mem_pct
+
+    def can_download(self, cfg: Optional[GuardConfig] = None) -> bool:
+        cfg = cfg or self.cfg
+        return self.active < cfg.max_active_downloads and self.healthy(cfg)
+
+    # --- download slots ---
+
+    def try_acquire(self, cfg: Optional[GuardConfig] = None) -> bool:
+        with self._cond:
+            if not self.can_download(cfg):
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.active = max(0, self.active - 1)
+        self._notify()
+
+    def acquire(self, timeout: Optional[float] = None, cfg: Optional[GuardConfig] = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.can_download(cfg):
+                left = None if deadline is None else deadline - time.monotonic()
+                if left is not None and left <= 0:
+                    return False
+                self._cond.wait(left)
+            self.active += 1
+            return True
+
+    async def acquire_async(self, timeout: Optional[float] = None,
+                            cfg: Optional[GuardConfig] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        ev = asyncio.Event()
+        waiter = (loop, ev)
+        try:
+            while True:
+                with self._cond:
+                    if self.can_download(cfg):
+                        self.active += 1
+                        return True
+                    ev.clear()
+                    self._async_waiters.add(waiter)
+                left = None if deadline is None else deadline - loop.time()
+                if left is not None and left <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(ev.wait(), left)
+                except asyncio.TimeoutError:
+                    return False
+        finally:
+            with self._cond:
+                self._async_waiters.discard(waiter)
+
+_guard: Optional[ResourceGuard] = None
+_guard_lock = threading.Lock()
+
+def get_guard(cfg: Optional[GuardConfig] = None) -> ResourceGuard:
+    """Process-wide ResourceGuard; the sampler starts on first use."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = ResourceGuard(cfg)
+        return _guard
 
 def can_download(cfg: GuardConfig) -> bool:
-    free_gb = psutil.disk_usage("/").free / (1024**3)
-    cpu = psutil.cpu_percent(interval=0.2)
-    return free_gb >= cfg.min_free_gb and cpu <= cfg.max_cpu_pct
\ No newline at end of file
+    # non-blocking: reads the sampler's latest snapshot
+    return get_guard().can_download(cfg)
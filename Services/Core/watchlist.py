@@ -0,0 +1,449 @@
+import os, re, json, time, sqlite3, threading, ipaddress
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from Services.Core.extractors import Entity, _DOMAIN_SCAN, _IP_SCAN
+
+# admin DB holding `organizations` (domains / ip_ranges / keywords JSON per tenant)
+ADMIN_DB_PATH = os.environ.get("ATHR_ADMIN_DB")  # unset = no watchlist
+REFRESH_INTERVAL = 30.0
+
+_TERMINAL = ""        # key of the org-id set in a domain trie node (never a real label)
+_WORD = re.compile(r"\w+")
+
+
+def _labels(domain: str) -> List[str]:
+    return domain.strip().strip(".").lower().split(".")[::-1]
+
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick over word tokens: a keyword is a sequence of \\w+ tokens
+    ("Q4 Financials" -> q4, financials) and matches where those tokens appear
+    consecutively in the text, case-insensitively. Working on tokens instead
+    of characters keeps the Python loop at one step per word, and tokens
+    outside every keyword reset to the root without walking fail links.
+    """
+
+    def __init__(self, keywords: Dict[Tuple[str, ...], Set[str]]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.out: List[Dict[str, Set[str]]] = [{}]  # keywords ending here -> their org ids
+        self.vocab: Set[str] = set()
+        for tokens, orgs in keywords.items():
+            node = 0
+            for tok in tokens:
+                nxt = self.goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][tok] = nxt
+                    self.goto.append({}); self.out.append({})
+                node = nxt
+            self.out[node][" ".join(tokens)] = orgs
+            self.vocab.update(tokens)
+        # breadth-first fail links; outputs of the fail target are merged in
+        self.fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for tok, child in self.goto[node].items():
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(tok, 0)
+                self.fail[child] = target if target != child else 0
+                self.out[child].update(self.out[self.fail[child]])
+                queue.append(child)
+
+    def scan(self, tokens: Iterable[str], state: int = 0, hits: Optional[Dict[str, Set[str]]] = None):
+        """Feeds lower-cased tokens from `state`; returns (state, org id -> keywords)."""
+        hits = {} if hits is None else hits
+        goto, fail, out, vocab = self.goto, self.fail, self.out, self.vocab
+        for tok in tokens:
+            if tok not in vocab:
+                state = 0
+                continue
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            if out[state]:
+                for word, orgs in out[state].items():
+                    for org in orgs:
+                        hits.setdefault(org, set()).add(f"keyword:{word}")
+        return state, hits
+
+
+class WatchlistIndex:
+    """
+    Tenant watchlists (domains, IP ranges, keywords), compiled for lookup:
+
+    - domains: a trie over reversed labels (com -> corp -> mail); a domain,
+      email or URL host walks it once and collects every tenant domain it
+      equals or is a subdomain of
+    - IP ranges: per (version, prefix length) a dict of network -> tenants;
+      an address probes each prefix length in use (at most 33 / 129 dict hits)
+    - keywords: a word-level Aho-Corasick automaton, rebuilt on first use
+      after a keyword change
+
+    Lookup cost depends on the entity, not on the number of tenants.
+    `set_org` / `remove_org` update the trie and the IP tables in place, so a
+    refresh from the admin DB only touches organizations that changed.
+    """
+
+    def __init__(self):
+        self._orgs: Dict[str, Tuple[Tuple[str, ...], Tuple, Tuple[Tuple[str, ...], ...]]] = {}
+        self._trie: Dict[str, dict] = {}
+        self._networks: Dict[Tuple[int, int], Dict[int, Set[str]]] = {}
+        self._probes: Dict[int, List[Tuple[int, Dict[int, Set[str]]]]] = {4: [], 6: []}
+        self._keywords: Dict[Tuple[str, ...], Set[str]] = {}
+        self._automaton: Optional[_KeywordAutomaton] = None
+        self._lock = threading.Lock()
+
+    # --- building ---
+
+    @staticmethod
+    def _normalize(domains: Iterable[str], ip_ranges: Iterable[str], keywords: Iterable[str]):
+        doms = tuple(sorted({d.strip().strip(".").lower() for d in domains if d and d.strip(". ")}))
+        nets = set()
+        for r in ip_ranges:
+            try:
+                net = ipaddress.ip_network(str(r).strip(), strict=False)
+            except ValueError:
+                continue  # not a network; the admin UI stores free text
+            nets.add((net.version, net.prefixlen, int(net.network_address)))
+        kws = tuple(sorted({tuple(_WORD.findall(k.lower())) for k in keywords if k} - {()}))
+        return doms, tuple(sorted(nets)), kws
+
+    def _rebuild_probes(self):
+        probes = {4: [], 6: []}
+        for (version, prefixlen), table in self._networks.items():
+            bits = 32 if version == 4 else 128
+            probes[version].append((((1 << prefixlen) - 1) << (bits - prefixlen), table))
+        self._probes = probes
+
+    def _add(self, org_id: str, entry):
+        doms, nets, kws = entry
+        for domain in doms:
+            node = self._trie
+            for label in _labels(domain):
+                node = node.setdefault(label, {})
+            node.setdefault(_TERMINAL, set()).add(org_id)
+        new_tables = False
+        for version, prefixlen, network in nets:
+            table = self._networks.get((version, prefixlen))
+            if table is None:
+                table = self._networks[(version, prefixlen)] = {}
+                new_tables = True
+            table.setdefault(network, set()).add(org_id)
+        if new_tables:
+            self._rebuild_probes()
+        for tokens in kws:
+            self._keywords.setdefault(tokens, set()).add(org_id)
+        if kws:
+            self._automaton = None
+        self._orgs[org_id] = entry
+
+    def _remove(self, org_id: str):
+        entry = self._orgs.pop(org_id, None)
+        if entry is None:
+            return
+        doms, nets, kws = entry
+        for domain in doms:
+            path, node = [], self._trie
+            for label in _labels(domain):
+                path.append((node, label))
+                node = node.get(label)
+                if node is None:
+                    break
+            else:
+                node.get(_TERMINAL, set()).discard(org_id)
+                if not node.get(_TERMINAL, True):
+                    del node[_TERMINAL]
+                # prune nodes left empty, deepest first
+                for parent, label in reversed(path):
+                    if parent[label]:
+                        break
+                    del parent[label]
+        dropped_tables = False
+        for version, prefixlen, network in nets:
+            table = self._networks.get((version, prefixlen), {})
+            orgs = table.get(network)
+            if orgs is not None:
+                orgs.discard(org_id)
+                if not orgs:
+                    del table[network]
+            if not table:
+                self._networks.pop((version, prefixlen), None)
+                dropped_tables = True
+        if dropped_tables:
+            self._rebuild_probes()
+        for tokens in kws:
+            orgs = self._keywords.get(tokens)
+            if orgs is not None:
+                orgs.discard(org_id)
+                if not orgs:
+                    del self._keywords[tokens]
+        if kws:
+            self._automaton = None
+
+    def set_org(self, org_id: str, domains: Iterable[str] = (), ip_ranges: Iterable[str] = (),
+                keywords: Iterable[str] = ()) -> bool:
+        """Adds or replaces one tenant's watchlist. Returns False if nothing changed."""
+        entry = self._normalize(domains, ip_ranges, keywords)
+        with self._lock:
+            if self._orgs.get(org_id) == entry:
+                return False
+            self._remove(org_id)
+            self._add(org_id, entry)
+            return True
+
+    def remove_org(self, org_id: str) -> bool:
+        with self._lock:
+            if org_id not in self._orgs:
+                return False
+            self._remove(org_id)
+            return True
+
+    def sync(self, rows: Iterable[Tuple[str, Optional[str], Optional[str], Optional[str]]]) -> int:
+        """
+        Makes the index match `rows` of (org_id, domains, ip_ranges, keywords)
+        JSON columns, as stored in the admin DB's organizations table.
+        Returns the number of organizations added, changed or removed.
+        """
+        changed, present = 0, set()
+        for org_id, domains, ip_ranges, keywords in rows:
+            present.add(org_id)
+            changed += self.set_org(org_id, json.loads(domains or "[]"),
+                                    json.loads(ip_ranges or "[]"), json.loads(keywords or "[]"))
+        for org_id in set(self._orgs) - present:
+            changed += self.remove_org(org_id)
+        return changed
+
+    def sync_from_db(self, path: str) -> int:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT org_id, domains, ip_ranges, keywords FROM organizations").fetchall()
+        finally:
+            conn.close()
+        return self.sync(rows)
+
+    def __len__(self):
+        return len(self._orgs)
+
+    # --- lookups ---
+
+    def match_domain(self, domain: str) -> Set[str]:
+        """Tenants with `domain` or one of its parent domains on their watchlist."""
+        hits: Set[str] = set()
+        node = self._trie
+        for label in _labels(domain):
+            node = node.get(label)
+            if node is None:
+                break
+            terminal = node.get(_TERMINAL)
+            if terminal:
+                hits |= terminal
+        return hits
+
+    def match_ip(self, ip: str) -> Set[str]:
+        """Tenants with a range containing `ip`."""
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return set()
+        value = int(addr)
+        hits: Set[str] = set()
+        for mask, table in self._probes[addr.version]:
+            orgs = table.get(value & mask)
+            if orgs:
+                hits |= orgs
+        return hits
+
+    def _automaton_for_scan(self) -> _KeywordAutomaton:
+        automaton = self._automaton
+        if automaton is None:
+            with self._lock:
+                if self._automaton is None:
+                    self._automaton = _KeywordAutomaton(self._keywords)
+                automaton = self._automaton
+        return automaton
+
+    def match_keywords(self, text: str) -> Dict[str, Set[str]]:
+        """Tenant id -> "keyword:..." hits in `text`."""
+        return self._automaton_for_scan().scan(_WORD.findall(text.lower()))[1]
+
+    def match_entity(self, entity: Entity) -> Set[str]:
+        if entity.type == "ip":
+            return self.match_ip(entity.value)
+        if entity.type == "domain":
+            return self.match_domain(entity.value)
+        if entity.type == "email":
+            return self.match_domain(entity.value.rpartition("@")[2])
+        if entity.type == "url":
+            try:
+                host = urlsplit(entity.value).hostname or ""
+            except ValueError:
+                return set()
+            return self.match_ip(host) if _IP_SCAN.fullmatch(host) else self.match_domain(host)
+        return set()
+
+    def match_entities(self, entities: Iterable[Entity]) -> Dict[str, Set[str]]:
+        """Tenant id -> the "type:value" entities that hit its watchlist."""
+        hits: Dict[str, Set[str]] = {}
+        for entity in entities:
+            for org in self.match_entity(entity):
+                hits.setdefault(org, set()).add(f"{entity.type}:{entity.value}")
+        return hits
+
+    def watchlist_hit(self, entities: Iterable[Entity]) -> bool:
+        return any(self.match_entity(e) for e in entities)
+
+    def scanner(self) -> "WatchlistScanner":
+        return WatchlistScanner(self)
+
+    def match_text(self, text: str) -> Dict[str, Set[str]]:
+        """Tenant id -> domain / IP / keyword hits anywhere in `text`."""
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.hits
+
+
+class WatchlistScanner:
+    """
+    Incremental match_text over segments that end on a non-word character
+    (what StreamScanner passes on): domains and IPs are matched per segment,
+    keyword automaton state carries over so phrases may span segments.
+    """
+
+    def __init__(self, index: WatchlistIndex, max_seen: int = 200_000):
+        self.index = index
+        self.hits: Dict[str, Set[str]] = {}
+        self.max_seen = max_seen
+        self._automaton = index._automaton_for_scan()
+        self._state = 0
+        self._seen: Set[str] = set()  # domains/IPs already looked up (gmail.com repeats a lot)
+
+    def _unseen(self, rx: "re.Pattern[str]", text: str) -> Set[str]:
+        # findall + set difference run in C; only new values reach the Python loop
+        if rx.groups:
+            found = {m.group(0) for m in rx.finditer(text)}
+        else:
+            found = set(rx.findall(text))
+        found -= self._seen
+        if len(self._seen) > self.max_seen:
+            self._seen.clear()
+        self._seen |= found
+        return found
+
+    def _add(self, orgs: Set[str], hit: str):
+        for org in orgs:
+            self.hits.setdefault(org, set()).add(hit)
+
+    def feed(self, text: str) -> None:
+        low = text.lower()
+        if "." in low:
+            for value in self._unseen(_DOMAIN_SCAN, low):
+                orgs = self.index.match_domain(value)
+                if orgs:
+                    self._add(orgs, f"domain:{value}")
+            for value in self._unseen(_IP_SCAN, low):
+                orgs = self.index.match_ip(value)
+                if orgs:
+                    self._add(orgs, f"ip:{value}")
+        if self._automaton.vocab:
+            self._state, _ = self._automaton.scan(_WORD.findall(low), self._state, self.hits)
+
+
+_watchlist: Optional[WatchlistIndex] = None
+_watchlist_sig: Optional[Tuple] = None
+_watchlist_checked = 0.0
+_watchlist_lock = threading.Lock()
+
+
+def _db_signature(path: str) -> Tuple:
+    sig = []
+    for p in (path, path + "-wal"):
+        try:
+            st = os.stat(p)
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def get_watchlist() -> Optional[WatchlistIndex]:
+    """
+    Process-wide WatchlistIndex over ADMIN_DB_PATH (None when unset). The
+    DB file is checked at most every REFRESH_INTERVAL seconds and, if it
+    changed, re-synced; only changed organizations are re-indexed.
+    """
+    global _watchlist, _watchlist_sig, _watchlist_checked
+    if not ADMIN_DB_PATH:
+        return None
+    with _watchlist_lock:
+        now = time.monotonic()
+        if _watchlist is not None and now - _watchlist_checked < REFRESH_INTERVAL:
+            return _watchlist
+        _watchlist_checked = now
+        sig = _db_signature(ADMIN_DB_PATH)
+        if _watchlist is None or sig != _watchlist_sig:
+            index = _watchlist or WatchlistIndex()
+            try:
+                index.sync_from_db(ADMIN_DB_PATH)
+            except sqlite3.Error as e:
+                print(f"[watchlist] cannot read {ADMIN_DB_PATH}: {e}")
+                return _watchlist
+            _watchlist, _watchlist_sig = index, sig
+        return _watchlist
+
+
+def benchmark(tenants: int = 10_000, domains_per_tenant: int = 50, lookups: int = 200_000,
+              seed: int = 11) -> Dict[str, float]:
+    """Build time and lookup throughput on synthetic tenants."""
+    import random
+    rnd = random.Random(seed)
+    words = ["acme", "globex", "initech", "umbrella", "stark", "wayne", "apex", "nova", "orbit", "zenith"]
+    tlds = ["com", "net", "org", "io", "co", "eg"]
+    index = WatchlistIndex()
+    t0 = time.perf_counter()
+    for t in range(tenants):
+        base = f"{rnd.choice(words)}{t}"
+        index.set_org(
+            f"org_{t:05d}",
+            [f"{base}.{rnd.choice(tlds)}"] + [f"s{d}.{base}.{rnd.choice(tlds)}" for d in range(domains_per_tenant - 1)],
+            [f"10.{t // 256 % 256}.{t % 256}.0/24", f"172.{16 + t % 16}.{t % 256}.0/24"],
+            [f"{base} internal", f"project {rnd.choice(words)} {t % 97}"],
+        )
+    out = dict(tenants=tenants, domains=tenants * domains_per_tenant, build_s=time.perf_counter() - t0)
+
+    hosts = [f"mail.s{rnd.randrange(domains_per_tenant)}.{rnd.choice(words)}{rnd.randrange(tenants)}.{rnd.choice(tlds)}"
+             for _ in range(lookups)]
+    t0 = time.perf_counter()
+    hit = sum(1 for h in hosts if index.match_domain(h))
+    out["domain_lookups_per_s"] = lookups / (time.perf_counter() - t0)
+    out["domain_hit_rate"] = hit / lookups
+
+    ips = [f"10.{rnd.randrange(256)}.{rnd.randrange(256)}.{rnd.randrange(256)}" for _ in range(lookups)]
+    t0 = time.perf_counter()
+    hit = sum(1 for ip in ips if index.match_ip(ip))
+    out["ip_lookups_per_s"] = lookups / (time.perf_counter() - t0)
+    out["ip_hit_rate"] = hit / lookups
+
+    line = "user{0}@{1} 10.{2}.7.1 https://{1}/login {3} internal memo\n"
+    text = "".join(line.format(i, hosts[i % len(hosts)], i % 256, rnd.choice(words)) for i in range(100_000))
+    index.match_keywords("warm up")  # automaton build
+    t0 = time.perf_counter()
+    hits = index.match_text(text)
+    elapsed = time.perf_counter() - t0
+    out["text_mb_per_s"] = len(text) / (1024 * 1024) / elapsed
+    out["text_tenants_hit"] = len(hits)
+
+    t0 = time.perf_counter()
+    changed = index.set_org("org_00000", ["changed.example"], [], ["new keyword"])
+    out["incremental_update_ms"] = (time.perf_counter() - t0) * 1000 if changed else 0.0
+    return {k: round(v, 3) if isinstance(v, float) else v for k, v in out.items()}
+
+
+if __name__ == "__main__":
+    # python -m Services.Core.watchlist [tenants] [domains_per_tenant]
+    import sys
+    args = [int(a) for a in sys.argv[1:3]]
+    print(json.dumps(benchmark(*args), indent=2))
@@ -1,36 +1,31 @@
 from fastapi import FastAPI, UploadFile, File, Form
 from pydantic import BaseModel
 from typing import Optional, List
-import shutil, os, datetime
+import os, datetime
 
-app = FastAPI(title="Athr Control")
+from Services.Core.rawstore import get_store, COMPRESSED_EXT
+from Services.Core.control import get_control, SOURCES
 
-STATE = {
-    "pastebin_enabled": True,
-    "telegram_enabled": True,
-    "tor_enabled": True,
-    "events": [],     # in-memory; replace with DB
-    "jobs": []        # list of dicts: {source, status, reason, ts}
-}
+app = FastAPI(title="Athr Control")
 
 class TogglePayload(BaseModel):
     enabled: bool
 
 @app.post("/toggle/{source}")
 def toggle_source(source: str, body: TogglePayload):
-    key = f"{source}_enabled"
-    if key not in STATE: return {"ok": False, "error":"unknown source"}
-    STATE[key] = body.enabled
-    return {"ok": True, "source": source, "enabled": STATE[key]}
+    # shared with the scheduler and crawler processes (Services.Core.control)
+    if source not in SOURCES: return {"ok": False, "error":"unknown source"}
+    control = get_control()
+    control.set_enabled(source, body.enabled)
+    return {"ok": True, "source": source, "enabled": control.enabled(source)}
 
 @app.get("/status")
 def status():
+    control = get_control()
     return {
-        "pastebin_enabled": STATE["pastebin_enabled"],
-        "telegram_enabled": STATE["telegram_enabled"],
-        "tor_enabled": STATE["tor_enabled"],
-        "jobs": STATE["jobs"][-200:],
-        "events": STATE["events"][-200:]
+        **{f"{source}_enabled": control.enabled(source) for source in SOURCES},
+        "jobs": control.jobs.tail(200),     # {source, status, reason, ts}
+        "events": control.events.tail(200)
     }
 
 class ManualMeta(BaseModel):
@@ -42,15 +37,15 @@ class ManualMeta(BaseModel):
 
 @app.post("/manual/add")
 def manual_add(meta: ManualMeta, file: UploadFile | None = File(default=None)):
-    # save file if present
-    storage_path = None
+    # save file if present; content-addressed, so re-uploads are stored once
+    storage_path = sha256 = None
+    duplicate = False
     if file:
-        os.makedirs("/data/athr/raw/manual", exist_ok=True)
-        storage_path = f"/data/athr/raw/manual/{file.filename}"
-        with open(storage_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-    # insert artifact row in DB here (meta + storage_path)
-    return {"ok": True, "storage_path": storage_path}
+        ext = os.path.splitext(file.filename or "")[1].lower()
+        obj = get_store().put_fileobj(file.file, compress=ext not in COMPRESSED_EXT)
+        storage_path, sha256, duplicate = obj.path, obj.sha256, obj.deduplicated
+    # insert artifact row in DB here (meta + sha256 + original filename)
+    return {"ok": True, "storage_path": storage_path, "sha256": sha256, "duplicate": duplicate}
 
 class Event(BaseModel):
     source: str
@@ -63,6 +58,5 @@ class Event(BaseModel):
 def push_event(ev: Event):
     evd = ev.dict()
     evd["ts"] = datetime.datetime.utcnow().isoformat()
-    STATE["events"].append(evd)
-    # also write to DB
+    get_control().events.append(evd)  # bounded: the oldest events are overwritten
     return {"ok": True}
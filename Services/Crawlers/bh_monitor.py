@@ -1,16 +1,35 @@
 # crawler.py
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+import hashlib
 import json
 import os
 import time
+from typing import Callable, Container, Dict, Iterable, List, Optional, Tuple
 from urllib.parse import urljoin
 
+# faster HTML parsers, used when installed
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    import lxml  # noqa: F401  (BeautifulSoup's "lxml" tree builder)
+    BS4_FEATURES = "lxml"
+except ImportError:
+    BS4_FEATURES = "html.parser"
+
+from Services.Core.leakstore import get_store, import_json, make_key
+
 # ================= CONFIG =================
 URL = "{BH_URL}" 
 LIMIT = 20                            
-JSON_PATH = "../../Web-APIs/dashboard/leaks.json"
+# legacy output, imported into the leak store once (see migrate_legacy_json)
+JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../Web-APIs/dashboard/leaks.json")
 FETCH_EVERY_SECONDS = 60 * 60          
+# bh_data's POST /leaks/reload, so new leaks show up without waiting for its file check
+RELOAD_URL = os.environ.get("BH_DATA_RELOAD_URL")
+RELOAD_TOKEN = os.environ.get("ATHR_LEAKS_RELOAD_TOKEN")   # bh_data's x-reload-token
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -20,110 +39,209 @@ USER_AGENT = (
 # ==========================================
 
 
-def fetch_latest_leaks(url: str, limit: int = 20):
-    headers = {"User-Agent": USER_AGENT}
-    resp = requests.get(url, headers=headers, timeout=20)
-    resp.raise_for_status()
+def _fields_bs4(row, url: str) -> dict:
+    # leak_name
+    leak_name = row.get("data-target")
+    if not leak_name:
+        target_el = row.select_one("strong.target")
+        leak_name = target_el.get_text(strip=True) if target_el else None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    rows = soup.select("tr.data-row")
+    # discovered
+    time_el = row.select_one('td[data-title="Discovered"] time')
+    if time_el:
+        discovered = time_el.get("datetime") or time_el.get_text(strip=True)
+    else:
+        discovered = None
+
+    # country
+    country_el = row.select_one('td[data-title="Country"] .badge__text')
+    if country_el:
+        country = country_el.get_text(strip=True) or None
+    else:
+        country = row.get("data-country") or None
+
+    # source_group
+    source_el = row.select_one('td[data-title="Source"] a')
+    if source_el:
+        source_group = source_el.get_text(strip=True)
+    else:
+        source_group = row.get("data-group") or None
+
+    # link_source (absolute URL)
+    post_el = row.select_one('td[data-title="Post"] a')
+    if post_el:
+        href = post_el.get("href")
+        link_source = urljoin(url, href) if href else None
+    else:
+        link_source = None
+
+    return {
+        "leak_name": leak_name,
+        "discovered": discovered,
+        "country": country,
+        "source_group": source_group,
+        "link_source": link_source,
+    }
+
+
+def _fields_selectolax(row, url: str) -> dict:
+    # same fields and fallbacks as _fields_bs4
+    attrs = row.attributes
+
+    leak_name = attrs.get("data-target")
+    if not leak_name:
+        target_el = row.css_first("strong.target")
+        leak_name = target_el.text(strip=True) if target_el else None
+
+    time_el = row.css_first('td[data-title="Discovered"] time')
+    if time_el:
+        discovered = time_el.attributes.get("datetime") or time_el.text(strip=True)
+    else:
+        discovered = None
+
+    country_el = row.css_first('td[data-title="Country"] .badge__text')
+    if country_el:
+        country = country_el.text(strip=True) or None
+    else:
+        country = attrs.get("data-country") or None
+
+    source_el = row.css_first('td[data-title="Source"] a')
+    if source_el:
+        source_group = source_el.text(strip=True)
+    else:
+        source_group = attrs.get("data-group") or None
+
+    post_el = row.css_first('td[data-title="Post"] a')
+    if post_el:
+        href = post_el.attributes.get("href")
+        link_source = urljoin(url, href) if href else None
+    else:
+        link_source = None
+
+    return {
+        "leak_name": leak_name,
+        "discovered": discovered,
+        "country": country,
+        "source_group": source_group,
+        "link_source": link_source,
+    }
+
+
+def _rows_selectolax(html: str, url: str) -> Iterable[dict]:
+    for row in HTMLParser(html).css("tr.data-row"):
+        yield _fields_selectolax(row, url)
+
+
+def _rows_bs4(html: str, url: str, features: str = BS4_FEATURES) -> Iterable[dict]:
+    # only the data rows are turned into a tree
+    soup = BeautifulSoup(html, features, parse_only=SoupStrainer("tr", class_="data-row"))
+    for row in soup.select("tr.data-row"):
+        yield _fields_bs4(row, url)
 
-    leaks = []
 
-    for row in rows[:limit]:
-        # leak_name
-        leak_name = row.get("data-target")
-        if not leak_name:
-            target_el = row.select_one("strong.target")
-            leak_name = target_el.get_text(strip=True) if target_el else None
-
-        # discovered
-        time_el = row.select_one('td[data-title="Discovered"] time')
-        if time_el:
-            discovered = time_el.get("datetime") or time_el.get_text(strip=True)
-        else:
-            discovered = None
-
-        # country
-        country_el = row.select_one('td[data-title="Country"] .badge__text')
-        if country_el:
-            country = country_el.get_text(strip=True) or None
-        else:
-            country = row.get("data-country") or None
-
-        # source_group
-        source_el = row.select_one('td[data-title="Source"] a')
-        if source_el:
-            source_group = source_el.get_text(strip=True)
-        else:
-            source_group = row.get("data-group") or None
-
-        # link_source (absolute URL)
-        post_el = row.select_one('td[data-title="Post"] a')
-        if post_el:
-            href = post_el.get("href")
-            link_source = urljoin(url, href) if href else None
-        else:
-            link_source = None
-
-        leaks.append({
-            "leak_name": leak_name,
-            "discovered": discovered,
-            "country": country,
-            "source_group": source_group,
-            "link_source": link_source,
-        })
+PARSERS: Dict[str, Callable[[str, str], Iterable[dict]]] = {
+    "bs4": lambda html, url: _rows_bs4(html, url, "html.parser"),
+}
+if BS4_FEATURES == "lxml":
+    PARSERS["bs4-lxml"] = lambda html, url: _rows_bs4(html, url, "lxml")
+if HTMLParser is not None:
+    PARSERS["selectolax"] = _rows_selectolax
+DEFAULT_PARSER = list(PARSERS)[-1]  # fastest available
 
+
+def parse_leaks(html: str, url: str, limit: int = 20, known: Container[str] = (),
+                parser: str = DEFAULT_PARSER) -> List[dict]:
+    """
+    Leaks from a listing page, newest first. Stops at the first row whose
+    make_key is in `known`: the rows below it were stored on an earlier run.
+    """
+    leaks = []
+    for item in PARSERS[parser](html, url):
+        if len(leaks) >= limit or make_key(item) in known:
+            break
+        leaks.append(item)
     return leaks
 
 
-def load_existing():
-    if not os.path.exists(JSON_PATH):
-        return []
-    try:
-        with open(JSON_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
+_session = requests.Session()
+_session.headers["User-Agent"] = USER_AGENT
+# per URL: validators for the next conditional GET, and a hash of the last
+# body; a fetch puts them in _pending and commit_validators makes them current
+_validators: Dict[str, Dict[str, str]] = {}
+_body_hash: Dict[str, str] = {}
+_pending: Dict[str, Tuple[Dict[str, str], str]] = {}
+
+
+def fetch_latest_leaks(url: str, limit: int = 20, known: Container[str] = ()) -> List[dict]:
+    """
+    New leaks on the listing page. Returns [] without parsing when the page
+    is unchanged since the last committed fetch (304 Not Modified, or an
+    identical body from a server that ignores the validators). Call
+    commit_validators(url) once the leaks are stored.
+    """
+    resp = _session.get(url, headers=_validators.get(url, {}), timeout=20)
+    if resp.status_code == 304:
         return []
+    resp.raise_for_status()
 
+    digest = hashlib.sha1(resp.content).hexdigest()
+    if _body_hash.get(url) == digest:
+        return []
 
-def save_all(data):
-    with open(JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    leaks = parse_leaks(resp.text, url, limit, known)
+    _pending[url] = ({h: resp.headers[k] for h, k in (("If-None-Match", "ETag"),
+                                                      ("If-Modified-Since", "Last-Modified"))
+                      if resp.headers.get(k)}, digest)
+    return leaks
 
 
-def make_key(item: dict) -> str:
+def commit_validators(url: str):
     """
-    Unique key for a leak item.
-    You can change logic (e.g. use link_source only).
+    Use the last fetch's validators from now on. Only called after its leaks
+    are stored: if parsing or the store write fails, the next run fetches
+    and parses the full page again instead of getting a 304.
     """
-    return f"{item.get('link_source','')}|{item.get('leak_name','')}|{item.get('discovered','')}"
+    if url in _pending:
+        _validators[url], _body_hash[url] = _pending.pop(url)
+
+
+def migrate_legacy_json():
+    """Import leaks.json into the store if the store is still empty."""
+    store = get_store()
+    if store.count() or not os.path.exists(JSON_PATH):
+        return
+    try:
+        print("Imported legacy leaks.json:", import_json(store, JSON_PATH))
+    except json.JSONDecodeError as e:
+        print("Skipping unreadable leaks.json:", e)
 
 
 def run_once():
     print("Fetching latest leaks...")
-    fetched = fetch_latest_leaks(URL, LIMIT)
-    existing = load_existing()
+    store = get_store()
+    # the newest stored leaks; parsing stops when it reaches one of them
+    known = {make_key(item) for item in store.page(0, LIMIT)}
+    fetched = fetch_latest_leaks(URL, LIMIT, known)
 
-    existing_keys = {make_key(item) for item in existing}
-
-    new_items = []
-    for item in fetched:
-        key = make_key(item)
-        if key not in existing_keys:
-            existing_keys.add(key)
-            new_items.append(item)
+    # one transaction; items already stored (same make_key) are skipped
+    new_items = store.add_many(fetched)
+    commit_validators(URL)
 
     if not new_items:
-        print("No new leaks found. JSON file unchanged.")
+        print("No new leaks found. Store unchanged.")
         return
 
-    updated = new_items + existing
-    save_all(updated)
-    print(f"Added {len(new_items)} new leaks. Total now: {len(updated)}")
+    print(f"Added {len(new_items)} new leaks. Total now: {store.count()}")
+    if RELOAD_URL:
+        try:
+            headers = {"x-reload-token": RELOAD_TOKEN} if RELOAD_TOKEN else {}
+            requests.post(RELOAD_URL, headers=headers, timeout=5)
+        except requests.RequestException as e:
+            print("Could not notify bh_data:", e)
 
 
 def run_forever():
+    migrate_legacy_json()
     while True:
         try:
             run_once()
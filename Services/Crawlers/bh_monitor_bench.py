@@ -0,0 +1,117 @@
+"""
+Parser benchmark for bh_monitor: rows parsed per second for each available
+backend (html.parser, lxml, selectolax), on a synthetic listing page or a
+saved one, plus the cost of a run that stops early at a known leak and of
+an unchanged page (304) served by a local stub.
+
+    python -m Services.Crawlers.bh_monitor_bench [--rows 500] [--fixture page.html]
+"""
+import argparse, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Services.Crawlers import bh_monitor
+from Services.Core.leakstore import make_key
+
+BASE_URL = "https://example.invalid/leaks/"
+
+
+def make_page(rows, seed=3):
+    """A listing page shaped like the real one, with the same fallbacks exercised."""
+    rnd = random.Random(seed)
+    out = ["<!doctype html><html><head><title>Leaks</title>",
+           "<style>" + ".x{color:red}" * 400 + "</style>",
+           "<script>" + "var a=1;" * 2000 + "</script></head><body>",
+           "<nav>" + "".join(f'<a href="/p/{i}">link {i}</a>' for i in range(200)) + "</nav>",
+           "<table class=\"leaks\"><thead><tr><th>Target</th></tr></thead><tbody>"]
+    for i in range(rows):
+        name = f"victim-{i}.example"
+        country = rnd.choice(["US", "DE", "FR", "BR", "IN"])
+        group = rnd.choice(["lockbit3", "akira", "play", "medusa"])
+        target = (f'data-target="{name}"' if i % 3 else "")
+        badge = (f'<span class="badge"><span class="badge__text">{country}</span></span>' if i % 4
+                 else "")
+        out.append(
+            f'<tr class="data-row" {target} data-country="{country}" data-group="{group}">'
+            f'<td data-title="Target"><strong class="target"> {name} </strong></td>'
+            f'<td data-title="Discovered"><time datetime="2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}T10:00:00Z">'
+            f'{i % 28 + 1} days ago</time></td>'
+            f'<td data-title="Country">{badge}</td>'
+            f'<td data-title="Source"><a href="/group/{group}">{group}</a></td>'
+            f'<td data-title="Post"><a href="/post/{i}">view</a></td>'
+            f'<td data-title="Description"><p>{"lorem ipsum " * 20}</p></td></tr>'
+        )
+    out.append("</tbody></table><footer>" + "<p>footer</p>" * 100 + "</footer></body></html>")
+    return "".join(out)
+
+
+def timed(fn, *args, rounds=5, **kwargs):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        out = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def serve(html):
+    body = html.encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=500)
+    ap.add_argument("--fixture", help="saved listing page to use instead of the synthetic one")
+    args = ap.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, encoding="utf-8") as f:
+            html = f.read()
+    else:
+        html = make_page(args.rows)
+
+    results = {}
+    for name in bh_monitor.PARSERS:
+        t, leaks = timed(bh_monitor.parse_leaks, html, BASE_URL, limit=10 ** 9, parser=name)
+        results[name] = leaks
+        print(f"{name:<12} {len(leaks):>6} rows  {t * 1000:8.1f} ms  {len(leaks) / t:>10,.0f} rows/s")
+    reference = results["bs4"]
+    for name, leaks in results.items():
+        if leaks != reference:
+            print(f"!! {name} output differs from bs4")
+
+    # a typical hourly run: 5 new leaks above the ones already stored
+    known = {make_key(item) for item in reference[5:25]}
+    for name in bh_monitor.PARSERS:
+        t, leaks = timed(bh_monitor.parse_leaks, html, BASE_URL, limit=20, known=known, parser=name)
+        print(f"{name:<12} early stop after {len(leaks)} new rows  {t * 1000:8.1f} ms")
+
+    server = serve(html)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    t_full, _ = timed(bh_monitor.fetch_latest_leaks, url, 20, rounds=1)
+    bh_monitor.commit_validators(url)
+    t_304, leaks = timed(bh_monitor.fetch_latest_leaks, url, 20)
+    print(f"fetch: changed page {t_full * 1000:.1f} ms, unchanged (304) {t_304 * 1000:.1f} ms, {len(leaks)} rows")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,26 @@
-import time, random, requests, hashlib
+import os, asyncio, hashlib, tempfile
+import httpx
 from bs4 import BeautifulSoup
-from Services.Core.extractors import count_signals
-from Services.Core.severity import score_severity, SignalCounts
-from Services.Core.storage_guard import can_download, GuardConfig
+from Services.Core.analysis import get_service, analyze_text, analyze_file
+from Services.Core.db import get_index
+from Services.Core.jobqueue import LANE_DEEP, LANE_DEEP_HIGH, LANE_PEEK, RetryLater
+from Services.Core.ratelimit import TokenBucket
+from Services.Core.storage_guard import get_guard, GuardConfig
 
 BASE = "https://pastebin.com"
-ARCHIVE_URL = f"{BASE}/archive"
+HEADERS = {"User-Agent":"Mozilla/5.0 AthrCrawler/1.0"}
+CONCURRENCY = 8        # pastes in flight
+RATE_PER_SEC = 2.0     # request budget shared by peeks and deep fetches
+RATE_BURST = 4
+PEEK_BYTES = 65536
+GUARD_WAIT = 60.0      # seconds a deep fetch waits for a download slot
 
-session = requests.Session()
-session.headers.update({"User-Agent":"Mozilla/5.0 AthrCrawler/1.0"})
+def make_client(concurrency=CONCURRENCY):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    return httpx.AsyncClient(headers=HEADERS, limits=limits, timeout=20, follow_redirects=True)
 
-def list_recent_ids():
-    r = session.get(ARCHIVE_URL, timeout=15)
+async def list_recent_ids(client, base=BASE):
+    r = await client.get(f"{base}/archive", timeout=15)
     r.raise_for_status()
     soup = BeautifulSoup(r.text, "html.parser")
     table = soup.select_one("div.archive-table table.maintable")
@@ -28,12 +37,12 @@ def list_recent_ids():
             seen.add(i); out.append(i)
     return out
 
-def fetch_peek(raw_url, peek_bytes=65536):
+async def fetch_peek(client, raw_url, peek_bytes=PEEK_BYTES):
     h = hashlib.sha256()
     total=0; chunks=[]
-    with session.get(raw_url, stream=True, timeout=20) as r:
+    async with client.stream("GET", raw_url, timeout=20) as r:
         r.raise_for_status()
-        for c in r.iter_content(8192):
+        async for c in r.aiter_bytes(8192):
             if not c: break
             h.update(c)
             if total<peek_bytes:
@@ -43,44 +52,154 @@ def fetch_peek(raw_url, peek_bytes=65536):
     peek_text = b"".join(chunks).decode("utf-8", errors="replace")
     return peek_text, h.hexdigest(), total
 
-def fetch_full(raw_url, max_size=20*1024*1024):
-    h=hashlib.sha256(); parts=[]; total=0
-    with session.get(raw_url, stream=True, timeout=30) as r:
+async def fetch_full(client, raw_url, dest, max_size=20*1024*1024):
+    # spool to disk; hashing and scanning happen in the analysis pool
+    total=0
+    async with client.stream("GET", raw_url, timeout=30) as r:
         r.raise_for_status()
-        for c in r.iter_content(8192):
-            if not c: break
-            total+=len(c)
-            if total>max_size: raise RuntimeError("too big")
-            h.update(c); parts.append(c)
-    return b"".join(parts).decode("utf-8", errors="replace"), h.hexdigest(), total
-
-def run(limit=40, guard=GuardConfig()):
-    for pid in list_recent_ids()[:limit]:
-        raw = f"{BASE}/raw/{pid}"
-        try:
-            peek, stream_hash, peek_len = fetch_peek(raw)
-        except Exception as e:
-            print(f"[{pid}] peek error: {e}"); continue
+        with open(dest, "wb") as out:
+            async for c in r.aiter_bytes(8192):
+                if not c: break
+                total+=len(c)
+                if total>max_size: raise RuntimeError("too big")
+                out.write(c)
+    return total
+
+class _Crawl:
+    """State shared by the paste tasks of one run."""
+
+    def __init__(self, client, base, guard, concurrency, rate, burst, index):
+        self.client, self.base, self.guard = client, base, guard
+        self.slots = asyncio.Semaphore(concurrency)
+        self.bucket = TokenBucket(rate, burst)
+        self.svc = get_service()
+        self.index = index or get_index()
+        self.paused = False
+        self.stats = dict(peeked=0, low=0, deep=0, dup=0, errors=0)
 
-        sig = count_signals(peek)
-        sev = score_severity(SignalCounts(**sig, size_bytes=peek_len))
+    async def peek(self, pid):
+        """Peek at a paste and score it; None if its content is already known. Raises on fetch errors."""
+        raw = f"{self.base}/raw/{pid}"
+        async with self.slots:
+            await self.bucket.acquire()
+            peek, stream_hash, peek_len = await fetch_peek(self.client, raw)
+        self.stats["peeked"]+=1
 
+        # a peek that covers the whole paste hashes to its full sha256
+        if (self.index.seen("peek_hash", stream_hash)
+                or (peek_len < PEEK_BYTES and self.index.seen("sha256", stream_hash))):
+            self.index.add("paste_id", pid)
+            self.stats["dup"]+=1
+            print(f"[{pid}] skip known content ({stream_hash[:10]})"); return None
 
+        sev = (await self.svc.submit_async(analyze_text, peek, peek_len)).severity
+        # recorded only once scored: if analysis fails, a retry must not find
+        # its own peek hash and drop the paste as known content
+        self.index.add_many([("paste_id", pid), ("peek_hash", stream_hash)])
         if sev.label == "low":
+            self.stats["low"]+=1
             print(f"[{pid}] skip low ({sev.score} | {sev.reasons})")
-            time.sleep(random.uniform(0.3,0.8))
-            continue
+        return sev
 
-        if not can_download(guard):
-            print(f"[{pid}] paused by guard (disk/cpu)"); break
+    async def deep(self, pid):
+        """Download and fully analyze a paste; None if the guard paused it. Raises on fetch errors."""
+        raw = f"{self.base}/raw/{pid}"
+        # O(1) read of the guard's sampled snapshot: disk/cpu trouble pauses the
+        # run, a full download quota just waits for a slot
+        guard = get_guard()
+        if self.paused or not guard.healthy(self.guard):
+            self.paused = True
+            print(f"[{pid}] paused by guard (disk/cpu)"); return None
+        if not await guard.acquire_async(GUARD_WAIT, self.guard):
+            print(f"[{pid}] paused by guard (downloads)"); return None
 
+        fd, path = tempfile.mkstemp(prefix=f"paste_{pid}_")
+        os.close(fd)
+        try:
+            try:
+                async with self.slots:
+                    await self.bucket.acquire()
+                    await fetch_full(self.client, raw, path)
+            finally:
+                guard.release()
+            res = await self.svc.submit_async(analyze_file, path)
+        finally:
+            os.remove(path)
+        self.stats["deep"]+=1
+        self.index.add("sha256", res.sha256)
+        print(f"[{pid}] deep ok {res.severity.label} ({res.severity.score} | size={res.size_bytes})")
+        return res
+
+    async def process(self, pid):
+        # peek -> score -> deep; the semaphore only covers network I/O, scoring
+        # runs in the process pool so it never holds a connection slot
+        try:
+            sev = await self.peek(pid)
+        except Exception as e:
+            self.stats["errors"]+=1
+            print(f"[{pid}] peek error: {e}"); return
+        if sev is None or sev.label == "low":
+            return
         try:
-            full_text, full_hash, total = fetch_full(raw)
+            await self.deep(pid)
         except Exception as e:
-            print(f"[{pid}] deep error: {e}"); continue
+            self.stats["errors"]+=1
+            print(f"[{pid}] deep error: {e}")
+
+async def run_async(limit=40, guard=GuardConfig(), concurrency=CONCURRENCY,
+                    rate=RATE_PER_SEC, burst=RATE_BURST, base=BASE, client=None, index=None):
+    own = client is None
+    client = client or make_client(concurrency)
+    try:
+        crawl = _Crawl(client, base, guard, concurrency, rate, burst, index)
+        crawl.index.evict_expired()
+        await crawl.bucket.acquire()
+        # known IDs are dropped before any request is made for them
+        ids = [pid for pid in (await list_recent_ids(client, base))[:limit]
+               if not crawl.index.seen("paste_id", pid)]
+        await asyncio.gather(*(crawl.process(pid) for pid in ids))
+        return crawl.stats
+    finally:
+        if own: await client.aclose()
+
+def run(limit=40, guard=GuardConfig(), **kw):
+    return asyncio.run(run_async(limit=limit, guard=guard, **kw))
+
+
+# --- queued jobs (see Services.Core.scheduler) ---
+#
+# pastebin.list enqueues a pastebin.peek per new paste; a peek that scores
+# medium/high enqueues pastebin.deep in a lane by severity, so deep fetches
+# of high-severity pastes run before the remaining peeks. Each worker
+# process keeps one client and _Crawl for all of its jobs.
+
+_job_crawl = None
+
+def _jobs_crawl():
+    global _job_crawl
+    if _job_crawl is None:
+        _job_crawl = _Crawl(make_client(), BASE, GuardConfig(), CONCURRENCY, RATE_PER_SEC, RATE_BURST, None)
+    return _job_crawl
+
+async def job_list(queue, limit=40):
+    crawl = _jobs_crawl()
+    crawl.index.evict_expired()
+    await crawl.bucket.acquire()
+    ids = [pid for pid in (await list_recent_ids(crawl.client, crawl.base))[:limit]
+           if not crawl.index.seen("paste_id", pid)]
+    for pid in ids:
+        queue.enqueue("pastebin", "pastebin.peek", {"pid": pid}, LANE_PEEK, dedup_key=f"pastebin.peek:{pid}")
+
+async def job_peek(queue, pid):
+    sev = await _jobs_crawl().peek(pid)
+    if sev is not None and sev.label != "low":
+        queue.enqueue("pastebin", "pastebin.deep", {"pid": pid}, LANE_DEEP_HIGH if sev.label == "high" else LANE_DEEP,
+                      dedup_key=f"pastebin.deep:{pid}")
 
-        sig_full = count_signals(full_text)
-        sev_full = score_severity(SignalCounts(**sig_full, size_bytes=total))
+async def job_deep(queue, pid):
+    crawl = _jobs_crawl()
+    crawl.paused = False  # the guard is re-checked per job, not latched for the worker's lifetime
+    if await crawl.deep(pid) is None:
+        raise RetryLater(GUARD_WAIT, "paused by guard")
 
-        print(f"[{pid}] deep ok {sev_full.label} ({sev_full.score} | size={total})")
-        time.sleep(random.uniform(0.3,1.0))
+JOB_HANDLERS = {"pastebin.list": job_list, "pastebin.peek": job_peek, "pastebin.deep": job_deep}
@@ -0,0 +1,85 @@
+"""
+Local throughput benchmark for the async pastebin crawler.
+
+Serves a fake archive + raw pastes from a threaded stub server (with a fixed
+per-request latency to stand in for the network) and reports pastes/second
+at several concurrency levels, rate limit disabled.
+
+    python -m Services.Crawlers.pastebin_bench [--pastes 120] [--latency 0.05]
+"""
+import argparse, asyncio, contextlib, io, random, string, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from Services.Crawlers import pastebin
+from Services.Core.db import DedupIndex
+from Services.Core.storage_guard import GuardConfig
+
+
+def make_pastes(n, seed=1):
+    rnd = random.Random(seed)
+    pastes = {}
+    for i in range(n):
+        pid = "".join(rnd.choices(string.ascii_letters + string.digits, k=8))
+        if i % 2:   # half are combo-ish and go deep
+            body = "".join(f"user{j}@corp{i}.com:pass:{rnd.randint(0, 10**6)}\n" for j in range(400))
+        else:
+            body = "lorem ipsum dolor sit amet " * 200
+        pastes[pid] = body.encode()
+    return pastes
+
+
+def serve(pastes, latency):
+    rows = "".join(f'<tr><td><a href="/{pid}">p</a></td></tr>' for pid in pastes)
+    archive = f'<div class="archive-table"><table class="maintable">{rows}</table></div>'.encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path == "/archive":
+                body = archive
+            elif self.path.startswith("/raw/") and self.path[5:] in pastes:
+                body = pastes[self.path[5:]]
+            else:
+                self.send_response(404); self.send_header("Content-Length", "0"); self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pastes", type=int, default=120)
+    ap.add_argument("--latency", type=float, default=0.05)
+    ap.add_argument("--levels", default="1,2,4,8,16,32")
+    args = ap.parse_args()
+
+    pastes = make_pastes(args.pastes)
+    srv = serve(pastes, args.latency)
+    base = f"http://127.0.0.1:{srv.server_port}"
+    guard = GuardConfig(min_free_gb=0, max_cpu_pct=100)
+    print(f"{args.pastes} pastes, {args.latency * 1000:.0f} ms/request")
+    for level in (int(x) for x in args.levels.split(",")):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = asyncio.run(pastebin.run_async(limit=args.pastes, guard=guard, concurrency=level,
+                                                   rate=None, base=base, index=DedupIndex(":memory:")))
+        dt = time.perf_counter() - t0
+        print(f"concurrency={level:>3}  {stats['peeked'] / dt:8.1f} pastes/s  "
+              f"(deep={stats['deep']} errors={stats['errors']} {dt:.2f}s)")
+    srv.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,83 @@
-import os, asyncio, hashlib
+import os, asyncio
 from telethon import TelegramClient, events
-from Services.Core.extractors import count_signals
-from Services.Core.severity import score_severity, SignalCounts
-from Services.Core.storage_guard import can_download, GuardConfig
+from Services.Core.analysis import get_service, analyze_file
+from Services.Core.control import get_control
+from Services.Core.db import get_index
+from Services.Core.rawstore import get_store
+from Services.Core.storage_guard import get_guard
+from Services.Crawlers.telegram_downloads import DownloadManager
 
 API_ID = {TEL_ID}        
 API_HASH = {TEL_HASH}
 SESSION = "athr_session"
 SAVE_DIR = "/data/athr/raw/telegram"
 ALLOWED = {".txt",".csv",".json",".log",".zip",".7z",".rar"}
+TEXT_EXT = {".txt",".csv",".json",".log"}
 MAX_SIZE = 200*1024*1024  # 200MB cap
+GUARD_WAIT = 15*60        # seconds a file may wait for disk/cpu/download capacity
+
+_manager = None
+
+def get_manager(client):
+    global _manager
+    if _manager is None or _manager.client is not client:
+        _manager = DownloadManager(client, SAVE_DIR, guard=get_guard())
+    return _manager
 
 async def handle_message(event):
     if not event.message.file: return
+    if not get_control().enabled("telegram"): return
     name = event.message.file.name or "noname"
     ext = os.path.splitext(name)[1].lower()
     size = event.message.file.size or 0
     if ext not in ALLOWED or size>MAX_SIZE:
         return
 
-    if not can_download(GuardConfig()):
-        print("[tg] paused by guard"); return
+    # reposts/forwards of the same document keep its id
+    index = get_index()
+    doc_id = getattr(event.message.file.media, "id", None)
+    if doc_id is not None and index.seen("tg_doc", str(doc_id)):
+        print(f"[tg] {name} already downloaded (doc {doc_id})"); return
 
-    path = os.path.join(SAVE_DIR, name)
     os.makedirs(SAVE_DIR, exist_ok=True)
-    await event.message.download_media(file=path)
-    # Hash
-    h = hashlib.sha256()
-    with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
-    sha = h.hexdigest()
-
-    if ext in {".txt",".csv",".json",".log"}:
-        try:
-            with open(path, "r", encoding="utf-8", errors="replace") as f:
-                text = f.read(100_000)   # peek 100KB
-        except Exception:
-            text = ""
-        sig = count_signals(text)
-        sev = score_severity(SignalCounts(**sig, size_bytes=min(size,100_000)))
-
-        if sev.label == "low":
-            try: os.remove(path)
-            except: pass
-        print(f"[tg] {name} -> {sev.label} ({sev.score}) sha={sha[:10]} size={size}")
+    # waits (without blocking the loop) for a guard slot, hashes while
+    # downloading and resumes from the part file after a restart
+    key = str(doc_id) if doc_id is not None else f"{event.chat_id}_{event.message.id}"
+    try:
+        dl = await get_manager(event.client).download(event.message.media, name, size, key,
+                                                      timeout=GUARD_WAIT)
+    except TimeoutError:
+        print("[tg] paused by guard"); return
+    if dl.joined:
+        print(f"[tg] {name} already being handled (doc {doc_id})"); return
+    path, sha = dl.path, dl.sha256
+    # the dedup keys are recorded once the file is handled; if analysis or
+    # storing fails, a repost of the same document is processed again
+    done = [("tg_doc", str(doc_id))] if doc_id is not None else []
+    try:
+        if index.seen("sha256", sha):
+            index.add_many(done)
+            print(f"[tg] {name} duplicate content sha={sha[:10]}"); return
+        done.append(("sha256", sha))
+
+        if ext in TEXT_EXT:
+            # deep scan in the analysis pool, off the event loop
+            res = await get_service().submit_async(analyze_file, path, digest=False)
+            sev = res.severity
+
+            print(f"[tg] {name} -> {sev.label} ({sev.score}) sha={sha[:10]} size={size}")
+            if sev.label == "low":
+                index.add_many(done); return
+
+        # move into the content-addressed store (compressed, stored once per sha)
+        obj = await asyncio.to_thread(get_store().put_file, path, sha256=sha, remove=True)
+        index.add_many(done)
+        print(f"[tg] {name} stored {obj.path} ({obj.size}->{obj.stored_size} bytes)")
+    finally:
+        # whatever didn't make it into the store (duplicate, low, or a failed
+        # analysis/store) is not left behind in SAVE_DIR
+        try: os.remove(path)
+        except OSError: pass
 
 async def run(channels: list[str]):
     client = TelegramClient(SESSION, API_ID, API_HASH)
@@ -0,0 +1,200 @@
+import os, re, json, math, asyncio, hashlib
+from dataclasses import dataclass, replace
+from typing import Dict, Optional
+
+from Services.Core.storage_guard import ResourceGuard, get_guard
+
+PART_SIZE = 1024 * 1024        # segment fetched by one worker; multiple of REQUEST_SIZE
+REQUEST_SIZE = 512 * 1024      # Telegram upload.getFile limit
+PARALLEL = 4                   # segments in flight per file
+WINDOW = 8                     # max segments downloaded ahead of the hash cursor
+_SAFE_KEY = re.compile(r"[A-Za-z0-9_-]+")
+_SAFE_EXT = re.compile(r"\.[A-Za-z0-9]{1,10}")
+
+
+@dataclass
+class DownloadResult:
+    path: str
+    sha256: str
+    size: int
+    resumed_from: int = 0
+    joined: bool = False   # another call for the same key did the download
+
+
+class DownloadManager:
+    """
+    Telegram media downloads with parallel segment fetches, hashing on the way
+    in and resume after restart.
+
+    Segments are fetched with `client.iter_download(media, offset=...)` by up
+    to `parallel` workers and written into `<parts_dir>/<key>.part` at their
+    offset. The SHA-256 is fed in file order as the contiguous prefix grows,
+    and that prefix length is persisted in `<key>.json`; after a restart only
+    the prefix is re-read (to rebuild the hash state) and the rest is fetched
+    again. Every file holds a ResourceGuard download slot, so the guard's
+    max_active_downloads (and its disk/CPU limits) bound how many run at once.
+    One key downloads at most once at a time: a second call for a key that is
+    in flight waits for the first and shares its result.
+    """
+
+    def __init__(self, client, save_dir: str, guard: Optional[ResourceGuard] = None,
+                 parallel: int = PARALLEL, part_size: int = PART_SIZE, window: int = WINDOW):
+        self.client = client
+        self.save_dir = save_dir
+        self.parts_dir = os.path.join(save_dir, ".parts")
+        self.guard = guard or get_guard()
+        self.parallel = parallel
+        self.part_size = part_size
+        self.window = max(window, parallel)
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    async def download(self, media, name: str, size: int, key: str,
+                       timeout: Optional[float] = None) -> DownloadResult:
+        """
+        Download `media` (`size` bytes) to save_dir/<key><ext>, taking only the
+        extension from the sender's file `name`; `key` also names the part
+        file and must be unique per document. Raises TimeoutError if no guard
+        slot frees up within `timeout`.
+        If `key` is already downloading, waits for that download and returns
+        its result with joined=True.
+        """
+        if not _SAFE_KEY.fullmatch(key):
+            raise ValueError(f"unsafe download key {key!r}")
+        task = self._inflight.get(key)
+        if task is not None:
+            return replace(await asyncio.shield(task), joined=True)
+        task = asyncio.ensure_future(self._guarded(media, name, size, key, timeout))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._inflight.pop(key) if self._inflight.get(key) is t else None)
+        return await task
+
+    async def _guarded(self, media, name, size, key, timeout) -> DownloadResult:
+        if not await self.guard.acquire_async(timeout):
+            raise TimeoutError("no download capacity")
+        try:
+            return await self._download(media, name, size, key)
+        finally:
+            self.guard.release()
+
+    def _meta_path(self, key):
+        return os.path.join(self.parts_dir, f"{key}.json")
+
+    def _load_offset(self, key, part, size) -> int:
+        try:
+            with open(self._meta_path(key), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if meta.get("size") != size or not os.path.exists(part):
+            return 0
+        return min(int(meta.get("offset", 0)), size)
+
+    def _save_offset(self, key, size, offset):
+        tmp = self._meta_path(key) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"size": size, "offset": offset}, f)
+        os.replace(tmp, self._meta_path(key))
+
+    async def _download(self, media, name, size, key) -> DownloadResult:
+        os.makedirs(self.parts_dir, exist_ok=True)
+        part = os.path.join(self.parts_dir, f"{key}.part")
+        h = hashlib.sha256()
+
+        resumed = self._load_offset(key, part, size)
+        if resumed:
+            with open(part, "rb") as f:
+                left = resumed
+                while left:
+                    chunk = f.read(min(left, 1024 * 1024))
+                    if not chunk:
+                        break
+                    h.update(chunk); left -= len(chunk)
+            if left:
+                resumed = 0; h = hashlib.sha256()
+
+        nseg = math.ceil(size / self.part_size)
+        state = dict(next=resumed // self.part_size, hashed=resumed // self.part_size)
+        ready = {}
+        cond = asyncio.Condition()
+        fd = os.open(part, os.O_RDWR | os.O_CREAT)
+        try:
+            async def worker():
+                while True:
+                    async with cond:
+                        await cond.wait_for(lambda: state["next"] - state["hashed"] < self.window)
+                        if state["next"] >= nseg:
+                            return
+                        i = state["next"]; state["next"] += 1
+                    data = await self._fetch(media, i, size)
+                    os.pwrite(fd, data, i * self.part_size)
+                    async with cond:
+                        ready[i] = data
+                        while state["hashed"] in ready:
+                            h.update(ready.pop(state["hashed"])); state["hashed"] += 1
+                        self._save_offset(key, size, min(state["hashed"] * self.part_size, size))
+                        cond.notify_all()
+
+            tasks = [asyncio.ensure_future(worker()) for _ in range(min(self.parallel, max(nseg, 1)))]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                # stop the other workers before the fd is closed; the part file
+                # and its offset stay behind for the next attempt
+                for t in tasks: t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+
+        # never a path built from the sender's filename: two documents called
+        # combo.txt would overwrite each other, and ../x.txt would leave save_dir
+        ext = os.path.splitext(name)[1].lower()
+        path = os.path.join(self.save_dir, key + (ext if _SAFE_EXT.fullmatch(ext) else ""))
+        os.replace(part, path)
+        try: os.remove(self._meta_path(key))
+        except OSError: pass
+        return DownloadResult(path, h.hexdigest(), size, resumed)
+
+    async def _fetch(self, media, i, size) -> bytes:
+        start = i * self.part_size
+        length = min(self.part_size, size - start)
+        buf = bytearray()
+        async for chunk in self.client.iter_download(
+                media, offset=start, request_size=REQUEST_SIZE,
+                limit=math.ceil(length / REQUEST_SIZE), file_size=size):
+            buf += chunk
+            if len(buf) >= length:
+                break
+        if len(buf) < length:
+            raise IOError(f"short read at offset {start}: {len(buf)}/{length}")
+        return bytes(buf[:length])
+
+
+class LocalFileClient:
+    """
+    Stand-in for TelegramClient serving local files through the same
+    iter_download() call, for exercising DownloadManager without Telegram.
+    `media` is a file path.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_after: Optional[int] = None):
+        self.latency = latency
+        self.fail_after = fail_after   # raise after this many requests (simulated drop)
+        self.requests = 0
+
+    async def iter_download(self, media, *, offset=0, request_size=REQUEST_SIZE, limit=None, **kwargs):
+        with open(media, "rb") as f:
+            f.seek(offset)
+            sent = 0
+            while limit is None or sent < limit:
+                if self.fail_after is not None and self.requests >= self.fail_after:
+                    raise ConnectionError("simulated disconnect")
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                chunk = f.read(request_size)
+                if not chunk:
+                    return
+                yield chunk
+                sent += 1
@@ -1,97 +1,160 @@
 import aiosqlite
 import json
-from typing import List
+from typing import List, Optional, Tuple
 import schemas
 
 
 async def get_admin_stats(db: aiosqlite.Connection) -> schemas.Stats:
     """
     Get dashboard statistics (total counts for organizations, users, and incidents).
-    
+
+    Reads the trigger-maintained admin_counters table (see stats.py)
+    instead of counting the base tables.
+
     Args:
         db: Async SQLite database connection
         
     Returns:
         schemas.Stats: Statistics object with total counts
     """
-    # Count organizations
-    cursor = await db.execute("SELECT COUNT(*) FROM organizations")
-    total_organizations = (await cursor.fetchone())[0]
+    cursor = await db.execute("SELECT name, value FROM admin_counters")
+    counters = {row["name"]: row["value"] for row in await cursor.fetchall()}
     await cursor.close()
-    
-    # Count users
-    cursor = await db.execute("SELECT COUNT(*) FROM users")
-    total_users = (await cursor.fetchone())[0]
+
+    return schemas.Stats(
+        total_organizations=counters.get("organizations", 0),
+        total_users=counters.get("users", 0),
+        total_incidents=counters.get("incidents", 0)
+    )
+
+
+async def get_organization_stats(
+    db: aiosqlite.Connection,
+    org_id: str
+) -> Optional[schemas.OrganizationStats]:
+    """
+    Get the materialized user / incident counters for one organization.
+
+    Args:
+        db: Async SQLite database connection
+        org_id: Organization ID
+
+    Returns:
+        Optional[schemas.OrganizationStats]: The counters, or None if the
+        organization does not exist
+    """
+    cursor = await db.execute(
+        """
+        SELECT o.org_id,
+               COALESCE(s.user_count, 0) AS user_count,
+               COALESCE(s.incident_count, 0) AS incident_count
+        FROM organizations o
+        LEFT JOIN org_stats s ON s.org_id = o.org_id
+        WHERE o.org_id = ?
+        """,
+        (org_id,)
+    )
+    row = await cursor.fetchone()
     await cursor.close()
-    
-    # Count incidents
-    cursor = await db.execute("SELECT COUNT(*) FROM incident_reports")
-    total_incidents = (await cursor.fetchone())[0]
+    if row is None:
+        return None
+
+    cursor = await db.execute(
+        "SELECT dimension, value, count FROM org_incident_breakdown WHERE org_id = ? AND count != 0",
+        (org_id,)
+    )
+    breakdown = {"severity": {}, "source": {}}
+    for b in await cursor.fetchall():
+        breakdown[b["dimension"]][b["value"]] = b["count"]
     await cursor.close()
-    
-    return schemas.Stats(
-        total_organizations=total_organizations,
-        total_users=total_users,
-        total_incidents=total_incidents
+
+    return schemas.OrganizationStats(
+        org_id=row["org_id"],
+        user_count=row["user_count"],
+        incident_count=row["incident_count"],
+        incidents_by_severity=breakdown["severity"],
+        incidents_by_source=breakdown["source"]
     )
 
 
-async def get_organizations(db: aiosqlite.Connection) -> List[schemas.Organization]:
+# columns the organization listing can be sorted by (whitelist: they are
+# interpolated into ORDER BY)
+ORGANIZATION_SORT_COLUMNS = {
+    "name": "o.name",
+    "plan": "o.plan",
+    "created_at": "o.created_at",
+    "org_id": "o.org_id",
+    "user_count": "user_count",
+    "incident_count": "incident_count",
+}
+
+
+async def get_organizations(
+    db: aiosqlite.Connection,
+    limit: Optional[int] = None,
+    offset: int = 0,
+    sort: str = "name",
+    descending: bool = False,
+) -> Tuple[List[schemas.Organization], int]:
     """
-    Get all organizations with calculated user and incident counts.
-    
+    Get organizations with calculated user and incident counts.
+
+    Counts come from the trigger-maintained org_stats table (see stats.py),
+    so the whole page (and the total, via a window function) is one query
+    with a primary-key join per organization.
+
     Args:
         db: Async SQLite database connection
-        
+        limit: Page size (None for all organizations)
+        offset: Number of organizations to skip
+        sort: One of ORGANIZATION_SORT_COLUMNS
+        descending: Sort direction
+
     Returns:
-        List[schemas.Organization]: List of all organizations with counts
+        Tuple[List[schemas.Organization], int]: The page of organizations
+        and the total number of organizations
     """
-    organizations = []
-    
-    # Get all organizations
-    cursor = await db.execute("SELECT * FROM organizations")
+    if sort not in ORGANIZATION_SORT_COLUMNS:
+        raise ValueError(f"cannot sort organizations by {sort!r}")
+    direction = "DESC" if descending else "ASC"
+
+    cursor = await db.execute(
+        f"""
+        SELECT o.*,
+               COALESCE(s.user_count, 0) AS user_count,
+               COALESCE(s.incident_count, 0) AS incident_count,
+               COUNT(*) OVER () AS total
+        FROM organizations o
+        LEFT JOIN org_stats s ON s.org_id = o.org_id
+        ORDER BY {ORGANIZATION_SORT_COLUMNS[sort]} {direction}, o.org_id {direction}
+        LIMIT ? OFFSET ?
+        """,
+        (-1 if limit is None else limit, offset),
+    )
     org_rows = await cursor.fetchall()
     await cursor.close()
-    
-    for org_row in org_rows:
-        org_id = org_row["org_id"]
-        
-        # Count users for this organization
-        user_cursor = await db.execute(
-            "SELECT COUNT(*) FROM users WHERE org_id = ?",
-            (org_id,)
-        )
-        user_count = (await user_cursor.fetchone())[0]
-        await user_cursor.close()
-        
-        # Count incidents for this organization
-        incident_cursor = await db.execute(
-            "SELECT COUNT(*) FROM incident_reports WHERE org_id = ?",
-            (org_id,)
-        )
-        incident_count = (await incident_cursor.fetchone())[0]
-        await incident_cursor.close()
-        
-        # Parse JSON fields
-        domains = json.loads(org_row["domains"])
-        ip_ranges = json.loads(org_row["ip_ranges"])
-        keywords = json.loads(org_row["keywords"])
-        
-        # Create organization object
-        org = schemas.Organization(
+
+    if org_rows:
+        total = org_rows[0]["total"]
+    else:
+        # past the last page: the window function had no rows to count
+        total = (await get_admin_stats(db)).total_organizations
+
+    organizations = [
+        schemas.Organization(
             org_id=org_row["org_id"],
             name=org_row["name"],
             plan=org_row["plan"],
-            domains=domains,
-            ip_ranges=ip_ranges,
-            keywords=keywords,
+            domains=json.loads(org_row["domains"] or "[]"),
+            ip_ranges=json.loads(org_row["ip_ranges"] or "[]"),
+            keywords=json.loads(org_row["keywords"] or "[]"),
             created_at=org_row["created_at"],
-            user_count=user_count,
-            incident_count=incident_count
+            user_count=org_row["user_count"],
+            incident_count=org_row["incident_count"],
         )
-        organizations.append(org)
-    
-    return organizations
+        for org_row in org_rows
+    ]
+    return organizations, total
 
 
 async def get_users_for_organization(
@@ -1,16 +1,44 @@
+import sys
+from pathlib import Path
+
 import aiosqlite
 
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.sqlite_pool import SQLitePool
+import stats
+
 DATABASE_URL = "admin_mock.db"
 
+# warm connections shared by all requests; GET endpoints use the read-only ones
+pool = SQLitePool(DATABASE_URL, size=2, readonly_size=4)
+
+# created at startup; the per-organization listings and counts filter on these
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_users_org_id ON users(org_id)",
+    "CREATE INDEX IF NOT EXISTS idx_incident_reports_org_collected ON incident_reports(org_id, collected_at)",
+]
+
+
+async def create_indexes():
+    """Create the admin DB's secondary indexes and the materialized counters if they are missing."""
+    async with pool.acquire() as db:
+        for statement in INDEXES:
+            await db.execute(statement)
+        await stats.migrate(db)
+        await db.execute("PRAGMA optimize")
+        await db.commit()
+
 
 async def get_db_connection():
     """
     FastAPI dependency for getting an async database connection.
-    Yields a connection with row_factory set to aiosqlite.Row for dict-like access.
+    Yields a pooled connection with row_factory set to aiosqlite.Row for dict-like access.
     """
-    db = await aiosqlite.connect(DATABASE_URL)
-    try:
-        db.row_factory = aiosqlite.Row
+    async with pool.acquire() as db:
+        yield db
+
+
+async def get_read_connection():
+    """Like get_db_connection, but a read-only connection (for GET endpoints)."""
+    async with pool.acquire(readonly=True) as db:
         yield db
-    finally:
-        await db.close()
@@ -1,6 +1,7 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
 import uvicorn
 import aiosqlite
 import os
@@ -9,7 +10,7 @@ from pydantic import EmailStr
 
 import crud
 import schemas
-from database import get_db_connection
+from database import get_read_connection, create_indexes, pool
 
 # Load environment variables
 load_dotenv()
@@ -18,11 +19,22 @@ load_dotenv()
 ADMIN_EMAILS_STR = os.environ.get("ADMIN_EMAILS", "")
 admin_email_set = set(email.strip() for email in ADMIN_EMAILS_STR.split(',') if email.strip())
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # On startup, open the connection pool and make sure the lookup indexes
+    # and the stats counters exist
+    await pool.open()
+    await create_indexes()
+    yield
+    await pool.close()
+
+
 # Create FastAPI app instance
 app = FastAPI(
     title="Admin API",
     description="Admin dashboard API for managing organizations, users, and incidents",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware for development
@@ -52,7 +64,7 @@ async def check_admin_status(email: EmailStr):
 
 
 @app.get("/admin/stats", response_model=schemas.Stats)
-async def get_stats(db: aiosqlite.Connection = Depends(get_db_connection)):
+async def get_stats(db: aiosqlite.Connection = Depends(get_read_connection)):
     """
     Get dashboard statistics including total counts for organizations, users, and incidents.
     
@@ -63,20 +75,59 @@ async def get_stats(db: aiosqlite.Connection = Depends(get_db_connection)):
 
 
 @app.get("/admin/organizations", response_model=List[schemas.Organization])
-async def get_organizations(db: aiosqlite.Connection = Depends(get_db_connection)):
+async def get_organizations(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort: str = Query("name", description="name, plan, created_at, org_id, user_count or incident_count"),
+    order: Literal["asc", "desc"] = Query("asc"),
+    db: aiosqlite.Connection = Depends(get_read_connection)
+):
     """
-    Get all organizations with their user counts and incident counts.
+    Get organizations with their user counts and incident counts.
     
+    Args:
+        limit: Page size (all organizations when omitted)
+        offset: Number of organizations to skip
+        sort: Column to sort by
+        order: Sort direction
+        
+    Returns:
+        List[schemas.Organization]: The requested page of organizations; the
+        X-Total-Count header holds the total number of organizations
+    """
+    if sort not in crud.ORGANIZATION_SORT_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"cannot sort by {sort!r}")
+    organizations, total = await crud.get_organizations(db, limit, offset, sort, order == "desc")
+    response.headers["X-Total-Count"] = str(total)
+    return organizations
+
+
+@app.get("/admin/organizations/{org_id}/stats", response_model=schemas.OrganizationStats)
+async def get_organization_stats(
+    org_id: str,
+    db: aiosqlite.Connection = Depends(get_read_connection)
+):
+    """
+    Get user and incident counts for one organization, with incidents broken
+    down by severity and source.
+
+    Args:
+        org_id: Organization ID
+
     Returns:
-        List[schemas.Organization]: List of all organizations
+        schemas.OrganizationStats: The organization's counters
     """
-    return await crud.get_organizations(db)
+    org_stats = await crud.get_organization_stats(db, org_id)
+    if org_stats is None:
+        raise HTTPException(status_code=404, detail="Organization not found")
+    return org_stats
 
 
 @app.get("/admin/organizations/{org_id}/users", response_model=List[schemas.User])
 async def get_organization_users(
     org_id: str,
-    db: aiosqlite.Connection = Depends(get_db_connection)
+    db: aiosqlite.Connection = Depends(get_read_connection)
 ):
     """
     Get all users for a specific organization.
@@ -93,7 +144,7 @@ async def get_organization_users(
 @app.get("/admin/organizations/{org_id}/incidents", response_model=List[schemas.IncidentReport])
 async def get_organization_incidents(
     org_id: str,
-    db: aiosqlite.Connection = Depends(get_db_connection)
+    db: aiosqlite.Connection = Depends(get_read_connection)
 ):
     """
     Get all incident reports for a specific organization.
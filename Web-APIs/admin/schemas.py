@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 
 class User(BaseModel):
@@ -70,6 +70,20 @@ class Stats(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class OrganizationStats(BaseModel):
+    """
+    Pydantic model for one organization's counters, with incidents broken
+    down by severity and by source.
+    """
+    org_id: str
+    user_count: int
+    incident_count: int
+    incidents_by_severity: Dict[str, int]
+    incidents_by_source: Dict[str, int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class AdminStatus(BaseModel):
     """
     Pydantic model for admin status check response.
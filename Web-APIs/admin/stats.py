@@ -0,0 +1,169 @@
+"""
+Materialized counters behind /admin/stats and the per-organization counts.
+
+- admin_counters: total organizations / users / incidents
+- org_stats: users and incidents per organization
+- org_incident_breakdown: incidents per organization by severity and source
+
+Triggers on organizations, users and incident_reports keep them current
+for every writer, so reads are primary-key lookups instead of COUNT(*)
+scans. `reconcile` recomputes everything from the base tables and reports
+(and by default repairs) any drift:
+
+    python stats.py [path/to/db] [--check]
+"""
+import sys, asyncio
+from typing import Dict, List, Tuple
+
+import aiosqlite
+
+TABLES = [
+    """CREATE TABLE IF NOT EXISTS admin_counters (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS org_stats (
+        org_id TEXT PRIMARY KEY,
+        user_count INTEGER NOT NULL DEFAULT 0,
+        incident_count INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS org_incident_breakdown (
+        org_id TEXT NOT NULL,
+        dimension TEXT NOT NULL,   -- 'severity' or 'source'
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (org_id, dimension, value)
+    ) WITHOUT ROWID""",
+]
+
+
+def _total(name: str, delta: int) -> str:
+    return (f"INSERT INTO admin_counters (name, value) VALUES ('{name}', {delta}) "
+            f"ON CONFLICT (name) DO UPDATE SET value = value + ({delta});")
+
+
+def _org(row: str, column: str, delta: int) -> str:
+    # row is NEW or OLD
+    return (f"INSERT INTO org_stats (org_id, {column}) VALUES ({row}.org_id, {delta}) "
+            f"ON CONFLICT (org_id) DO UPDATE SET {column} = {column} + ({delta});")
+
+
+def _breakdown(row: str, delta: int) -> str:
+    return "".join(
+        f"INSERT INTO org_incident_breakdown (org_id, dimension, value, count) "
+        f"VALUES ({row}.org_id, '{dim}', {row}.{dim}, {delta}) "
+        f"ON CONFLICT (org_id, dimension, value) DO UPDATE SET count = count + ({delta});"
+        for dim in ("severity", "source")
+    )
+
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS organizations_stats_ai AFTER INSERT ON organizations BEGIN
+        {_total("organizations", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS organizations_stats_ad AFTER DELETE ON organizations BEGIN
+        {_total("organizations", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_stats_ai AFTER INSERT ON users BEGIN
+        {_total("users", 1)} {_org("NEW", "user_count", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_stats_ad AFTER DELETE ON users BEGIN
+        {_total("users", -1)} {_org("OLD", "user_count", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS users_stats_au AFTER UPDATE OF org_id ON users BEGIN
+        {_org("OLD", "user_count", -1)} {_org("NEW", "user_count", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS incidents_stats_ai AFTER INSERT ON incident_reports BEGIN
+        {_total("incidents", 1)} {_org("NEW", "incident_count", 1)} {_breakdown("NEW", 1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS incidents_stats_ad AFTER DELETE ON incident_reports BEGIN
+        {_total("incidents", -1)} {_org("OLD", "incident_count", -1)} {_breakdown("OLD", -1)}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS incidents_stats_au AFTER UPDATE OF org_id, severity, source ON incident_reports BEGIN
+        {_org("OLD", "incident_count", -1)} {_breakdown("OLD", -1)}
+        {_org("NEW", "incident_count", 1)} {_breakdown("NEW", 1)}
+    END""",
+]
+
+# what the counters should hold, straight from the base tables
+_EXPECTED = {
+    "admin_counters": """
+        SELECT 'organizations', COUNT(*) FROM organizations
+        UNION ALL SELECT 'users', COUNT(*) FROM users
+        UNION ALL SELECT 'incidents', COUNT(*) FROM incident_reports""",
+    "org_stats": """
+        SELECT org_id, SUM(users), SUM(incidents) FROM (
+            SELECT org_id, COUNT(*) AS users, 0 AS incidents FROM users GROUP BY org_id
+            UNION ALL
+            SELECT org_id, 0, COUNT(*) FROM incident_reports GROUP BY org_id
+        ) GROUP BY org_id""",
+    "org_incident_breakdown": """
+        SELECT org_id, 'severity', severity, COUNT(*) FROM incident_reports GROUP BY org_id, severity
+        UNION ALL
+        SELECT org_id, 'source', source, COUNT(*) FROM incident_reports GROUP BY org_id, source""",
+}
+_STORED = {
+    "admin_counters": "SELECT name, value FROM admin_counters",
+    "org_stats": "SELECT org_id, user_count, incident_count FROM org_stats "
+                 "WHERE user_count != 0 OR incident_count != 0",
+    "org_incident_breakdown": "SELECT org_id, dimension, value, count FROM org_incident_breakdown WHERE count != 0",
+}
+
+
+# leading columns that identify a counter row
+_KEY_WIDTH = {"admin_counters": 1, "org_stats": 1, "org_incident_breakdown": 3}
+
+
+async def _rows(db: aiosqlite.Connection, sql: str, key_width: int) -> Dict[Tuple, Tuple]:
+    cursor = await db.execute(sql)
+    rows = await cursor.fetchall()
+    await cursor.close()
+    return {tuple(r[:key_width]): tuple(r[key_width:]) for r in rows}
+
+
+async def reconcile(db: aiosqlite.Connection, fix: bool = True) -> List[str]:
+    """
+    Recompute every counter from the base tables and compare. Returns one
+    line per mismatch; with `fix` the counters are rewritten to match.
+    """
+    problems = []
+    for table, expected_sql in _EXPECTED.items():
+        expected = await _rows(db, expected_sql, _KEY_WIDTH[table])
+        stored = await _rows(db, _STORED[table], _KEY_WIDTH[table])
+        expected = {k: v for k, v in expected.items() if any(v)}
+        for key in sorted(set(expected) | set(stored), key=str):
+            if expected.get(key) != stored.get(key):
+                problems.append(f"{table} {key}: stored {stored.get(key)} expected {expected.get(key)}")
+    if fix and problems:
+        for table, expected_sql in _EXPECTED.items():
+            await db.execute(f"DELETE FROM {table}")
+            await db.execute(f"INSERT INTO {table} {expected_sql}")
+        await db.commit()
+    return problems
+
+
+async def migrate(db: aiosqlite.Connection):
+    """Create the counter tables and triggers; fill them on first run. Idempotent."""
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admin_counters'")
+    exists = await cursor.fetchone() is not None
+    await cursor.close()
+    for statement in TABLES + TRIGGERS:
+        await db.execute(statement)
+    await db.commit()
+    if not exists:
+        await reconcile(db, fix=True)
+
+
+async def _main(argv):
+    path = next((a for a in argv if not a.startswith("--")), "admin_mock.db")
+    async with aiosqlite.connect(path) as db:
+        await migrate(db)
+        problems = await reconcile(db, fix="--check" not in argv)
+    for line in problems:
+        print(line)
+    print(f"{path}: {len(problems)} counter mismatch(es)" + (" fixed" if problems and "--check" not in argv else ""))
+    return 1 if problems and "--check" in argv else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -1,12 +1,21 @@
 # api.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
-import json
-import os
+import os, sys, hmac, ipaddress
+from pathlib import Path
+from typing import Optional
 import uvicorn
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-JSON_PATH = os.path.join(BASE_DIR, "leaks.json")
+# the leak store lives with the crawlers in Services/Core
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from Services.Core.leakstore import get_store
+from leak_snapshot import SnapshotHolder
+
+# every request is answered from memory; see leak_snapshot.py
+leaks = SnapshotHolder(get_store())
+
+# POST /leaks/reload needs this in the x-reload-token header; unset = loopback callers only
+RELOAD_TOKEN = os.environ.get("ATHR_LEAKS_RELOAD_TOKEN")
 
 app = FastAPI(
     title="Athr Leaks API",
@@ -22,24 +31,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def load_data():
-    if not os.path.exists(JSON_PATH):
-        return []
-    try:
-        with open(JSON_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        return []
-
-
 @app.get("/leaks")
-def get_leaks(limit: int = 50, offset: int = 0):
+def get_leaks(
+    limit: int = 50,
+    offset: int = 0,
+    country: Optional[str] = None,
+    source_group: Optional[str] = None,
+    since: Optional[str] = Query(None, description="first discovered day, YYYY-MM-DD"),
+    until: Optional[str] = Query(None, description="last discovered day, YYYY-MM-DD"),
+    q: Optional[str] = Query(None, description="case-insensitive substring of leak_name"),
+):
     """
-    Get leaks from JSON file with pagination.
-    Newest leaks are at the top (because crawler prepends).
+    Get leaks with pagination, optionally filtered.
+    Newest leaks are at the top.
     """
-    data = load_data()
-    return data[offset: offset + limit]
+    return leaks.current().query(offset, limit, country, source_group, since, until, q)
 
 
 @app.get("/leaks/latest")
@@ -47,20 +53,42 @@ def get_latest(limit: int = 20):
     """
     Quick endpoint for the latest N leaks.
     """
-    data = load_data()
-    return data[:limit]
+    return leaks.current().query(0, limit)
+
+
+def verify_reload_caller(request: Request):
+    if RELOAD_TOKEN:
+        token = request.headers.get("x-reload-token") or ""
+        if hmac.compare_digest(token.encode(), RELOAD_TOKEN.encode()):
+            return True
+    else:
+        try:
+            if request.client and ipaddress.ip_address(request.client.host).is_loopback:
+                return True
+        except ValueError:
+            pass
+    raise HTTPException(status_code=403, detail="Forbidden")
+
+
+@app.post("/leaks/reload", dependencies=[Depends(verify_reload_caller)])
+def reload_leaks():
+    """
+    Pick up new leaks now (the crawler calls this after adding leaks);
+    the snapshot is only rebuilt if the store has more leaks than it.
+    """
+    return {"leaks": len(leaks.reload().leaks)}
 
 
 @app.get("/leaks/{index}")
 def get_leak_by_index(index: int):
     """
-    Get a single leak by its index in the JSON array.
+    Get a single leak by its position (0 = newest).
     (You can later change this to use an ID field.)
     """
-    data = load_data()
-    if index < 0 or index >= len(data):
+    snapshot = leaks.current()
+    if index < 0 or index >= len(snapshot.leaks):
         raise HTTPException(status_code=404, detail="Leak not found")
-    return data[index]
+    return snapshot.leaks[index]
 
 if __name__ == "__main__":
     uvicorn.run("bh_data:app", host="0.0.0.0", port=8005, reload=True)
\ No newline at end of file
@@ -0,0 +1,173 @@
+"""
+Result cache for /search/domains.
+
+Entries are serialized response bodies keyed by the normalized domain set
+(plus page size and cursor). Each entry remembers the domain_versions
+counters it was computed under (see search_index.py); ingesting a finding
+or log for one of those domains bumps its counter, and the entry is then
+treated as a miss. Checking that costs one indexed read per request,
+works across uvicorn workers and needs no invalidation messages.
+
+Two tiers:
+- an in-process LRU bounded by entry count, total bytes and TTL
+- optionally a local SQLite file (ATHR_SEARCH_CACHE_DB) shared by all
+  workers on the host
+"""
+import os, json, time, sqlite3, asyncio, threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+SEARCH_CACHE_DB = os.environ.get("ATHR_SEARCH_CACHE_DB")  # unset = in-process only
+SEARCH_CACHE_TTL = float(os.environ.get("ATHR_SEARCH_CACHE_TTL", 300))
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    next_cursor: Optional[str]
+    versions: Dict[str, int]
+    expires: float          # time.time()
+
+
+def make_key(domains: List[str], limit: int, cursor: Optional[str]) -> str:
+    # `domains` is already normalized (lower-cased, de-duplicated, sorted)
+    return json.dumps([domains, limit, cursor], separators=(",", ":"))
+
+
+class SearchCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: float = SEARCH_CACHE_TTL, path: Optional[str] = SEARCH_CACHE_DB):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lru: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = dict(hits=0, shared_hits=0, misses=0, stale=0, expired=0, evictions=0)
+        self._shared = _SharedTier(path) if path else None
+
+    # --- in-process tier ---
+
+    def _pop(self, key: str):
+        page = self._lru.pop(key, None)
+        if page is not None:
+            self._bytes -= len(page.body)
+
+    def _remember(self, key: str, page: CachedPage):
+        if len(page.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._pop(key)
+            self._lru[key] = page
+            self._bytes += len(page.body)
+            while len(self._lru) > self.max_entries or self._bytes > self.max_bytes:
+                _, old = self._lru.popitem(last=False)
+                self._bytes -= len(old.body)
+                self.counters["evictions"] += 1
+
+    def _valid(self, page: CachedPage, versions: Dict[str, int]) -> Optional[str]:
+        if page.expires < time.time():
+            return "expired"
+        if page.versions != versions:
+            return "stale"
+        return None
+
+    # --- public API ---
+
+    async def get(self, key: str, versions: Dict[str, int]) -> Optional[CachedPage]:
+        """The cached page if it is fresh and was computed under `versions`."""
+        with self._lock:
+            page = self._lru.get(key)
+            if page is not None:
+                reason = self._valid(page, versions)
+                if reason is None:
+                    self._lru.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return page
+                self._pop(key)
+                self.counters[reason] += 1
+
+        if self._shared is not None:
+            page = await asyncio.to_thread(self._shared.get, key)
+            if page is not None and self._valid(page, versions) is None:
+                self._remember(key, page)
+                with self._lock:
+                    self.counters["shared_hits"] += 1
+                return page
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, versions: Dict[str, int], body: bytes, next_cursor: Optional[str]):
+        page = CachedPage(body, next_cursor, versions, time.time() + self.ttl)
+        self._remember(key, page)
+        if self._shared is not None:
+            await asyncio.to_thread(self._shared.put, key, page)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._bytes = 0
+        if self._shared is not None:
+            self._shared.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["shared_hits"] + self.counters["misses"]
+            return dict(
+                self.counters,
+                entries=len(self._lru),
+                bytes=self._bytes,
+                hit_rate=round((self.counters["hits"] + self.counters["shared_hits"]) / lookups, 4) if lookups else None,
+                shared=self._shared is not None,
+            )
+
+
+class _SharedTier:
+    """SQLite-file tier shared by the workers on one host."""
+
+    PRUNE_EVERY = 256  # puts between sweeps of expired rows
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS search_cache (
+            key TEXT PRIMARY KEY,
+            versions TEXT NOT NULL,
+            expires REAL NOT NULL,
+            next_cursor TEXT,
+            body BLOB NOT NULL
+        )""")
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, next_cursor, versions, expires FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        body, next_cursor, versions, expires = row
+        return CachedPage(body, next_cursor, json.loads(versions), expires)
+
+    def put(self, key: str, page: CachedPage):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, versions, expires, next_cursor, body) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(page.versions), page.expires, page.next_cursor, page.body),
+            )
+            self._puts += 1
+            if self._puts % self.PRUNE_EVERY == 0:
+                self._conn.execute("DELETE FROM search_cache WHERE expires < ?", (time.time(),))
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM search_cache")
+
+
+search_cache = SearchCache()
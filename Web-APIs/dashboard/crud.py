@@ -1,82 +1,163 @@
-from typing import List, Optional
+import json, base64
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, func, union, and_, or_, type_coerce, String
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
 import models, schemas
 from collections import defaultdict
 
+# artifacts fetched per round trip when paging/streaming search results
+PAGE_SIZE = 200
 
-async def find_leaks_by_domains(
-    db: AsyncSession, query: schemas.DomainSearchQuery
-) -> List[schemas.LeakedFileInfo]:
+
+def encode_cursor(cursor: schemas.SearchCursor) -> str:
+    """Opaque, URL-safe form of a keyset cursor."""
+    raw = json.dumps([cursor.collected_at, cursor.artifact_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> schemas.SearchCursor:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        collected_at, artifact_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return schemas.SearchCursor(collected_at=collected_at, artifact_id=int(artifact_id))
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+
+def normalize_domains(domains: Optional[List[str]]) -> List[str]:
+    # the derived domain columns (see search_index.py) are stored lower-cased
+    return sorted({d.strip().lower() for d in domains or [] if d.strip()})
+
+
+# collected_at as stored: keyset comparisons must match the ORDER BY on the
+# raw text, not a re-serialized datetime (formats differ between writers)
+_COLLECTED_RAW = type_coerce(models.ContentDetails.collected_at, String)
+
+
+def _after(cursor: schemas.SearchCursor):
     """
-    Finds leaked files by searching for domains in associated emails and logs.
-    It aggregates all findings for each unique file (artifact_id).
+    Keyset condition for ORDER BY collected_at DESC, artifact_id DESC. SQLite
+    sorts NULL collected_at last in DESC order.
     """
-    if not query.domains:
-        return []
-
-    # 1. Build search conditions specific to each table
-    ulp_conditions = []
-    general_conditions = []
-    log_conditions = []
-    for domain in query.domains:
-        email_pattern = f"%@{domain}"
-        domain_pattern = f"%{domain}%"
-        ulp_conditions.append(models.UlpFinding.email.like(email_pattern))
-        # Assuming emails are stored in the 'value' column of the 'general' table
-        general_conditions.append(models.GeneralFinding.value.like(email_pattern))
-        log_conditions.append(models.Log.Domains_Leaked.like(domain_pattern))
-
-    # 2. Find all unique artifact_ids that match the conditions
-    # We query each table separately with its own conditions to avoid cartesian products.
-    ulp_ids_query = select(models.UlpFinding.artifact_id).where(or_(*ulp_conditions))
-    general_ids_query = select(models.GeneralFinding.artifact_id).where(
-        or_(*general_conditions)
+    artifact_id = models.ContentDetails.artifact_id
+    if cursor.collected_at is None:
+        return and_(_COLLECTED_RAW.is_(None), artifact_id < cursor.artifact_id)
+    return or_(
+        _COLLECTED_RAW < cursor.collected_at,
+        and_(_COLLECTED_RAW == cursor.collected_at, artifact_id < cursor.artifact_id),
+        _COLLECTED_RAW.is_(None),
     )
-    log_ids_query = select(models.Log.artifact_id).where(or_(*log_conditions))
-
-    matching_artifact_ids = set()
-    for q in [ulp_ids_query, general_ids_query, log_ids_query]:
-        result = await db.execute(q)
-        for artifact_id in result.scalars().all():
-            if artifact_id is not None:
-                matching_artifact_ids.add(artifact_id)
 
-    if not matching_artifact_ids:
-        return []
 
-    # 3. Fetch all content_details and related data for the matching artifacts
-    final_query = (
-        select(models.ContentDetails)
+async def fetch_page(
+    db: AsyncSession, domains: List[str], cursor: Optional[schemas.SearchCursor], limit: int
+) -> Tuple[List[schemas.LeakedFileInfo], Optional[schemas.SearchCursor]]:
+    """
+    One page of matching artifacts with their matching emails and logs, and
+    the cursor of the next page (None after the last). Only matching child
+    rows of the artifacts on this page are read, so the cost follows the
+    page rather than the total number of matches.
+    """
+    # 1. The page of artifacts, selected through the indexed domain columns
+    matching_artifact_ids = union(
+        select(models.UlpFinding.artifact_id).where(models.UlpFinding.email_domain.in_(domains)),
+        select(models.GeneralFinding.artifact_id).where(models.GeneralFinding.email_domain.in_(domains)),
+        select(models.LogDomain.artifact_id).where(models.LogDomain.domain.in_(domains)),
+    )
+    page_query = (
+        select(models.ContentDetails, _COLLECTED_RAW.label("collected_raw"))
         .where(models.ContentDetails.artifact_id.in_(matching_artifact_ids))
-        .options(
-            selectinload(models.ContentDetails.findings_ulp),
-            selectinload(models.ContentDetails.findings_general),
-            selectinload(models.ContentDetails.compromised_assets),
-        )
-        .order_by(models.ContentDetails.collected_at.desc())
+        .order_by(models.ContentDetails.collected_at.desc(), models.ContentDetails.artifact_id.desc())
+        .limit(limit)
     )
+    if cursor is not None:
+        page_query = page_query.where(_after(cursor))
+    rows = (await db.execute(page_query)).all()
+    if not rows:
+        return [], None
+    artifacts = [artifact for artifact, _ in rows]
+    next_cursor = None
+    if len(rows) == limit:
+        next_cursor = schemas.SearchCursor(collected_at=rows[-1][1], artifact_id=rows[-1][0].artifact_id)
+    page_ids = [a.artifact_id for a in artifacts]
 
-    result = await db.execute(final_query)
-    # Use .unique() to ensure each ContentDetails object is processed once
-    artifacts = result.scalars().unique().all()
+    # 2. Matching emails from both finding tables, aggregated per artifact
+    matched_emails = union(
+        select(models.UlpFinding.artifact_id.label("artifact_id"), models.UlpFinding.email.label("email"))
+        .where(models.UlpFinding.email_domain.in_(domains), models.UlpFinding.artifact_id.in_(page_ids)),
+        select(models.GeneralFinding.artifact_id, models.GeneralFinding.value)
+        .where(models.GeneralFinding.email_domain.in_(domains), models.GeneralFinding.artifact_id.in_(page_ids)),
+    ).subquery()
+    emails_query = (
+        select(matched_emails.c.artifact_id, func.json_group_array(matched_emails.c.email))
+        .group_by(matched_emails.c.artifact_id)
+    )
+    emails_by_artifact: Dict[int, List[str]] = {
+        artifact_id: sorted(json.loads(emails))
+        for artifact_id, emails in (await db.execute(emails_query)).all()
+    }
+
+    # 3. Only the logs that list one of the domains
+    log_ids = select(models.LogDomain.log_id).where(
+        models.LogDomain.domain.in_(domains), models.LogDomain.artifact_id.in_(page_ids)
+    )
+    logs_query = select(models.Log).where(models.Log.entity_id.in_(log_ids)).order_by(models.Log.entity_id)
+    logs_by_artifact = defaultdict(list)
+    for log in (await db.execute(logs_query)).scalars():
+        logs_by_artifact[log.artifact_id].append(schemas.CompromisedAsset.model_validate(log))
 
     # 4. Format the response
     response_list = []
     for artifact in artifacts:
-        # Filter emails and logs to only include those matching the query domains
-        matching_emails = {f.email for f in artifact.findings_ulp if any(f.email.endswith(f"@{d}") for d in query.domains)}
-        matching_emails.update({f.value for f in artifact.findings_general if any(f.value.endswith(f"@{d}") for d in query.domains)})
-
-        matching_logs = [schemas.CompromisedAsset.model_validate(log) for log in artifact.compromised_assets if log.Domains_Leaked and any(d in log.Domains_Leaked for d in query.domains)]
-
-        # Create the final response object for this artifact
         leaked_file_info = schemas.LeakedFileInfo.model_validate(artifact)
-        leaked_file_info.emails = sorted(list(matching_emails))
-        leaked_file_info.logs = matching_logs
+        leaked_file_info.emails = emails_by_artifact.get(artifact.artifact_id, [])
+        leaked_file_info.logs = logs_by_artifact.get(artifact.artifact_id, [])
         response_list.append(leaked_file_info)
+    return response_list, next_cursor
+
+
+async def domain_versions(db: AsyncSession, domains: List[str]) -> Dict[str, int]:
+    """Current write counters of `domains` (absent = never written)."""
+    result = await db.execute(
+        select(models.DomainVersion.domain, models.DomainVersion.version)
+        .where(models.DomainVersion.domain.in_(domains))
+    )
+    return dict(result.all())
+
+
+async def iter_leaks_by_domains(
+    db: AsyncSession, query: schemas.DomainSearchQuery, page_size: int = PAGE_SIZE
+) -> AsyncIterator[schemas.LeakedFileInfo]:
+    """
+    Yields matching artifacts newest first, fetching `page_size` at a time
+    by keyset. Starts after `query.cursor` and stops after `query.limit`
+    results when those are set.
+    """
+    domains = normalize_domains(query.domains)
+    if not domains:
+        return
+    cursor, remaining = query.cursor, query.limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page, cursor = await fetch_page(db, domains, cursor, size)
+        for info in page:
+            yield info
+        if cursor is None:
+            return
+        if remaining is not None:
+            remaining -= len(page)
 
-    return response_list
\ No newline at end of file
+
+async def find_leaks_by_domains(
+    db: AsyncSession, query: schemas.DomainSearchQuery
+) -> List[schemas.LeakedFileInfo]:
+    """
+    Finds leaked files by searching for domains in associated emails and logs.
+    It aggregates all findings for each unique file (artifact_id).
+
+    Results are ordered newest first; `query.limit`/`query.cursor` select a
+    window of them (fetch_page also returns the cursor of the next page).
+    """
+    return [info async for info in iter_leaks_by_domains(db, query)]
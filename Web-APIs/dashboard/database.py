@@ -1,22 +1,43 @@
+import sys
 from typing import AsyncGenerator
 from pathlib import Path
 
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from models import Base
+from search_index import migrate
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from shared.sqlite_pool import tune_engine, prewarm_engine, readonly_uri, CACHED_STATEMENTS
 
 # The database file is in the same directory as this script.
 # We construct an absolute path to it to avoid issues with the current working directory.
 DATABASE_FILE = "athr_demo_test.db"
 SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{Path(__file__).parent / DATABASE_FILE}"
 
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+POOL_SIZE = 4
+READ_POOL_SIZE = 8
+
+# read-write engine (startup migration, writes) and a read-only one for GET
+# endpoints; both keep warm, tuned connections (see shared/sqlite_pool.py)
+engine = tune_engine(create_async_engine(
+    SQLALCHEMY_DATABASE_URL, pool_size=POOL_SIZE,
+    connect_args={"cached_statements": CACHED_STATEMENTS},
+))
+read_engine = tune_engine(create_async_engine(
+    f"sqlite+aiosqlite:///{readonly_uri(Path(__file__).parent / DATABASE_FILE)}&uri=true",
+    pool_size=READ_POOL_SIZE, connect_args={"cached_statements": CACHED_STATEMENTS},
+), readonly=True)
 
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+async_read_session_maker = async_sessionmaker(read_engine, expire_on_commit=False)
 
 
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # derived search columns/indexes/triggers, backfilled on older DBs
+        await conn.run_sync(migrate)
+    await prewarm_engine(read_engine, READ_POOL_SIZE)
 
 
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
@@ -27,4 +48,10 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
     it is closed after the request is finished.
     """
     async with async_session_maker() as session:
+        yield session
+
+
+async def get_read_session() -> AsyncGenerator[AsyncSession, None]:
+    """Like get_session, but on the read-only engine (for GET endpoints)."""
+    async with async_read_session_maker() as session:
         yield session
\ No newline at end of file
@@ -0,0 +1,181 @@
+"""
+In-memory snapshot of the leak store for bh_data.
+
+The API serves every request from an immutable Snapshot: all leaks (newest
+first) plus secondary indexes by country, source_group and discovered
+date. The store is looked at only when its files change (the SQLite DB and
+its WAL: mtime and size, checked at most every RELOAD_CHECK_INTERVAL
+seconds) or when `reload()` is called, e.g. by the crawler through POST
+/leaks/reload, and the snapshot is rebuilt only if the leak count moved.
+Between checks, requests don't touch the disk at all.
+"""
+import os, time, bisect, threading
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+RELOAD_CHECK_INTERVAL = float(os.environ.get("ATHR_LEAKS_RELOAD_CHECK", 1.0))
+
+
+def _day(discovered: Optional[str]) -> str:
+    # "2025-05-01 10:00", "2025-05-01T10:00:00Z", ... -> "2025-05-01"
+    return (discovered or "")[:10]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    signature: Tuple
+    leaks: Tuple[dict, ...]                     # newest first
+    # per position, lower-cased: what the filters compare against
+    countries: Tuple[str, ...]
+    source_groups: Tuple[str, ...]
+    days: Tuple[str, ...]
+    names: Tuple[str, ...]
+    # all names joined by "\n", and where each one starts: substring search
+    # runs str.find over this instead of a Python loop over `names`
+    names_blob: str
+    name_starts: Tuple[int, ...]
+    # secondary indexes
+    by_country: Dict[str, Tuple[int, ...]]      # value -> positions, ascending
+    by_source_group: Dict[str, Tuple[int, ...]]
+    sorted_days: Tuple[str, ...]                # discovered days, sorted ...
+    day_positions: Tuple[int, ...]              # ... and the position of each
+
+    @classmethod
+    def build(cls, leaks: List[dict], signature: Tuple = ()) -> "Snapshot":
+        countries = tuple((leak.get("country") or "").lower() for leak in leaks)
+        groups = tuple((leak.get("source_group") or "").lower() for leak in leaks)
+        days = tuple(_day(leak.get("discovered")) for leak in leaks)
+        by_country: Dict[str, List[int]] = {}
+        by_group: Dict[str, List[int]] = {}
+        for pos in range(len(leaks)):
+            by_country.setdefault(countries[pos], []).append(pos)
+            by_group.setdefault(groups[pos], []).append(pos)
+        dated = sorted((day, pos) for pos, day in enumerate(days) if day)
+        names = tuple((leak.get("leak_name") or "").replace("\n", " ").lower() for leak in leaks)
+        starts, offset = [], 0
+        for name in names:
+            starts.append(offset)
+            offset += len(name) + 1
+        return cls(
+            signature=signature,
+            leaks=tuple(leaks),
+            countries=countries,
+            source_groups=groups,
+            days=days,
+            names=names,
+            names_blob="\n".join(names),
+            name_starts=tuple(starts),
+            by_country={k: tuple(v) for k, v in by_country.items() if k},
+            by_source_group={k: tuple(v) for k, v in by_group.items() if k},
+            sorted_days=tuple(d for d, _ in dated),
+            day_positions=tuple(p for _, p in dated),
+        )
+
+    def _name_matches(self, needle: str):
+        """Positions whose name contains `needle` (no newline), ascending."""
+        at, last = self.names_blob.find(needle), -1
+        while at != -1:
+            pos = bisect.bisect_right(self.name_starts, at) - 1
+            if pos != last:
+                yield pos
+                last = pos
+            # continue from the next name
+            nxt = self.name_starts[pos + 1] if pos + 1 < len(self.name_starts) else len(self.names_blob)
+            at = self.names_blob.find(needle, nxt)
+
+    def query(self, offset: int = 0, limit: int = 50, country: Optional[str] = None,
+              source_group: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None, q: Optional[str] = None) -> List[dict]:
+        """
+        Leaks matching every given filter, newest first, [offset, offset + limit).
+        country / source_group match exactly and q is a substring of leak_name,
+        all case-insensitive; since / until are inclusive YYYY-MM-DD days.
+        """
+        if limit <= 0 or offset < 0:
+            return []
+        country = country.lower() if country is not None else None
+        source_group = source_group.lower() if source_group is not None else None
+        q = q.lower() if q is not None else None
+        dated = since is not None or until is not None
+        if not (country is not None or source_group is not None or dated or q is not None):
+            return list(self.leaks[offset: offset + limit])
+
+        # walk the smallest index; check the other filters per position
+        positions = range(len(self.leaks))
+        if q is not None and "\n" not in q:
+            positions = self._name_matches(q)
+        size = len(self.leaks) // 4 if q is not None else len(self.leaks)  # rough guess for the name scan
+        if country is not None and len(self.by_country.get(country, ())) < size:
+            positions = self.by_country.get(country, ())
+            size = len(positions)
+        if source_group is not None and len(self.by_source_group.get(source_group, ())) < size:
+            positions = self.by_source_group.get(source_group, ())
+            size = len(positions)
+        if dated:
+            lo = bisect.bisect_left(self.sorted_days, since) if since else 0
+            hi = bisect.bisect_right(self.sorted_days, until) if until else len(self.sorted_days)
+            if hi - lo < size:
+                positions = sorted(self.day_positions[lo:hi])
+
+        out, skip = [], offset
+        for pos in positions:
+            if country is not None and self.countries[pos] != country:
+                continue
+            if source_group is not None and self.source_groups[pos] != source_group:
+                continue
+            if dated and not (self.days[pos]
+                              and (since is None or self.days[pos] >= since)
+                              and (until is None or self.days[pos] <= until)):
+                continue
+            if q is not None and q not in self.names[pos]:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            out.append(self.leaks[pos])
+            if len(out) == limit:
+                break
+        return out
+
+
+class SnapshotHolder:
+    """Keeps the current Snapshot of a LeakStore and swaps in a new one when the store changes."""
+
+    def __init__(self, store, check_interval: float = RELOAD_CHECK_INTERVAL):
+        self.store = store
+        self.check_interval = check_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _signature(self) -> Tuple:
+        sig = []
+        for path in (self.store.path, self.store.path + "-wal"):
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except FileNotFoundError:
+                sig.append(None)
+        return tuple(sig)
+
+    def reload(self, force: bool = True) -> Snapshot:
+        with self._lock:
+            # taken before reading, so a write that lands mid-read shows up next check
+            signature = self._signature()
+            snapshot = self._snapshot
+            if force or snapshot is None or signature != snapshot.signature:
+                # rows are only appended, so the same count means the same
+                # leaks: a checkpoint or a repeated reload doesn't rebuild
+                count = self.store.count()
+                if snapshot is None or count != len(snapshot.leaks):
+                    self._snapshot = Snapshot.build(self.store.page(0, count), signature)
+                else:
+                    self._snapshot = replace(snapshot, signature=signature)
+            self._checked = time.monotonic()
+            return self._snapshot
+
+    def current(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked < self.check_interval:
+            return snapshot
+        return self.reload(force=False)
@@ -1,13 +1,18 @@
 import uvicorn
-from typing import List
+from typing import List, Literal, Optional
 from contextlib import asynccontextmanager
-from fastapi import Depends, FastAPI, Query
+from fastapi import Depends, FastAPI, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
+from pydantic import TypeAdapter
 
 import crud, schemas
-from database import get_session, create_db_and_tables
+from cache import search_cache, make_key
+from database import get_read_session, create_db_and_tables, async_read_session_maker
+
+PAGE_LIMIT = 100  # default page size for JSON search responses
+_page_adapter = TypeAdapter(List[schemas.LeakedFileInfo])
 
 
 
@@ -61,7 +66,10 @@ async def favicon():
 )
 async def search_leaks_by_domain(
     domains: str = Query(..., description="Comma-separated list of domains to search for."),
-    db: AsyncSession = Depends(get_session),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size (default 100; ndjson streams all matches unless set)."),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page."),
+    format: Literal["json", "ndjson"] = Query("json", description="ndjson streams every match, one per line."),
+    db: AsyncSession = Depends(get_read_session),
 ):
     """
     Searches for leaked files (`artifacts`) that contain data related to a
@@ -69,13 +77,52 @@ async def search_leaks_by_domain(
     associated with each file.
     
     The domains are passed via the `domains` query parameter as a comma-separated string.
+
+    Results are newest first and paginated by keyset: when more results
+    exist, the `X-Next-Cursor` response header holds the `cursor` for the
+    next page. With `format=ndjson` the matches are streamed as they are
+    read from the database, one JSON object per line.
+
+    JSON pages are served from a cache (see cache.py) until new findings for
+    one of the domains are ingested or the entry expires.
     """
     domain_list = [d.strip() for d in domains.split(",") if d.strip()]
+    try:
+        after = crud.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        query = schemas.DomainSearchQuery(domains=domain_list, limit=limit, cursor=after)
+        return StreamingResponse(_stream_ndjson(query), media_type="application/x-ndjson")
+
     if not domain_list:
         return []
-    query = schemas.DomainSearchQuery(domains=domain_list)
-    leaks = await crud.find_leaks_by_domains(db=db, query=query)
-    return leaks
+    normalized, limit = crud.normalize_domains(domain_list), limit or PAGE_LIMIT
+    key = make_key(normalized, limit, cursor)
+    versions = await crud.domain_versions(db, normalized)
+    cached = await search_cache.get(key, versions)
+    if cached is None:
+        page, next_cursor = await crud.fetch_page(db, normalized, after, limit)
+        next_token = crud.encode_cursor(next_cursor) if next_cursor is not None else None
+        body = _page_adapter.dump_json(page, by_alias=True)
+        await search_cache.put(key, versions, body, next_token)
+    else:
+        body, next_token = cached.body, cached.next_cursor
+    headers = {"X-Next-Cursor": next_token} if next_token else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/cache/stats", tags=["Search"], summary="Search cache counters")
+async def cache_stats():
+    return search_cache.stats()
+
+
+async def _stream_ndjson(query: schemas.DomainSearchQuery):
+    # own session: the request-scoped one may be closed before the body is sent
+    async with async_read_session_maker() as db:
+        async for info in crud.iter_leaks_by_domains(db, query):
+            yield info.model_dump_json(by_alias=True) + "\n"
 
 
 if __name__ == "__main__":
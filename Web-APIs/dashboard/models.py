@@ -81,6 +81,8 @@ class UlpFinding(Base):
     entity_id = Column(Integer, primary_key=True)
     artifact_id = Column(Integer, ForeignKey("content_details.artifact_id"))
     email = Column(String, nullable=True)
+    # lower-cased domain of `email`, maintained by triggers (see search_index.py)
+    email_domain = Column(String, nullable=True)
     line_number = Column(Integer, nullable=True)
     col_start = Column(Integer, nullable=True)
     col_end = Column(Integer, nullable=True)
@@ -94,8 +96,26 @@ class GeneralFinding(Base):
     artifact_id = Column(Integer, ForeignKey("content_details.artifact_id"))
     type = Column(String, nullable=True)
     value = Column(String, nullable=True)
+    # lower-cased domain of `value` when it is an email, maintained by triggers
+    email_domain = Column(String, nullable=True)
     line_number = Column(Integer, nullable=True)
     col_start = Column(Integer, nullable=True)
     col_end = Column(Integer, nullable=True)
 
-    incident = relationship("ContentDetails", back_populates="findings_general")
\ No newline at end of file
+    incident = relationship("ContentDetails", back_populates="findings_general")
+
+
+class LogDomain(Base):
+    """One row per entry of Log.Domains_Leaked, maintained by triggers."""
+    __tablename__ = "log_domains"
+    id = Column(Integer, primary_key=True)
+    log_id = Column(Integer, ForeignKey("logs.entity_id", ondelete="CASCADE"), nullable=False)
+    artifact_id = Column(Integer, nullable=True)
+    domain = Column(String, nullable=False)
+
+
+class DomainVersion(Base):
+    """Per-domain write counter, bumped by triggers; used to validate cached searches."""
+    __tablename__ = "domain_versions"
+    domain = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False)
@@ -57,6 +57,14 @@ class LeakedFileInfo(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class SearchCursor(BaseModel):
+    """Keyset position in search results (ordered by collected_at, artifact_id, newest first)."""
+    collected_at: Optional[str] = None  # as stored in the DB
+    artifact_id: int
+
+
 class DomainSearchQuery(BaseModel):
     """Defines the structure for a domain-based search request."""
-    domains: Optional[List[str]] = None
\ No newline at end of file
+    domains: Optional[List[str]] = None
+    limit: Optional[int] = None
+    cursor: Optional[SearchCursor] = None
\ No newline at end of file
@@ -0,0 +1,107 @@
+"""
+Benchmark for the /search/domains id lookup: the old '%@domain' / '%domain%'
+LIKE scans vs. the indexed lookups from search_index.py, on a synthetic DB.
+
+    python search_bench.py [--rows 1000000] [--keep path.db]
+"""
+import argparse, os, random, sqlite3, tempfile, time
+
+from sqlalchemy import create_engine
+
+from search_index import migrate
+
+SOURCE_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "athr_demo_test.db")
+TABLES = ("content_details", "ulp", "general", "logs")
+
+
+def build(path, rows, seed=7):
+    """Copy the demo DB's schema and fill it with `rows` ulp rows (general/logs scaled down)."""
+    rnd = random.Random(seed)
+    src = sqlite3.connect(SOURCE_DB)
+    schema = [sql for (name, sql) in src.execute("SELECT name, sql FROM sqlite_master WHERE type = 'table'")
+              if name in TABLES]
+    src.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    for sql in schema:
+        conn.execute(sql)
+    artifacts = max(rows // 100, 1)
+    domains = [f"corp{i}.com" for i in range(5000)] + ["gmail.com", "outlook.com", "yahoo.com"]
+    dom = lambda: domains[min(int(rnd.paretovariate(1.2)) - 1, len(domains) - 1)] if rnd.random() < .3 else rnd.choice(domains)
+
+    with conn:
+        conn.executemany("INSERT INTO content_details (artifact_id, source, severity, collected_at) VALUES (?, ?, ?, ?)",
+                         ((i, "telegram", "high", f"2024-01-{i % 28 + 1:02d} 00:00:00") for i in range(1, artifacts + 1)))
+        conn.executemany("INSERT INTO ulp (artifact_id, email, line_number) VALUES (?, ?, ?)",
+                         ((rnd.randint(1, artifacts), f"user{i}@{dom()}", i) for i in range(rows)))
+        conn.executemany("INSERT INTO general (artifact_id, type, value) VALUES (?, ?, ?)",
+                         ((rnd.randint(1, artifacts), "email", f"info{i}@{dom()}") if i % 2 else
+                          (rnd.randint(1, artifacts), "phone", f"+2010{i:08d}") for i in range(rows // 2)))
+        conn.executemany("INSERT INTO logs (artifact_id, machine_HWID, malware_installDate, Domains_Leaked, "
+                         "Leaked_cookies, Leaked_Autofills) VALUES (?, ?, ?, ?, ?, ?)",
+                         ((rnd.randint(1, artifacts), f"{i:020X}", "2024-03-20 14:47:16",
+                           ",".join({dom() for _ in range(rnd.randint(0, 4))}), rnd.randint(0, 50), rnd.randint(0, 50))
+                          for i in range(rows // 5)))
+    conn.close()
+
+
+def old_ids(conn, domains):
+    ids = set()
+    for table, col, fmt in (("ulp", "email", "%@{}"), ("general", "value", "%@{}"), ("logs", "Domains_Leaked", "%{}%")):
+        where = " OR ".join(f"{col} LIKE ?" for _ in domains)
+        ids.update(r[0] for r in conn.execute(f"SELECT artifact_id FROM {table} WHERE {where}",
+                                              [fmt.format(d) for d in domains]))
+    return ids
+
+
+def new_ids(conn, domains):
+    marks = ",".join("?" * len(domains))
+    sql = (f"SELECT artifact_id FROM ulp WHERE email_domain IN ({marks}) "
+           f"UNION SELECT artifact_id FROM general WHERE email_domain IN ({marks}) "
+           f"UNION SELECT artifact_id FROM log_domains WHERE domain IN ({marks})")
+    return {r[0] for r in conn.execute(sql, domains * 3)}
+
+
+def timed(fn, *args, rounds=3):
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        out = fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--keep", help="write the synthetic DB here instead of a temp file")
+    args = ap.parse_args()
+
+    path = args.keep or os.path.join(tempfile.mkdtemp(prefix="search_bench_"), "bench.db")
+    t0 = time.perf_counter()
+    build(path, args.rows)
+    print(f"built {args.rows} ulp rows in {time.perf_counter() - t0:.1f}s -> {path}")
+
+    queries = [["corp1.com"], ["corp4321.com"], ["gmail.com"], ["corp7.com", "corp99.com", "nomatch.org"]]
+    conn = sqlite3.connect(path)
+    before = [timed(old_ids, conn, q, rounds=1) for q in queries]
+
+    t0 = time.perf_counter()
+    with create_engine(f"sqlite:///{path}").begin() as sa_conn:
+        stats = migrate(sa_conn)
+    print(f"migrate/backfill {stats} in {time.perf_counter() - t0:.1f}s")
+
+    for q, (t_old, ids_old) in zip(queries, before):
+        t_new, ids_new = timed(new_ids, conn, q)
+        # the old log match was a substring test; indexed lookups are exact
+        print(f"{','.join(q):<36} LIKE {t_old * 1000:9.1f} ms ({len(ids_old):>6} ids)   "
+              f"indexed {t_new * 1000:7.2f} ms ({len(ids_new):>6} ids)   x{t_old / max(t_new, 1e-9):,.0f}")
+    conn.close()
+    if not args.keep:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Derived, indexed columns behind /search/domains.
+
+- ulp.email_domain / general.email_domain: lower-cased part after the '@'
+- log_domains: one row per entry of logs.Domains_Leaked
+- domain_versions: per-domain counter bumped whenever a finding or log row
+  for that domain is written, so cached search results can be checked
+  for staleness with one indexed read (see cache.py)
+
+SQLite triggers keep them current for every writer (ingest scripts included,
+not just this API), so searches are indexed equality lookups instead of
+'%@domain' LIKE scans. `migrate` is idempotent: it adds what is missing and
+backfills rows written before the triggers existed.
+
+    python search_index.py [path/to/db]
+"""
+import sys, time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection
+
+# lower(trim(part after the first '@')); NULL when there is no '@'
+_DOMAIN_OF = "CASE WHEN instr({col}, '@') > 0 THEN lower(trim(substr({col}, instr({col}, '@') + 1))) END"
+
+# Domains_Leaked ("a.com,b.com") as a JSON array for json_each; CTEs are not
+# allowed inside triggers, so this is how a trigger explodes the list
+_SPLIT = ("json_each('[\"' || replace(replace(replace({col}, '\\', '\\\\'), '\"', '\\\"'), ',', '\",\"') || '\"]')")
+
+
+def _exploded(src: str) -> str:
+    # `src` is NEW inside a trigger, or the logs table itself for a backfill
+    col = f"{src}.Domains_Leaked"
+    tables = "" if src == "NEW" else f"{src}, "
+    return (f"SELECT {src}.entity_id, {src}.artifact_id, lower(trim(d.value)) "
+            f"FROM {tables}{_SPLIT.format(col=col)} AS d WHERE trim(d.value) != ''")
+
+
+LOG_DOMAINS = """CREATE TABLE IF NOT EXISTS log_domains (
+    id INTEGER PRIMARY KEY,
+    log_id INTEGER NOT NULL REFERENCES logs(entity_id) ON DELETE CASCADE,
+    artifact_id INTEGER,
+    domain TEXT NOT NULL
+)"""
+
+DOMAIN_VERSIONS = """CREATE TABLE IF NOT EXISTS domain_versions (
+    domain TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID"""
+
+# the WHERE also disambiguates INSERT ... SELECT ... ON CONFLICT for the parser
+_BUMP = ("INSERT INTO domain_versions (domain, version) SELECT {d}, 1 WHERE {d} IS NOT NULL "
+         "ON CONFLICT (domain) DO UPDATE SET version = version + 1;")
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_log_domains_domain ON log_domains(domain, artifact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_log_domains_log ON log_domains(log_id)",
+    "CREATE INDEX IF NOT EXISTS idx_ulp_email_domain ON ulp(email_domain, artifact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_general_email_domain ON general(email_domain, artifact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_ulp_artifact ON ulp(artifact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_general_artifact ON general(artifact_id)",
+    "CREATE INDEX IF NOT EXISTS idx_logs_artifact ON logs(artifact_id)",
+]
+
+TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {t}_email_domain_ai AFTER INSERT ON {t}
+        WHEN NEW.email_domain IS NULL BEGIN
+        UPDATE {t} SET email_domain = {_DOMAIN_OF.format(col="NEW." + c)} WHERE entity_id = NEW.entity_id;
+    END"""
+    for t, c in (("ulp", "email"), ("general", "value"))
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS {t}_email_domain_au AFTER UPDATE OF {c} ON {t} BEGIN
+        UPDATE {t} SET email_domain = {_DOMAIN_OF.format(col="NEW." + c)} WHERE entity_id = NEW.entity_id;
+    END"""
+    for t, c in (("ulp", "email"), ("general", "value"))
+] + [
+    f"""CREATE TRIGGER IF NOT EXISTS logs_domains_ai AFTER INSERT ON logs
+        WHEN NEW.Domains_Leaked IS NOT NULL BEGIN
+        INSERT INTO log_domains (log_id, artifact_id, domain) {_exploded("NEW")};
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS logs_domains_au AFTER UPDATE OF Domains_Leaked, artifact_id ON logs BEGIN
+        DELETE FROM log_domains WHERE log_id = OLD.entity_id;
+        INSERT INTO log_domains (log_id, artifact_id, domain) {_exploded("NEW")} AND NEW.Domains_Leaked IS NOT NULL;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS logs_domains_ad AFTER DELETE ON logs BEGIN
+        DELETE FROM log_domains WHERE log_id = OLD.entity_id;
+    END""",
+] + [
+    # domain_versions upkeep; email_domain is usually filled in by the
+    # *_email_domain_ai trigger, which fires the update trigger here
+    stmt
+    for t, d in (("ulp", "email_domain"), ("general", "email_domain"), ("log_domains", "domain"))
+    for stmt in (
+        f"""CREATE TRIGGER IF NOT EXISTS {t}_version_ai AFTER INSERT ON {t} BEGIN
+            {_BUMP.format(d="NEW." + d)}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {t}_version_au AFTER UPDATE OF {d} ON {t} BEGIN
+            {_BUMP.format(d="NEW." + d)}
+            {_BUMP.format(d="OLD." + d)}
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {t}_version_ad AFTER DELETE ON {t} BEGIN
+            {_BUMP.format(d="OLD." + d)}
+        END""",
+    )
+]
+
+
+def _columns(conn: Connection, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def migrate(conn: Connection) -> dict:
+    """Create/backfill the search columns, tables, indexes and triggers. Idempotent."""
+    stats = {}
+    for table in ("ulp", "general"):
+        if "email_domain" not in _columns(conn, table):
+            conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN email_domain TEXT")
+    conn.exec_driver_sql(LOG_DOMAINS)
+    conn.exec_driver_sql(DOMAIN_VERSIONS)
+
+    # backfill rows written before the triggers existed; indexes come after,
+    # building them once is much cheaper than maintaining them row by row
+    for table, col in (("ulp", "email"), ("general", "value")):
+        stats[table] = conn.exec_driver_sql(
+            f"UPDATE {table} SET email_domain = {_DOMAIN_OF.format(col=col)} "
+            f"WHERE email_domain IS NULL AND instr({col}, '@') > 0"
+        ).rowcount
+    stats["log_domains"] = conn.exec_driver_sql(
+        f"INSERT INTO log_domains (log_id, artifact_id, domain) {_exploded('logs')} "
+        "AND logs.Domains_Leaked IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM log_domains x WHERE x.log_id = logs.entity_id)"
+    ).rowcount
+
+    for stmt in INDEXES + TRIGGERS:
+        conn.exec_driver_sql(stmt)
+    conn.exec_driver_sql("PRAGMA optimize")
+    return stats
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else str(Path(__file__).parent / "athr_demo_test.db")
+    engine = create_engine(f"sqlite:///{path}")
+    t0 = time.perf_counter()
+    with engine.begin() as conn:
+        stats = migrate(conn)
+    print(f"{path}: backfilled {stats} in {time.perf_counter() - t0:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
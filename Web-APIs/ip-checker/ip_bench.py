@@ -0,0 +1,113 @@
+"""
+Benchmark /check-ip lookups against a local fake ipinfo server.
+
+Compares the old per-request path (new httpx.AsyncClient, one ipinfo call
+per check) with IPReputation (shared client, verdict cache, single-flight)
+and IPReputation plus a local CIDR list, on a skewed stream of client IPs.
+
+    python ip_bench.py [--checks 1000] [--ips 400] [--concurrency 50] [--latency 0.02]
+"""
+import argparse, asyncio, ipaddress, random, threading, time, json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from ip_reputation import IPReputation, LocalNetworks, verdict_from_ipinfo
+
+
+def serve(latency):
+    calls = {"n": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            calls["n"] += 1
+            time.sleep(latency)
+            ip = self.path.split("?")[0].strip("/")
+            hosting = int(ipaddress.ip_address(ip)) % 5 == 0
+            body = json.dumps({"ip": ip, "privacy": {"vpn": False, "proxy": False, "hosting": hosting}}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, calls
+
+
+def make_stream(checks, ips, seed=5):
+    rnd = random.Random(seed)
+    population = [str(ipaddress.ip_address(0x08000000 + rnd.randrange(1 << 24))) for _ in range(ips)]
+    # a few busy clients and a long tail
+    return [population[min(int(rnd.paretovariate(1.0)) - 1, ips - 1)] if rnd.random() < .6
+            else rnd.choice(population) for _ in range(checks)], population
+
+
+async def old_check(base_url, ip):
+    # what /check-ip did before: a fresh client (and connection) per request
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{base_url}/{ip}?token=x")
+        response.raise_for_status()
+        return verdict_from_ipinfo(response.json())
+
+
+async def run(stream, concurrency, check):
+    queue = list(reversed(stream))
+    latencies = []
+
+    async def worker():
+        while queue:
+            ip = queue.pop()
+            t0 = time.perf_counter()
+            await check(ip)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * .99)]
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--checks", type=int, default=1000)
+    ap.add_argument("--ips", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--latency", type=float, default=0.02, help="fake ipinfo response time (s)")
+    args = ap.parse_args()
+
+    server, calls = serve(args.latency)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    stream, population = make_stream(args.checks, args.ips)
+
+    # a local list covering 3/4 of the population, /24 per address
+    networks = LocalNetworks([(f"{ip}/24", "hosting" if int(ipaddress.ip_address(ip)) % 5 == 0 else "clean")
+                              for ip in population[: len(population) * 3 // 4]])
+
+    cases = [
+        ("per-request client", lambda: (lambda ip: old_check(base_url, ip))),
+        ("shared + cache", lambda: IPReputation("x", base_url).check),
+        ("shared + cache + CIDR", lambda: IPReputation("x", base_url, networks=networks).check),
+    ]
+    for name, make in cases:
+        check = make()
+        calls["n"] = 0
+        elapsed, p50, p99 = await run(stream, args.concurrency, check)
+        print(f"{name:<24} {args.checks / elapsed:8.0f} checks/s   p50 {p50 * 1000:7.2f} ms   "
+              f"p99 {p99 * 1000:7.2f} ms   upstream calls {calls['n']}")
+        owner = getattr(check, "__self__", None)
+        if owner is not None:
+            await owner.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
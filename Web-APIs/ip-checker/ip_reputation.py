@@ -0,0 +1,200 @@
+"""
+IP reputation lookups for the /check-ip gatekeeper.
+
+- one long-lived httpx.AsyncClient (pooled keep-alive connections to ipinfo)
+- verdicts cached per IP in a bounded LRU with a TTL
+- concurrent checks of the same IP share one upstream call (single-flight)
+- optionally, a local CIDR list (IP_NETWORKS_DB) answers for the networks it
+  covers without any network call; private/loopback addresses never go out
+
+The CIDR list is a CSV of `network,category` lines, e.g. exported from a
+VPN/hosting ASN feed:
+
+    # comments and blank lines are ignored
+    104.16.0.0/13,hosting
+    185.159.156.0/22,vpn
+    41.32.0.0/12,clean
+
+Categories vpn / proxy / hosting deny access, clean allows it.
+"""
+import os, csv, time, asyncio, ipaddress
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+IPINFO_URL = os.environ.get("IPINFO_URL", "https://ipinfo.io")
+IP_NETWORKS_DB = os.environ.get("IP_NETWORKS_DB")  # unset = always ask ipinfo
+VERDICT_TTL = float(os.environ.get("IP_VERDICT_TTL", 6 * 3600))
+VERDICT_CACHE_SIZE = int(os.environ.get("IP_VERDICT_CACHE_SIZE", 100_000))
+
+DENIED = {
+    "access_granted": False,
+    "reason": "For security reasons, access from VPNs, proxies, or hosting providers is not permitted."
+}
+GRANTED = {"access_granted": True}
+UNAVAILABLE = {"access_granted": True, "warning": "IP check service unavailable."}
+
+DENY_CATEGORIES = {"vpn", "proxy", "hosting"}
+
+
+def verdict_from_ipinfo(data: dict) -> dict:
+    privacy = data.get("privacy", {})
+    if privacy.get("vpn", False) or privacy.get("proxy", False) or privacy.get("hosting", False):
+        return DENIED
+    return GRANTED
+
+
+class VerdictCache:
+    """LRU of ip -> verdict, bounded by entry count, each entry valid for `ttl` seconds."""
+
+    def __init__(self, max_entries: int = VERDICT_CACHE_SIZE, ttl: float = VERDICT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.counters = dict(hits=0, misses=0, expired=0, evictions=0)
+
+    def get(self, ip: str) -> Optional[dict]:
+        entry = self._entries.get(ip)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        expires, verdict = entry
+        if expires < time.monotonic():
+            del self._entries[ip]
+            self.counters["expired"] += 1
+            return None
+        self._entries.move_to_end(ip)
+        self.counters["hits"] += 1
+        return verdict
+
+    def put(self, ip: str, verdict: dict):
+        self._entries[ip] = (time.monotonic() + self.ttl, verdict)
+        self._entries.move_to_end(ip)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class LocalNetworks:
+    """
+    CIDR list with longest-prefix match: one dict of network -> category per
+    prefix length, probed from the most specific length down.
+    """
+
+    def __init__(self, rows: List[Tuple[str, str]]):
+        by_prefix: Dict[Tuple[int, int], Dict[int, str]] = {}
+        for network, category in rows:
+            net = ipaddress.ip_network(network.strip(), strict=False)
+            by_prefix.setdefault((net.version, net.prefixlen), {})[int(net.network_address)] = category.strip().lower()
+        self._tables: Dict[int, List[Tuple[int, Dict[int, str]]]] = {4: [], 6: []}
+        for (version, prefixlen), table in sorted(by_prefix.items(), key=lambda kv: -kv[0][1]):
+            bits = 32 if version == 4 else 128
+            mask = ((1 << prefixlen) - 1) << (bits - prefixlen)
+            self._tables[version].append((mask, table))
+
+    @classmethod
+    def load(cls, path: str) -> "LocalNetworks":
+        with open(path, newline="") as f:
+            rows = [(r[0], r[1]) for r in csv.reader(f)
+                    if len(r) >= 2 and r[0].strip() and not r[0].lstrip().startswith("#")]
+        return cls(rows)
+
+    def category(self, ip) -> Optional[str]:
+        value = int(ip)
+        for mask, table in self._tables[ip.version]:
+            category = table.get(value & mask)
+            if category is not None:
+                return category
+        return None
+
+    def __len__(self):
+        return sum(len(table) for tables in self._tables.values() for _, table in tables)
+
+
+class IPReputation:
+    def __init__(self, api_key: Optional[str], base_url: str = IPINFO_URL,
+                 cache: Optional[VerdictCache] = None, networks: Optional[LocalNetworks] = None,
+                 max_connections: int = 20, timeout: float = 5.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache or VerdictCache()
+        self.networks = networks
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.counters = dict(local=0, upstream=0, coalesced=0, failures=0)
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _local(self, ip: str) -> Optional[dict]:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if not addr.is_global:
+            return GRANTED  # ipinfo reports these as bogons, with no privacy flags
+        category = self.networks.category(addr) if self.networks is not None else None
+        if category is None:
+            return None
+        return DENIED if category in DENY_CATEGORIES else GRANTED
+
+    async def _fetch(self, ip: str) -> dict:
+        await self.start()
+        self.counters["upstream"] += 1
+        response = await self._client.get(f"{self.base_url}/{ip}", params={"token": self.api_key})
+        response.raise_for_status()
+        return verdict_from_ipinfo(response.json())
+
+    async def _resolve(self, ip: str) -> dict:
+        try:
+            verdict = await self._fetch(ip)
+        except httpx.RequestError as e:
+            # Failsafe: if the IP check service fails, allow access (not cached) but log the error.
+            self.counters["failures"] += 1
+            print(f"CRITICAL: IPinfo API call failed: {e}. Allowing access as a failsafe.")
+            return UNAVAILABLE
+        self.cache.put(ip, verdict)
+        return verdict
+
+    def _finished(self, ip: str, task: asyncio.Task):
+        self._inflight.pop(ip, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here so an error nobody awaited isn't logged as lost
+
+    async def check(self, ip: str) -> dict:
+        """Access decision for `ip`, in the shape /check-ip returns."""
+        verdict = self.cache.get(ip)
+        if verdict is not None:
+            return verdict
+        verdict = self._local(ip)
+        if verdict is not None:
+            self.counters["local"] += 1
+            self.cache.put(ip, verdict)
+            return verdict
+
+        # one upstream call per IP at a time; it runs as its own task so a
+        # caller that disconnects doesn't cancel it for the others
+        task = self._inflight.get(ip)
+        if task is None:
+            task = asyncio.ensure_future(self._resolve(ip))
+            self._inflight[ip] = task
+            task.add_done_callback(lambda t: self._finished(ip, t))
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return dict(self.counters, cache=dict(self.cache.counters, entries=len(self.cache)),
+                    local_networks=len(self.networks) if self.networks is not None else 0)
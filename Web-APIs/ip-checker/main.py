@@ -1,5 +1,5 @@
 import os
-import httpx
+from contextlib import asynccontextmanager
 from typing import Optional
 from fastapi import FastAPI, Request, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,14 +12,30 @@ from slowapi.errors import RateLimitExceeded
 from dotenv import load_dotenv
 load_dotenv()
 
+from ip_reputation import IPReputation, LocalNetworks, IP_NETWORKS_DB
+
 
 # --- CONFIGURATION ---
 IPINFO_API_KEY = os.environ.get("IPINFO_API_KEY")
 YOUR_APP_SECRET_KEY = os.environ.get("YOUR_APP_SECRET_KEY")
 if not firebase_admin._apps: firebase_admin.initialize_app()
 
+# shared ipinfo client, verdict cache and (optional) local network list
+reputation = IPReputation(
+    IPINFO_API_KEY,
+    networks=LocalNetworks.load(IP_NETWORKS_DB) if IP_NETWORKS_DB else None,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await reputation.start()
+    yield
+    await reputation.close()
+
+
 # --- FASTAPI APP SETUP ---
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 limiter = Limiter(key_func=get_remote_address)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -76,30 +92,7 @@ async def get_ip_info(
     Acts as a gatekeeper. Checks the client's IP and returns an access decision.
     """
     client_ip = request.client.host
-
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(f"https://ipinfo.io/{client_ip}?token={IPINFO_API_KEY}")
-            response.raise_for_status()
-            data = response.json()
-
-            is_vpn = data.get("privacy", {}).get("vpn", False)
-            is_proxy = data.get("privacy", {}).get("proxy", False)
-            is_hosting = data.get("privacy", {}).get("hosting", False)
-
-            # THE DECISION LOGIC
-            if is_vpn or is_proxy or is_hosting:
-                return {
-                    "access_granted": False,
-                    "reason": "For security reasons, access from VPNs, proxies, or hosting providers is not permitted."
-                }
-            else:
-                return {"access_granted": True}
-
-        except httpx.RequestError as e:
-            # Failsafe: If the IP check service fails, we allow access but log the error.
-            print(f"CRITICAL: IPinfo API call failed: {e}. Allowing access as a failsafe.")
-            return {"access_granted": True, "warning": "IP check service unavailable."}
+    return await reputation.check(client_ip)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8001)
\ No newline at end of file
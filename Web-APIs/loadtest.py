@@ -0,0 +1,74 @@
+"""
+Small closed-loop HTTP load generator for the Web-APIs services.
+
+Start a service under uvicorn, then point this at one or more URLs:
+
+    cd Web-APIs/admin && uvicorn main:app --port 8003 --workers 1
+    python Web-APIs/loadtest.py http://127.0.0.1:8003/admin/organizations \\
+        http://127.0.0.1:8003/admin/stats --concurrency 32 --requests 3000
+
+Each of `concurrency` clients sends requests back to back (cycling through
+the URLs) until `requests` have completed, after `warmup` untimed ones.
+Reports p50/p90/p99/max latency and throughput.
+"""
+import argparse, asyncio, itertools, statistics, time
+
+import httpx
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    k = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def run(urls, concurrency, requests, warmup):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        for url in urls:
+            for _ in range(warmup):
+                (await client.get(url)).raise_for_status()
+
+        next_url = itertools.cycle(urls)
+        remaining = requests
+        latencies, errors = [], 0
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(next(next_url))
+                    if r.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+    ms = lambda s: f"{s * 1000:8.2f} ms"
+    print(f"{len(latencies)} requests, concurrency {concurrency}, {elapsed:.2f}s, "
+          f"{len(latencies) / elapsed:.0f} req/s, {errors} errors")
+    print(f"  p50 {ms(percentile(latencies, 50))}  p90 {ms(percentile(latencies, 90))}  "
+          f"p99 {ms(percentile(latencies, 99))}  max {ms(latencies[-1])}  "
+          f"mean {ms(statistics.fmean(latencies))}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("urls", nargs="+")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--warmup", type=int, default=20)
+    args = ap.parse_args()
+    asyncio.run(run(args.urls, args.concurrency, args.requests, args.warmup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Shared SQLite connection setup for the Web-APIs services.
+
+- PRAGMAS / apply_pragmas: the per-connection tuning both services use
+  (WAL, synchronous=NORMAL, mmap, page cache, in-memory temp tables)
+- SQLitePool: a fixed set of warm aiosqlite connections, split into a
+  read-write and a read-only group, for services that talk to aiosqlite
+  directly (admin)
+- tune_engine: applies the same pragmas to a SQLAlchemy engine's pool
+  (dashboard)
+
+Read-only connections are opened with `mode=ro` and `query_only`, so a GET
+endpoint cannot write by accident and, under WAL, never blocks the writer.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Optional, Union
+
+import aiosqlite
+
+PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",    # 256 MB of the file mapped instead of read()
+    "PRAGMA cache_size=-65536",      # 64 MB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+]
+READONLY_PRAGMAS = [p for p in PRAGMAS if "journal_mode" not in p] + ["PRAGMA query_only=ON"]
+
+# sqlite3's per-connection prepared statement cache (default 128)
+CACHED_STATEMENTS = 512
+
+
+def readonly_uri(path: Union[str, Path]) -> str:
+    return f"{Path(path).resolve().as_uri()}?mode=ro"
+
+
+def apply_pragmas(dbapi_conn, readonly: bool = False):
+    """Tune a synchronous DB-API connection (sqlite3 or SQLAlchemy's aiosqlite adapter)."""
+    cursor = dbapi_conn.cursor()
+    for pragma in READONLY_PRAGMAS if readonly else PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def tune_engine(engine, readonly: bool = False):
+    """Apply the shared pragmas to every connection a SQLAlchemy (async) engine opens."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        apply_pragmas(dbapi_conn, readonly)
+
+    return engine
+
+
+async def prewarm_engine(engine, connections: int):
+    """Open `connections` pooled connections up front so first requests skip the setup."""
+    from sqlalchemy import text
+
+    async def touch():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(0)  # keep it checked out while the others open
+
+    await asyncio.gather(*(touch() for _ in range(connections)))
+
+
+class SQLitePool:
+    """
+    Warm aiosqlite connections handed out per request.
+
+    Each aiosqlite connection owns a thread; opening one per request (and
+    re-running the pragmas) was most of the cost of a small query. The
+    pool opens `size` read-write and `readonly_size` read-only connections
+    once and recycles them.
+    """
+
+    def __init__(self, path: Union[str, Path], size: int = 2, readonly_size: int = 4,
+                 row_factory=aiosqlite.Row):
+        self.path = str(path)
+        self.size = size
+        self.readonly_size = readonly_size
+        self.row_factory = row_factory
+        self._rw: Optional[asyncio.Queue] = None
+        self._ro: Optional[asyncio.Queue] = None
+        self._all: List[aiosqlite.Connection] = []
+        self._opening: Optional[asyncio.Lock] = None
+
+    async def _connect(self, readonly: bool) -> aiosqlite.Connection:
+        if readonly:
+            conn = await aiosqlite.connect(readonly_uri(self.path), uri=True,
+                                           cached_statements=CACHED_STATEMENTS)
+        else:
+            conn = await aiosqlite.connect(self.path, cached_statements=CACHED_STATEMENTS)
+        for pragma in READONLY_PRAGMAS if readonly else PRAGMAS:
+            await conn.execute(pragma)
+        conn.row_factory = self.row_factory
+        self._all.append(conn)
+        return conn
+
+    async def open(self):
+        """Open and configure all connections (idempotent)."""
+        if self._opening is None:
+            self._opening = asyncio.Lock()
+        async with self._opening:
+            if self._rw is not None:
+                return
+            rw, ro = asyncio.Queue(), asyncio.Queue()
+            # the writer goes first so the DB is in WAL mode before read-only opens
+            for _ in range(self.size):
+                rw.put_nowait(await self._connect(readonly=False))
+            for conn in await asyncio.gather(*(self._connect(readonly=True) for _ in range(self.readonly_size))):
+                ro.put_nowait(conn)
+            self._rw, self._ro = rw, ro
+
+    async def close(self):
+        for conn in self._all:
+            await conn.close()
+        self._all.clear()
+        self._rw = self._ro = None
+
+    @asynccontextmanager
+    async def acquire(self, readonly: bool = False) -> AsyncIterator[aiosqlite.Connection]:
+        if self._rw is None:
+            await self.open()
+        queue = self._ro if readonly else self._rw
+        conn = await queue.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                await conn.rollback()  # uncommitted work never leaks to the next request
+            queue.put_nowait(conn)
@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from Services.Core.leakstore import LeakStore
+from Services.Crawlers import bh_monitor
+from Services.Crawlers.bh_monitor_bench import make_page, serve
+
+
+class FlakyStore(LeakStore):
+    """Fails the first `failures` writes like a locked or full database would."""
+
+    def __init__(self, path, failures):
+        super().__init__(path)
+        self.failures = failures
+
+    def add_many(self, items):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return super().add_many(items)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    server = serve(make_page(40))
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    monkeypatch.setattr(bh_monitor, "URL", url)
+    monkeypatch.setattr(bh_monitor, "RELOAD_URL", None)
+    states = (bh_monitor._validators, bh_monitor._body_hash, bh_monitor._pending)
+    for state in states: state.clear()
+    yield url
+    server.shutdown()
+    for state in states: state.clear()
+
+
+def test_failed_store_write_refetches(site, tmp_path, monkeypatch):
+    store = FlakyStore(str(tmp_path / "leaks.db"), failures=1)
+    monkeypatch.setattr(bh_monitor, "get_store", lambda: store)
+    with pytest.raises(sqlite3.OperationalError):
+        bh_monitor.run_once()
+    assert site not in bh_monitor._validators and site not in bh_monitor._body_hash
+
+    bh_monitor.run_once()
+    assert store.count() == bh_monitor.LIMIT
+    # stored now, so the unchanged page is skipped without parsing
+    assert bh_monitor.fetch_latest_leaks(site, bh_monitor.LIMIT) == []
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from Services.Core.extractors import (EMAIL_RE, StreamScanner, _count_signals_reference, count_signals,
+                                      extract_entities)
+
+CASES = [
+    "",
+    "plain text without signals",
+    "user@example.com",
+    "a@b.com.x@c.com",
+    "r@l.rd6@o.er@l.sQ",          # head match inside a chain must not be counted again
+    "x@y.zz@q.rr@s.tt",
+    "6@o.er@l.sQ r@l.rd6@o.er",
+    "mail: JOHN.DOE@Example.ORG, pass: hunter2 10.0.0.1 http://site.example.net/login",
+    "1BoatSLRHtKNngkdXEeobR76b53LETtpyT wallet dump combo",
+    "İstanbul@Kelvin.com ſome@x.io",
+    "999.1.2.3 1.2.3.4.5 a1.2.3.4",
+    "https://a.b https://abcd.ef/g hTTpS://UPPER.case/x",
+]
+
+ALPHABET = "rlo.@6Qsde-_ 1:/hİK"
+
+
+def _random_texts(n, seed=0):
+    rnd = random.Random(seed)
+    for _ in range(n):
+        yield "".join(rnd.choice(ALPHABET) for _ in range(rnd.randint(1, 32)))
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_count_signals_matches_reference(text):
+    assert count_signals(text) == _count_signals_reference(text)
+
+
+def test_count_signals_matches_reference_random():
+    for text in _random_texts(50_000):
+        assert count_signals(text) == _count_signals_reference(text), text
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_entity_emails_match_reference(text):
+    emails = [e.value for e in extract_entities(text) if e.type == "email"]
+    assert emails == [m.lower() for m in EMAIL_RE.findall(text)]
+
+
+def test_entity_emails_match_reference_random():
+    for text in _random_texts(20_000, seed=1):
+        emails = [e.value for e in extract_entities(text) if e.type == "email"]
+        assert emails == [m.lower() for m in EMAIL_RE.findall(text)], text
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_stream_scanner_matches_whole_text(chunk_size):
+    text = "\n".join(CASES) * 3
+    data = text.encode("utf-8")
+    st = StreamScanner()
+    for i in range(0, len(data), chunk_size):
+        st.feed(data[i:i + chunk_size])
+    assert st.close() == count_signals(text)
+    assert st.size_bytes == len(data)
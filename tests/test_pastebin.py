@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from Services.Core.db import DedupIndex
+from Services.Core.jobqueue import JobQueue
+from Services.Core.storage_guard import GuardConfig
+from Services.Crawlers import pastebin
+from Services.Crawlers.pastebin_bench import make_pastes, serve
+
+
+class FlakyService:
+    """Runs analysis inline; the first `failures` calls raise like a broken pool would."""
+
+    def __init__(self, failures):
+        self.failures = failures
+
+    async def submit_async(self, fn, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("analysis pool broke")
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def site():
+    pastes = make_pastes(2)   # the second one is combo-like and scores above low
+    srv = serve(pastes, 0)
+    yield f"http://127.0.0.1:{srv.server_port}", list(pastes)
+    srv.shutdown()
+
+
+def make_crawl(base, failures):
+    crawl = pastebin._Crawl(pastebin.make_client(), base, GuardConfig(min_free_gb=0, max_cpu_pct=100),
+                            4, None, None, DedupIndex(":memory:"))
+    crawl.svc = FlakyService(failures)
+    return crawl
+
+
+def test_peek_is_retried_after_failed_analysis(site):
+    base, pids = site
+
+    async def run():
+        crawl = make_crawl(base, failures=1)
+        try:
+            with pytest.raises(RuntimeError):
+                await crawl.peek(pids[1])
+            assert not crawl.index.seen("paste_id", pids[1])
+            sev = await crawl.peek(pids[1])
+            assert sev is not None and sev.label != "low"
+            assert crawl.index.seen("paste_id", pids[1])
+            assert await crawl.peek(pids[1]) is None   # now it is known content
+        finally:
+            await crawl.client.aclose()
+
+    asyncio.run(run())
+
+
+def test_peek_job_retry_enqueues_deep(site, tmp_path, monkeypatch):
+    base, pids = site
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+
+    async def run():
+        crawl = make_crawl(base, failures=1)
+        monkeypatch.setattr(pastebin, "_job_crawl", crawl)
+        try:
+            with pytest.raises(RuntimeError):
+                await pastebin.job_peek(queue, pids[1])
+            await pastebin.job_peek(queue, pids[1])   # what the worker's retry runs
+        finally:
+            await crawl.client.aclose()
+
+    asyncio.run(run())
+    assert queue.counts()["pastebin"] == {"queued": 1}
+    assert queue.claim("pastebin", "test").kind == "pastebin.deep"
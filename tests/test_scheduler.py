@@ -0,0 +1,13 @@
+from Services.Core import scheduler
+
+
+def test_every_scheduled_job_has_a_handler():
+    for name, (source, kind, payload, interval) in scheduler.SCHEDULES.items():
+        assert kind in scheduler.handlers_for(source), name
+        assert source in scheduler.WORKER_CONCURRENCY, name
+
+
+def test_tor_is_scheduled_only_once_it_can_run():
+    from Services.Crawlers import tor_monitor
+    if any(source == "tor" for source, *_ in scheduler.SCHEDULES.values()):
+        assert hasattr(tor_monitor, "run")
@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+from Services.Core import severity
+from Services.Core.severity import RuleSet, SignalCounts, _score_severity_reference
+
+
+def rule(reason, points=1, **when):
+    return dict(when=when or dict(emails=1), points=points, reason=reason)
+
+
+@pytest.mark.parametrize("reason", ["{emails!x}", "{emails!z:q}", "{emails:s}", "{emails:q}", "{emails:{ips}}",
+                                    "{nope}", "{emails.real}", "{emails[0]}", "{", "}"])
+def test_bad_reason_is_rejected_at_load(reason):
+    with pytest.raises(ValueError):
+        RuleSet([rule(reason)])
+
+
+@pytest.mark.parametrize("reason, expected", [("{emails} email(s)", "3 email(s)"), ("{emails!r:>4}", "   3"),
+                                              ("{size_bytes:,} bytes", "60,000 bytes"), ("{{literal}}", "{literal}"),
+                                              ("it's \\ \"quoted\"", "it's \\ \"quoted\"")])
+def test_reason_formats(reason, expected):
+    rules = RuleSet([rule(reason)])
+    assert rules.score(SignalCounts(emails=3, size_bytes=60_000)).reasons == [expected]
+
+
+def test_builtin_rules_match_hand_written_scoring():
+    for emails in (0, 1, 9, 10, 11):
+        for passwords in (0, 1, 10):
+            for size_bytes in (50_000, 50_001):
+                sig = SignalCounts(emails=emails, passwords=passwords, urls=emails // 2, keywords=passwords % 4,
+                                   size_bytes=size_bytes, watchlist_hits=emails % 2)
+                assert severity.BUILTIN_RULES.score(sig) == _score_severity_reference(sig)
+
+
+def test_bad_rules_file_keeps_previous_rules(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    monkeypatch.setattr(severity, "SEVERITY_RULES_PATH", str(path))
+    monkeypatch.setattr(severity, "RULES_CHECK_INTERVAL", 0)
+    monkeypatch.setattr(severity, "_rules", severity.BUILTIN_RULES)
+    monkeypatch.setattr(severity, "_rules_sig", None)
+    sig = SignalCounts(emails=2)
+
+    path.write_text(json.dumps({"rules": [rule("good {emails}", points=7)]}))
+    assert severity.score_severity(sig).reasons == ["good 2"]
+    for broken in ("{not json", json.dumps({"rules": [rule("{emails!x}")]}),
+                   json.dumps({"rules": [rule("{emails:s}")]})):
+        path.write_text(broken + " " * len(path.read_text()))  # size changes, so the file is re-read
+        result = severity.score_severity(sig)
+        assert (result.score, result.reasons) == (7, ["good 2"])
+
+
+# --- batch vs. scalar ---
+
+np = pytest.importorskip("numpy")
+
+
+def random_signals(rng, rows, edges):
+    cols = {}
+    for f in severity.COUNT_FIELDS:
+        pick_edge = rng.random(rows) < 0.7
+        cols[f] = np.where(pick_edge, rng.choice(edges, rows), rng.integers(0, 100_000, rows)).astype(np.int64)
+    return cols
+
+
+def random_rules(rng, count, max_points):
+    rules = []
+    for _ in range(count):
+        fields = rng.choice(severity.COUNT_FIELDS, size=rng.integers(1, 3), replace=False)
+        rules.append(dict(when={str(f): int(rng.choice([0, 1, 2, 5, 10, 50_001])) for f in fields},
+                          points=int(rng.integers(-max_points, max_points + 1)), reason=f"{fields[0]}={{{fields[0]}}}"))
+    return rules
+
+
+def assert_batch_matches_scalar(rules, cols, thresholds=None):
+    batch = severity.score_severity_batch(cols, thresholds, rules)
+    for i in range(len(batch)):
+        expected = rules.score(batch.signals(i), thresholds)
+        got = batch.result(i)
+        assert (got.score, got.label, got.reasons) == (expected.score, expected.label, expected.reasons), \
+            (i, batch.signals(i))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_scalar_builtin_rules(seed):
+    rng = np.random.default_rng(seed)
+    cols = random_signals(rng, 20_000, np.array([0, 1, 2, 3, 4, 5, 6, 9, 10, 11, 49_999, 50_000, 50_001]))
+    assert_batch_matches_scalar(severity.BUILTIN_RULES, cols)
+    assert_batch_matches_scalar(severity.BUILTIN_RULES, cols, dict(low=0, medium=3, high=20))
+
+
+def test_batch_inputs():
+    rows = dict(emails=[0, 1, 12], passwords=[0, 1, 0])
+    expected = [severity.score_severity(severity.SignalCounts(emails=e, passwords=p)) for e, p in zip(*rows.values())]
+    structured = np.array(list(zip(*rows.values())), dtype=[("emails", np.int32), ("passwords", np.int32)])
+    for counts in (rows, {k: np.array(v) for k, v in rows.items()}, structured):
+        batch = severity.score_severity_batch(counts)
+        assert batch.score.tolist() == [r.score for r in expected]
+        assert batch.label.tolist() == [r.label for r in expected]
+    with pytest.raises(ValueError):
+        severity.score_severity_batch(dict(nope=[1]))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_scalar_random_rules(seed):
+    rng = np.random.default_rng(seed)
+    rules = RuleSet(random_rules(rng, 20, 50), dict(medium=int(rng.integers(0, 50)), high=int(rng.integers(50, 200))))
+    cols = random_signals(rng, 5_000, np.array([0, 1, 2, 4, 5, 6, 9, 10, 11, 50_000, 50_001]))
+    assert_batch_matches_scalar(rules, cols)
+
+
+def test_batch_does_not_wrap_past_int16():
+    rules = RuleSet([rule("big", points=1000, **{f: 0}) for f in severity.COUNT_FIELDS] * 5,
+                    dict(medium=30_000, high=40_000))
+    assert rules.max_abs_score == 45_000
+    cols = {f: np.array([0, 5]) for f in severity.COUNT_FIELDS}
+    batch = severity.score_severity_batch(cols, rules=rules)
+    assert batch.score.tolist() == [45_000, 45_000]
+    assert batch.label.tolist() == ["high", "high"]
+    assert_batch_matches_scalar(rules, cols)
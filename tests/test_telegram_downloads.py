@@ -0,0 +1,71 @@
+import asyncio, hashlib, os
+
+import pytest
+
+from Services.Core.storage_guard import GuardConfig, ResourceGuard
+from Services.Crawlers.telegram_downloads import DownloadManager, LocalFileClient
+
+
+@pytest.fixture
+def guard():
+    g = ResourceGuard(GuardConfig(min_free_gb=0, max_cpu_pct=100))
+    yield g
+    g.stop()
+
+
+def make_media(tmp_path, name, size, seed=0):
+    data = hashlib.sha256(str(seed).encode()).digest() * (size // 32 + 1)
+    path = tmp_path / name
+    path.write_bytes(data[:size])
+    return str(path), hashlib.sha256(data[:size]).hexdigest()
+
+
+def make_manager(tmp_path, guard, **kw):
+    client = LocalFileClient(**kw)
+    return client, DownloadManager(client, str(tmp_path / "save"), guard=guard, part_size=64 * 1024)
+
+
+def test_same_key_downloads_once(tmp_path, guard):
+    media, sha = make_media(tmp_path, "src", 300_000)
+    client, manager = make_manager(tmp_path, guard, latency=0.01)
+
+    async def run():
+        return await asyncio.gather(*(manager.download(media, "combo.txt", 300_000, "42") for _ in range(3)))
+
+    results = asyncio.run(run())
+    assert [r.joined for r in results] == [False, True, True]
+    assert {r.sha256 for r in results} == {sha}
+    assert client.requests == 5   # one pass over the 5 segments
+    assert not manager._inflight
+
+
+def test_same_name_different_documents(tmp_path, guard):
+    (a, sha_a), (b, sha_b) = make_media(tmp_path, "a", 200_000, 1), make_media(tmp_path, "b", 150_000, 2)
+    _, manager = make_manager(tmp_path, guard, latency=0.01)
+
+    async def run():
+        return await asyncio.gather(manager.download(a, "combo.txt", 200_000, "1"),
+                                    manager.download(b, "combo.txt", 150_000, "2"))
+
+    ra, rb = asyncio.run(run())
+    assert ra.path != rb.path
+    for r, sha in ((ra, sha_a), (rb, sha_b)):
+        with open(r.path, "rb") as f:
+            assert hashlib.sha256(f.read()).hexdigest() == r.sha256 == sha
+
+
+@pytest.mark.parametrize("name", ["../../x.txt", "/etc/x.txt", "..", "a/b\\c.t x"])
+def test_sender_name_never_leaves_save_dir(tmp_path, guard, name):
+    media, _ = make_media(tmp_path, "src", 1000)
+    _, manager = make_manager(tmp_path, guard)
+    r = asyncio.run(manager.download(media, name, 1000, "7"))
+    assert os.path.dirname(r.path) == manager.save_dir
+    assert os.path.basename(r.path).startswith("7")
+
+
+@pytest.mark.parametrize("key", ["../7", "", "a/b", ".."])
+def test_unsafe_key_rejected(tmp_path, guard, key):
+    media, _ = make_media(tmp_path, "src", 1000)
+    _, manager = make_manager(tmp_path, guard)
+    with pytest.raises(ValueError):
+        asyncio.run(manager.download(media, "x.txt", 1000, key))